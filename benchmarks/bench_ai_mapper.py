@@ -0,0 +1,202 @@
+"""
+Benchmark du matching IA contre le serveur OpenAI simulé (aucun coût API)
+Mesure le débit de bout en bout et la latence de queue selon le chunking et la concurrence
+
+Usage :
+    python benchmarks/bench_ai_mapper.py
+    python benchmarks/bench_ai_mapper.py --urls 2000 --latency 0.5 --tokens-per-second 80 --faults
+    python benchmarks/bench_ai_mapper.py --replay outputs/session.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import product
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Ajoute le répertoire src au path Python
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from openai import OpenAI
+from ai_mapper import AIMapper, AIMatchingError
+from ai_recording import RecordingClient, ReplayStore
+from mock_openai_server import MockOpenAIServer, MockServerConfig
+
+
+SECTIONS = ["hebergements", "activites", "services", "tarifs", "blog", "actualites", "contact", "groupes"]
+TOPICS = ["chalet", "mobil-home", "piscine", "spa", "restaurant", "randonnee", "kayak", "famille",
+          "animaux", "seminaire", "mariage", "velo", "plage", "montagne", "lac", "foret"]
+
+
+def generate_dataset(nb_urls: int, seed: int = 7) -> Dict[str, List[str]]:
+    """
+    Génère un couple ancien/nouveau site synthétique (refonte avec sections renommées)
+    
+    Args:
+        nb_urls: Nombre d'URLs par site
+        seed: Graine du générateur
+    
+    Returns:
+        Dictionnaire {"old_urls": [...], "new_urls": [...]}
+    """
+    rng = np.random.default_rng(seed)
+    old_urls = []
+    new_urls = []
+    
+    for i in range(nb_urls):
+        section = SECTIONS[rng.integers(len(SECTIONS))]
+        words = [TOPICS[j] for j in rng.choice(len(TOPICS), size=3, replace=False)]
+        old_urls.append(f"/fr/{section}/{'-'.join(words)}-{i}.html")
+        new_urls.append(f"/fr/nos-{section}/{'-'.join(reversed(words))}-{i}/")
+    
+    return {"old_urls": old_urls, "new_urls": new_urls}
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Percentiles de latence en secondes (p50, p95, p99, max)"""
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    
+    values = np.asarray(latencies)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3)
+    }
+
+
+def run_scenario(base_url: str, dataset: Dict[str, List[str]], chunk_size: Optional[int],
+                 max_concurrency: int, compact_protocol: bool, stream: bool) -> Dict[str, Any]:
+    """
+    Exécute un matching complet et mesure débit et latences
+    
+    Args:
+        base_url: URL du serveur simulé
+        dataset: URLs anciennes et nouvelles
+        chunk_size: Taille maximale des lots (None = budget de tokens)
+        max_concurrency: Lots envoyés en parallèle
+        compact_protocol: Protocole compact par indices
+        stream: Complétions streamées
+    
+    Returns:
+        Mesures du scénario
+    """
+    # Pas de retry côté client OpenAI : seules les relances de AIMapper sont mesurées
+    client = RecordingClient(OpenAI(api_key="mock", base_url=base_url, max_retries=0))
+    mapper = AIMapper(
+        "mock", client=client, chunk_size=chunk_size, max_concurrency=max_concurrency,
+        compact_protocol=compact_protocol, stream=stream, local_prematch=False
+    )
+    
+    first_match = {}
+    started = time.perf_counter()
+    
+    def on_match(match):
+        first_match.setdefault("at", time.perf_counter() - started)
+    
+    error = None
+    try:
+        result = mapper.match_urls(dataset["old_urls"], dataset["new_urls"], on_match=on_match)
+        matched = len(result.correspondances)
+    except AIMatchingError as e:
+        matched = 0
+        error = str(e)
+    elapsed = time.perf_counter() - started
+    
+    return {
+        "chunk_size": chunk_size or "auto",
+        "concurrency": max_concurrency,
+        "compact": compact_protocol,
+        "stream": stream,
+        "seconds": round(elapsed, 3),
+        "urls_per_second": round(len(dataset["old_urls"]) / elapsed, 1) if elapsed else 0.0,
+        "first_match_seconds": round(first_match.get("at", elapsed), 3),
+        "calls": len(client.latencies) + client.errors,
+        "failed_calls": client.errors,
+        "matched": matched,
+        "latency": latency_summary(client.latencies),
+        "mapper": mapper.get_statistics(),
+        "error": error
+    }
+
+
+def run_benchmark(nb_urls: int = 500, chunk_sizes: List[Optional[int]] = (None, 20),
+                  concurrencies: List[int] = (1, 4, 8), compact_options: List[bool] = (False, True),
+                  stream: bool = False, config: Optional[MockServerConfig] = None,
+                  replay_store: Optional[ReplayStore] = None) -> List[Dict[str, Any]]:
+    """
+    Exécute la grille de scénarios contre un serveur simulé
+    
+    Returns:
+        Mesures de chaque scénario
+    """
+    dataset = generate_dataset(nb_urls)
+    results = []
+    
+    with MockOpenAIServer(config, replay_store=replay_store) as server:
+        for chunk_size, concurrency, compact in product(chunk_sizes, concurrencies, compact_options):
+            results.append(run_scenario(server.base_url, dataset, chunk_size, concurrency, compact, stream))
+        results.append({"server": server.get_statistics()})
+    
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]):
+    """Affiche les mesures sous forme de tableau"""
+    header = f"{'lots':>6} {'conc.':>5} {'compact':>7} {'appels':>6} {'échecs':>6} {'durée s':>8} " \
+             f"{'URLs/s':>8} {'1er s':>6} {'p50 s':>6} {'p95 s':>6} {'p99 s':>6}"
+    print(header)
+    print("-" * len(header))
+    
+    for row in results:
+        if "server" in row:
+            print(f"\nServeur simulé : {row['server']}")
+            continue
+        latency = row["latency"]
+        print(f"{str(row['chunk_size']):>6} {row['concurrency']:>5} {str(row['compact']):>7} "
+              f"{row['calls']:>6} {row['failed_calls']:>6} {row['seconds']:>8} {row['urls_per_second']:>8} "
+              f"{row['first_match_seconds']:>6} {latency['p50']:>6} {latency['p95']:>6} {latency['p99']:>6}")
+        if row["error"]:
+            print(f"       ⚠️ {row['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AIMapper contre le serveur OpenAI simulé")
+    parser.add_argument("--urls", type=int, default=500, help="URLs par site")
+    parser.add_argument("--chunk-sizes", default="auto,20", help="Tailles de lots (auto = budget de tokens)")
+    parser.add_argument("--concurrency", default="1,4,8", help="Niveaux de concurrence")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latence avant premier token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Débit de génération simulé")
+    parser.add_argument("--stream", action="store_true", help="Complétions streamées")
+    parser.add_argument("--faults", action="store_true", help="Injecte 5%% de 429, 2%% de 5xx et 5%% de troncatures")
+    parser.add_argument("--replay", help="Fichier JSONL d'enregistrements à rejouer en priorité")
+    parser.add_argument("--json", help="Écrit les mesures brutes dans ce fichier")
+    args = parser.parse_args()
+    
+    config = MockServerConfig(latency_seconds=args.latency, tokens_per_second=args.tokens_per_second)
+    if args.faults:
+        config.rate_limit_rate = 0.05
+        config.error_rate = 0.02
+        config.truncate_rate = 0.05
+    
+    chunk_sizes = [None if value == "auto" else int(value) for value in args.chunk_sizes.split(",")]
+    concurrencies = [int(value) for value in args.concurrency.split(",")]
+    
+    results = run_benchmark(
+        args.urls, chunk_sizes, concurrencies, stream=args.stream, config=config,
+        replay_store=ReplayStore(args.replay) if args.replay else None
+    )
+    print_report(results)
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark du moteur de matching local par embeddings (CPU, hors ligne)
+Mesure la durée et la mémoire de travail selon le volume et la taille de bloc
+
+Usage :
+    python benchmarks/bench_embedding_matcher.py --urls 100000
+    python benchmarks/bench_embedding_matcher.py --urls 20000 --block-sizes 64,256,1024
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Ajoute le répertoire src au path Python
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from embedding_matcher import EmbeddingMatcher
+from bench_ai_mapper import generate_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du moteur local par embeddings")
+    parser.add_argument("--urls", type=int, default=20000, help="URLs par site")
+    parser.add_argument("--block-sizes", default="256", help="Tailles de bloc à comparer")
+    parser.add_argument("--features", type=int, default=512, help="Dimension des vecteurs hachés")
+    args = parser.parse_args()
+    
+    dataset = generate_dataset(args.urls)
+    print(f"{'bloc':>6} {'durée s':>8} {'URLs/s':>8} {'matchées':>9} {'mémoire bloc Mo':>16}")
+    
+    for block_size in [int(value) for value in args.block_sizes.split(",")]:
+        matcher = EmbeddingMatcher(n_features=args.features, block_size=block_size)
+        started = time.perf_counter()
+        result = matcher.match_urls(dataset["old_urls"], dataset["new_urls"])
+        elapsed = time.perf_counter() - started
+        
+        # Matrice de similarités d'un bloc (float32)
+        block_memory = block_size * args.urls * 4 / 1e6
+        print(f"{block_size:>6} {elapsed:>8.1f} {args.urls / elapsed:>8.0f} "
+              f"{len(result.correspondances):>9} {block_memory:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,13 +11,20 @@ load_dotenv()
 import streamlit as st
 import csv
 import io
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from urllib.parse import urlparse
 from generator import RedirectGenerator
-from scraper import crawl_site_with_fallback, WebScraper, parse_sitemap
+from scraper import crawl_site_with_fallback, WebScraper, parse_sitemap, iter_sitemap_records
 from smart_input_parser import SmartInputParser
 from language_detector import LanguageDetector
-from ai_mapper import AIMapper, AIMatchingError
+from ai_mapper import AIMapper, AIMatchingError, MatchResult
+from language_pipeline import MultiLanguagePipeline, LanguageProgress
+from batch_jobs import BatchJobManager, OpenAIBatchBackend, list_batch_jobs
+from model_cascade import ModelCascade
+from token_estimator import MODEL_TOKEN_LIMITS
+from embedding_matcher import EmbeddingMatcher
+from assignment_optimizer import AssignmentOptimizer
+from hreflang_clusters import TranslationClusters, choose_pivot_language, propagate_matches
 from fallback_manager import FallbackManager
 from domain_detector import DomainDetector
 from cache_manager import CacheManager
@@ -230,6 +237,177 @@ def generate_balt_xlsx(redirects_data: List[Dict], output_path: str = None, outp
         raise ValueError(f"Erreur génération XLS Balt: {str(e)}")
 
 
+def parse_sitemap_with_alternates(sitemap_url: str):
+    """
+    Parse un sitemap et conserve les traductions hreflang de chaque URL
+    
+    Args:
+        sitemap_url: URL du sitemap à parser
+        
+    Returns:
+        Tuple (urls dédoublonnées, {url: {hreflang: url}})
+    """
+    urls = []
+    alternates = {}
+    
+    try:
+        for record in iter_sitemap_records(sitemap_url):
+            urls.append(record.loc)
+            if record.alternates:
+                alternates[record.loc] = record.get_alternates()
+    except Exception as e:
+        print(f"Erreur lors du parsing du sitemap {sitemap_url}: {e}")
+    
+    return list(dict.fromkeys(urls)), alternates
+
+
+def match_languages_with_live_progress(ai_mapper: AIMapper, jobs: Dict[str, Tuple[List[str], List[str]]],
+                                       contexte_metier: str, min_confidence: float = 0.0) -> Dict[str, MatchResult]:
+    """
+    Lance le matching IA de plusieurs langues en parallèle avec une barre de progression par langue
+    
+    Args:
+        ai_mapper: Mapper IA configuré (pool de lots et limiteur partagés)
+        jobs: {langue: (anciennes URLs, nouvelles URLs)}
+        contexte_metier: Contexte métier du projet
+        min_confidence: Seuil de confidence (0.0 = résultats bruts)
+    
+    Returns:
+        {langue: MatchResult} ; une langue en échec renvoie ses URLs en non matchées
+    """
+    icons = {"en attente": "⏳", "en cours": "📡", "terminé": "✅", "échec": "❌"}
+    bars = {
+        lang: st.progress(0.0, text=f"⏳ {lang.upper()} : en attente ({len(lang_old_urls)} URLs)")
+        for lang, (lang_old_urls, lang_new_urls) in jobs.items()
+    }
+    
+    def on_progress(progress: LanguageProgress):
+        bars[progress.langue].progress(
+            progress.fraction,
+            text=f"{icons[progress.status]} {progress.langue.upper()} : "
+                 f"{progress.received}/{progress.total} correspondances - {progress.status}"
+        )
+    
+    pipeline = MultiLanguagePipeline(ai_mapper, on_progress=on_progress)
+    results = pipeline.run(jobs, contexte_metier=contexte_metier, min_confidence=min_confidence)
+    
+    for progress in pipeline.progress.values():
+        if progress.error:
+            st.error(f"❌ Matching IA impossible pour {progress.langue.upper()} : {progress.error}")
+    
+    return results
+
+
+def create_batch_manager(cache_manager: CacheManager, mapper_settings: Dict[str, Any]) -> BatchJobManager:
+    """
+    Gestionnaire des travaux batch, avec un mapper reconstruit depuis les réglages du travail
+    
+    Args:
+        cache_manager: Gestionnaire de cache (répertoire des travaux, cache par URL, journal)
+        mapper_settings: Réglages AIMapper (temperature, chunk_size, compact_protocol,
+            section_mode, project)
+        
+    Returns:
+        Gestionnaire branché sur l'API Batch OpenAI
+    """
+    ai_mapper = AIMapper(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        temperature=mapper_settings.get("temperature", 0.1),
+        chunk_size=mapper_settings.get("chunk_size"),
+        compact_protocol=mapper_settings.get("compact_protocol", False),
+        stream=False,
+        section_mode=mapper_settings.get("section_mode"),
+        match_cache=cache_manager.match_cache,
+        usage_ledger=cache_manager.usage_ledger,
+        project=mapper_settings.get("project", "default")
+    )
+    return BatchJobManager(ai_mapper, backend=OpenAIBatchBackend(ai_mapper.client),
+                           jobs_dir=cache_manager.cache_dir / "batch_jobs")
+
+
+def collect_batch_job(cache_manager: CacheManager, job: Dict[str, Any]) -> int:
+    """
+    Ingère un travail batch terminé et enregistre ses résultats bruts dans le cache GPT
+    
+    La génération suivante avec les mêmes URLs réutilise ce cache : le reste
+    du parcours (seuil, fallback 302, export) est identique au mode interactif.
+    
+    Args:
+        cache_manager: Gestionnaire de cache
+        job: Travail résumé (list_jobs)
+    
+    Returns:
+        Nombre de correspondances proposées (avant seuil)
+    """
+    metadata = job["metadata"]
+    manager = create_batch_manager(cache_manager, metadata["mapper"])
+    results = manager.collect(job["job_id"])
+    
+    all_matches = []
+    all_unmatched = []
+    all_abandoned = []
+    for lang in sorted(results):
+        all_matches.extend(results[lang].correspondances)
+        all_unmatched.extend(results[lang].non_matchees)
+        all_abandoned.extend(results[lang].abandonnees)
+    
+    cache_manager.save_gpt_cache(
+        metadata["old_urls"], metadata["new_urls"], metadata["contexte_metier"],
+        metadata["mapper"]["temperature"],
+        {
+            "all_matches": all_matches,
+            "all_unmatched": all_unmatched,
+            "all_abandoned": all_abandoned,
+            "missing_langs": metadata["missing_langs"],
+            "old_grouped": metadata["old_grouped"],
+            "raw": True
+        }
+    )
+    return len(all_matches)
+
+
+def apply_result_view(matches: List[Dict], unmatched: List[str], confidence_threshold: float,
+                      max_fan_in: int = 0) -> Tuple[List[Dict], List[str]]:
+    """
+    Vue des résultats bruts au seuil de confiance, puis au fan-in borné
+    
+    Les résultats bruts (toutes confidences) sont ceux du cache : changer
+    le seuil ne relance jamais l'IA. Les cibles alternatives proposées par
+    le modèle (au-dessus du seuil) sont soumises à l'affectation globale :
+    une URL dont la cible est saturée passe sur sa deuxième cible au lieu
+    d'être écartée.
+    
+    Args:
+        matches: Correspondances brutes
+        unmatched: URLs non matchées par le moteur
+        confidence_threshold: Score minimum pour valider un match
+        max_fan_in: Anciennes URLs max par cible (0 = illimité)
+    
+    Returns:
+        Tuple (correspondances retenues, URLs non matchées ou écartées)
+    """
+    view = MatchResult(correspondances=matches, non_matchees=unmatched).filter_confidence(confidence_threshold)
+    
+    if max_fan_in and view.correspondances:
+        candidates = list(view.correspondances)
+        for match in view.correspondances:
+            for alternative in match.get("alternatives", []):
+                if alternative.get("confidence", 0) >= confidence_threshold:
+                    candidates.append({
+                        **match,
+                        **alternative,
+                        "raison": f"Alternative proposée par l'IA (cible principale : {match['nouvelle']})"
+                    })
+        assigned = AssignmentOptimizer(max_fan_in=max_fan_in).optimize_matches(candidates)
+        view = MatchResult(correspondances=assigned.correspondances,
+                           non_matchees=view.non_matchees + assigned.non_matchees)
+    
+    # Les alternatives ne servent qu'à l'affectation : hors des exports
+    correspondances = [{key: value for key, value in match.items() if key != "alternatives"}
+                       for match in view.correspondances]
+    return correspondances, view.non_matchees
+
+
 def interface_ai_avancee():
     """Interface avancée avec IA sémantique et multilangue"""
     
@@ -239,9 +417,19 @@ def interface_ai_avancee():
     # Initialisation du gestionnaire de cache
     cache_manager = CacheManager()
     
+    # Choix du moteur : IA OpenAI ou moteur local hors ligne (sans clé API)
+    matching_engine = st.radio(
+        "🧠 Moteur de matching",
+        ["IA OpenAI", "Local hors ligne (embeddings)"],
+        horizontal=True,
+        help="Le moteur local compare les URLs par similarité de n-grammes, sans réseau ni coût API"
+    )
+    use_local_engine = matching_engine != "IA OpenAI"
+    
     # Vérification de la clé API
-    if not os.getenv("OPENAI_API_KEY"):
-        st.error("❌ Clé API OpenAI manquante. Veuillez la configurer dans le fichier .env")
+    if not use_local_engine and not os.getenv("OPENAI_API_KEY"):
+        st.error("❌ Clé API OpenAI manquante. Veuillez la configurer dans le fichier .env "
+                 "ou choisir le moteur local hors ligne")
         return
     
     # Configuration IA
@@ -250,14 +438,44 @@ def interface_ai_avancee():
         with col1:
             temperature = st.slider("🌡️ Température IA", 0.0, 1.0, 0.1, 0.1,
                                    help="0.0 = conservateur, 1.0 = créatif")
-            chunk_size = st.number_input("📦 Taille des lots", 10, 50, 20,
-                                       help="URLs traitées par lot")
+            chunk_size = st.number_input("📦 Taille max des lots", 0, 500, 0,
+                                       help="0 = lots remplis selon le budget de tokens du modèle")
+            max_concurrency = st.number_input("⚡ Lots en parallèle", 1, 16, 4,
+                                            help="Appels API simultanés (limites RPM/TPM respectées)")
+            batch_mode = st.checkbox("📦 Mode batch (différé, -50%)", value=False,
+                                     disabled=use_local_engine,
+                                     help="Lots soumis à l'API Batch : résultats sous 24 h, à récupérer "
+                                          "dans « Travaux batch »")
+            section_modes = {"Désactivé": None, "Local (votes lexicaux)": "local", "IA (noms de sections)": "ai"}
+            section_choice = st.selectbox("🗂️ Matching par sections", list(section_modes),
+                                          help="Sections de l'ancien site associées d'abord aux sections du "
+                                               "nouveau site, puis pages comparées au sein de chaque paire : "
+                                               "prompts plus courts, lots indépendants en parallèle")
+            section_mode = section_modes[section_choice]
         with col2:
             confidence_threshold = st.slider("🎯 Seuil de confiance", 0.5, 0.9, 0.7, 0.05,
                                             help="Score minimum pour valider un match")
             fallback_lang = st.selectbox("🌐 Langue de fallback", 
                                        ["fr", "en", "de", "es", "it", "nl"], 
                                        index=0)
+            compact_protocol = st.checkbox("🔢 Protocole compact (indices)", value=False,
+                                           help="URLs numérotées : le modèle répond par indices, moins de tokens de sortie")
+            stream_results = st.checkbox("📡 Streaming des réponses", value=True,
+                                         help="Affiche chaque correspondance dès qu'elle est générée")
+            max_fan_in = st.number_input("🧲 Anciennes URLs max par cible", 0, 50, 0,
+                                         help="0 = illimité. Sinon, affectation globale : les URLs en surnombre "
+                                              "sur une même cible passent en non matchées (fallback)")
+            use_cascade = st.checkbox("🪜 Cascade de modèles", value=False, disabled=use_local_engine,
+                                      help="Scorer local, puis modèle rapide ; seules les paires sous le seuil "
+                                           "d'escalade passent au modèle fort (hors mode batch)")
+            if use_cascade:
+                model_names = list(MODEL_TOKEN_LIMITS)
+                fast_model = st.selectbox("⚡ Modèle rapide", model_names, index=model_names.index("gpt-4o-mini"))
+                strong_model = st.selectbox("🧠 Modèle fort", model_names, index=model_names.index("gpt-4o"))
+                escalate_below = st.slider("📈 Seuil d'escalade", 0.5, 0.99, 0.85, 0.01,
+                                           help="Correspondances du modèle rapide sous ce seuil revues par le modèle fort")
+                local_accept = st.slider("🖥️ Seuil d'acceptation locale", 0.8, 1.0, 0.9, 0.01,
+                                         help="Paires acceptées sans appel IA au-dessus de ce score (1.0 = désactivé)")
     
     # Configuration Fallback 302 Intelligent (Sprint 3)
     with st.expander("🔄 Fallback intelligent 302 (Sprint 3)"):
@@ -282,6 +500,7 @@ def interface_ai_avancee():
             cache_stats = cache_manager.get_cache_stats()
             st.metric("Résultats en cache", cache_stats["gpt_cache_files"])
             st.metric("Fichiers .htaccess", cache_stats["htaccess_files"])
+            st.metric("Entrées cache par URL", cache_stats["match_cache_entries"])
             
         with col_cache2:
             st.metric("Taille cache", f"{cache_stats['total_size_mb']} MB")
@@ -295,6 +514,80 @@ def interface_ai_avancee():
             st.write("**Résultats récents en cache:**")
             for i, cache_info in enumerate(cached_results[:3]):  # Affiche les 3 plus récents
                 st.text(f"• {cache_info['timestamp'][:16]} - {cache_info['old_urls_count']} → {cache_info['new_urls_count']} URLs")
+        
+        # Consommation réelle mesurée (response.usage de chaque appel)
+        ledger_projects = cache_manager.usage_ledger.projects()
+        if ledger_projects:
+            st.write("**Consommation IA mesurée:**")
+            ledger_project = st.selectbox("Projet", ledger_projects, key="ledger_project")
+            usage = cache_manager.usage_ledger.summary(ledger_project)
+            
+            col_usage1, col_usage2, col_usage3 = st.columns(3)
+            with col_usage1:
+                st.metric("Appels IA", usage["calls"])
+                st.metric("Tokens", f"{usage['total_tokens']:,}".replace(",", " "))
+            with col_usage2:
+                st.metric("Coût mesuré", f"${usage['cost_usd']:.4f}")
+                st.metric("Coût / URL", f"${usage['cost_per_url_usd']:.6f}")
+            with col_usage3:
+                st.metric("Latence p50 / p90", f"{usage['latency_p50_s']:.1f}s / {usage['latency_p90_s']:.1f}s")
+                st.metric("Tentatives relancées", usage["retries"])
+                st.metric("Tokens d'entrée en cache", f"{usage['cached_ratio']:.0%}")
+            
+            outcomes = usage["parse_outcomes"]
+            st.caption(
+                f"Réponses : {outcomes['ok']} valides, {outcomes['salvaged']} récupérées, "
+                f"{outcomes['empty']} inexploitables, {outcomes['api_error']} échecs API ; "
+                f"{usage['omitted_urls']} URLs omises par le modèle ({usage['omission_rate']:.1%})"
+            )
+            st.dataframe([
+                {
+                    "Modèle": setting["model"],
+                    "URLs / lot": setting["chunk_size"],
+                    "Appels": setting["calls"],
+                    "Coût / URL ($)": setting["cost_per_url_usd"],
+                    "Latence p50 (s)": setting["latency_p50_s"],
+                    "Latence p90 (s)": setting["latency_p90_s"],
+                    "Tokens p50": setting["tokens_p50"],
+                    "Entrée en cache": f"{setting['cached_ratio']:.0%}"
+                }
+                for setting in usage["by_setting"]
+            ])
+            
+            if usage["by_tier"]:
+                st.write("**Dépense par palier de cascade:**")
+                st.dataframe([
+                    {
+                        "Palier": tier["tier"],
+                        "URLs": tier["urls"],
+                        "Appels": tier["calls"],
+                        "Coût ($)": tier["cost_usd"],
+                        "Coût / URL ($)": tier["cost_per_url_usd"],
+                        "Temps cumulé (s)": tier["latency_s"]
+                    }
+                    for tier in usage["by_tier"]
+                ])
+    
+    # Travaux batch (reprise possible après redémarrage : manifestes sur disque)
+    batch_jobs_dir = cache_manager.cache_dir / "batch_jobs"
+    if not use_local_engine and batch_jobs_dir.exists():
+        with st.expander("📦 Travaux batch"):
+            batch_jobs = list_batch_jobs(batch_jobs_dir)
+            if not batch_jobs:
+                st.write("Aucun travail batch")
+            for job in batch_jobs[:10]:
+                col_job1, col_job2 = st.columns([3, 1])
+                with col_job1:
+                    st.text(f"• {job['created'][:16]} - {job['job_id']} - {', '.join(job['languages'])} "
+                            f"- {job['requests']} lots - {job['status']}")
+                with col_job2:
+                    if job["status"] != "ingested" and st.button("📥 Récupérer", key=f"batch_{job['job_id']}"):
+                        try:
+                            nb_matches = collect_batch_job(cache_manager, job)
+                            st.success(f"✅ {nb_matches} correspondances en cache : relancez la génération "
+                                       f"avec les mêmes URLs")
+                        except AIMatchingError as e:
+                            st.info(f"⏳ {e}")
     
     # Collecte des URLs
     st.header("📊 Collecte des URLs")
@@ -320,9 +613,12 @@ def interface_ai_avancee():
             if st.button("🗺️ Parser sitemap ancien site"):
                 if old_sitemap_url:
                     with st.spinner("Parsing du sitemap..."):
-                        old_urls = parse_sitemap(old_sitemap_url)
+                        old_urls, old_alternates = parse_sitemap_with_alternates(old_sitemap_url)
                         st.session_state.old_urls = old_urls
+                        st.session_state.old_alternates = old_alternates
                         st.success(f"✅ {len(old_urls)} URLs extraites du sitemap")
+                        if old_alternates:
+                            st.info(f"🔗 {len(old_alternates)} URLs avec traductions hreflang")
                 else:
                     st.error("Veuillez entrer une URL de sitemap")
         elif old_input_mode == "Input universel":
@@ -394,9 +690,12 @@ https://site.com/page2
             if st.button("🗺️ Parser sitemap"):
                 if sitemap_url:
                     with st.spinner("Parsing du sitemap..."):
-                        new_urls = parse_sitemap(sitemap_url)
+                        new_urls, new_alternates = parse_sitemap_with_alternates(sitemap_url)
                         st.session_state.new_urls = new_urls
+                        st.session_state.new_alternates = new_alternates
                         st.success(f"✅ {len(new_urls)} URLs extraites")
+                        if new_alternates:
+                            st.info(f"🔗 {len(new_alternates)} URLs avec traductions hreflang")
                 else:
                     st.error("Veuillez entrer une URL de sitemap")
         elif new_input_mode == "Input universel":
@@ -560,34 +859,140 @@ https://nouveau-site.com/fr/page2
             height=100
         )
         
+        # Aperçu d'un autre seuil sur les résultats bruts de la dernière génération
+        raw_ai_results = st.session_state.get('raw_ai_results')
+        if raw_ai_results and raw_ai_results["matches"]:
+            with st.expander("🎚️ Aperçu du seuil de confiance (sans appel IA)"):
+                preview_threshold = st.slider(
+                    "Seuil à prévisualiser", 0.0, 1.0, float(raw_ai_results["threshold"]), 0.01,
+                    key="preview_threshold"
+                )
+                preview_matches, preview_unmatched = apply_result_view(
+                    raw_ai_results["matches"], raw_ai_results["unmatched"],
+                    preview_threshold, raw_ai_results["max_fan_in"]
+                )
+                current_matches, _ = apply_result_view(
+                    raw_ai_results["matches"], raw_ai_results["unmatched"],
+                    raw_ai_results["threshold"], raw_ai_results["max_fan_in"]
+                )
+                
+                col_preview1, col_preview2 = st.columns(2)
+                with col_preview1:
+                    st.metric("Redirections 301", len(preview_matches),
+                              delta=len(preview_matches) - len(current_matches))
+                with col_preview2:
+                    st.metric("URLs en fallback", len(preview_unmatched))
+                
+                bins = [0] * 20
+                for match in raw_ai_results["matches"]:
+                    bins[min(19, int(match.get('confidence', 0) * 20))] += 1
+                st.bar_chart(
+                    [{"Confiance": f"{i / 20:.2f}", "Correspondances": count} for i, count in enumerate(bins)],
+                    x="Confiance", y="Correspondances"
+                )
+                st.caption("Reportez ce seuil dans « 🎯 Seuil de confiance » puis relancez la génération : "
+                           "les résultats bruts en cache sont réutilisés, sans appel IA")
+        
         # Génération avec IA
         if st.button("🤖 Générer avec IA sémantique", type="primary"):
             with st.spinner("🧠 Vérification du cache..."):
                 try:
                     # Vérification du cache d'abord
                     cache_key_info = f"Temp:{temperature}, Chunk:{chunk_size}, Seuil:{confidence_threshold}"
-                    cached_result = cache_manager.get_gpt_cache(
-                        old_urls, new_urls, contexte_metier, temperature
-                    )
+                    # Le moteur local est instantané : pas de cache GPT partagé avec l'IA
+                    cached_result = None
+                    if not use_local_engine:
+                        cached_result = cache_manager.get_gpt_cache(
+                            old_urls, new_urls, contexte_metier, temperature
+                        )
+                    
+                    # Des URLs abandonnées (sans réponse exploitable de l'IA) relancent la
+                    # génération : seules elles repartent, le reste vient du cache par URL
+                    if cached_result and cached_result["results"].get("all_abandoned"):
+                        st.info(f"🔁 {len(cached_result['results']['all_abandoned'])} URLs abandonnées "
+                                f"lors de la dernière génération : nouvel essai")
+                        cached_result = None
                     
+                    raw_abandoned = []
                     if cached_result:
                         st.success(f"✅ Résultats trouvés en cache ! (Économie API)")
-                        # Utilise les résultats du cache
-                        all_matches = cached_result["results"]["all_matches"]
-                        all_unmatched = cached_result["results"]["all_unmatched"]
+                        # Utilise les résultats bruts du cache (seuil appliqué plus bas)
+                        raw_matches = cached_result["results"]["all_matches"]
+                        raw_unmatched = cached_result["results"]["all_unmatched"]
                         missing_langs = cached_result["results"]["missing_langs"]
                         old_grouped = cached_result["results"]["old_grouped"]
                         
-                        st.info(f"📊 Cache utilisé: {len(all_matches)} correspondances trouvées")
+                        st.info(f"📊 Cache utilisé: {len(raw_matches)} correspondances trouvées")
+                        if not cached_result["results"].get("raw"):
+                            st.warning("⚠️ Cache d'un ancien format, déjà filtré au seuil de sa génération : "
+                                       "un seuil plus bas ne retrouvera pas les paires écartées")
                     else:
-                        st.info("💸 Appel API GPT nécessaire - Nouveau matching...")
+                        ai_mapper = None
+                        local_matcher = None
+                        if use_local_engine:
+                            st.info("🖥️ Matching local hors ligne (embeddings de n-grammes)")
+                            local_matcher = EmbeddingMatcher(max_fan_in=max_fan_in or None)
+                        else:
+                            st.info("💸 Appel API GPT nécessaire - Nouveau matching...")
+                            
+                            # Initialisation de l'IA
+                            mapper_kwargs = dict(
+                                temperature=temperature,
+                                chunk_size=chunk_size or None,
+                                max_concurrency=max_concurrency,
+                                compact_protocol=compact_protocol,
+                                stream=stream_results,
+                                section_mode=section_mode,
+                                match_cache=cache_manager.match_cache,
+                                usage_ledger=cache_manager.usage_ledger,
+                                project=urlparse(target_domain).netloc or target_domain
+                            )
+                            if use_cascade and not batch_mode:
+                                ai_mapper = ModelCascade.from_models(
+                                    os.getenv("OPENAI_API_KEY"),
+                                    fast_model=fast_model,
+                                    strong_model=strong_model,
+                                    escalate_below=escalate_below,
+                                    local_accept=local_accept if local_accept < 1.0 else None,
+                                    **mapper_kwargs
+                                )
+                            else:
+                                ai_mapper = AIMapper(api_key=os.getenv("OPENAI_API_KEY"), **mapper_kwargs)
                         
-                        # Initialisation de l'IA
-                        ai_mapper = AIMapper(
-                            api_key=os.getenv("OPENAI_API_KEY"),
-                            temperature=temperature,
-                            chunk_size=chunk_size
-                        )
+                        if batch_mode and ai_mapper is not None:
+                            # Soumission différée : les résultats rejoindront le cache GPT à la récupération
+                            # (sans propagation hreflang : chaque langue passe par l'IA)
+                            batch_langs = sorted(
+                                lang for lang in set(old_grouped) & set(new_grouped)
+                                if old_grouped[lang] and new_grouped[lang]
+                            )
+                            batch_manager = BatchJobManager(
+                                ai_mapper, backend=OpenAIBatchBackend(ai_mapper.client),
+                                jobs_dir=cache_manager.cache_dir / "batch_jobs"
+                            )
+                            job_id = batch_manager.enqueue(
+                                {lang: (old_grouped[lang], new_grouped[lang]) for lang in batch_langs},
+                                contexte_metier=contexte_metier,
+                                min_confidence=0.0,
+                                metadata={
+                                    "old_urls": old_urls,
+                                    "new_urls": new_urls,
+                                    "contexte_metier": contexte_metier,
+                                    "missing_langs": missing_langs,
+                                    "old_grouped": old_grouped,
+                                    "mapper": {
+                                        "temperature": temperature,
+                                        "chunk_size": chunk_size or None,
+                                        "compact_protocol": compact_protocol,
+                                        "section_mode": section_mode,
+                                        "project": urlparse(target_domain).netloc or target_domain
+                                    }
+                                }
+                            )
+                            st.success(f"📦 Travail batch {job_id} soumis "
+                                       f"({batch_manager.load(job_id)['requests']} lots)")
+                            st.info("⏳ Récupérez les résultats dans « 📦 Travaux batch » puis relancez la génération")
+                            return
                     
                         # Génération du rapport de fallback d'abord
                         if missing_langs:
@@ -598,56 +1003,185 @@ https://nouveau-site.com/fr/page2
                         # Matching IA pour chaque langue commune
                         st.subheader("🤖 Résultats du matching IA")
                         
-                        all_matches = []
-                        all_unmatched = []
+                        # Résultats bruts (toutes confidences) : ce sont eux qui vont en cache
+                        raw_matches = []
+                        raw_unmatched = []
                         
                         common_langs = set(old_grouped.keys()) & set(new_grouped.keys())
                         
-                        for lang in sorted(common_langs):
-                            if old_grouped[lang] and new_grouped[lang]:
-                                st.write(f"**🔄 Traitement langue: {lang.upper()}**")
+                        # Clusters hreflang : une langue pivot passe par l'IA,
+                        # les autres langues suivent les traductions
+                        old_clusters = TranslationClusters.from_alternates(
+                            st.session_state.get('old_alternates', {})
+                        )
+                        new_clusters = TranslationClusters.from_alternates(
+                            st.session_state.get('new_alternates', {})
+                        )
+                        pivot_lang = None
+                        if new_clusters.cluster_count():
+                            pivot_lang = choose_pivot_language(common_langs, old_grouped, old_clusters)
+                        
+                        ordered_langs = sorted(common_langs)
+                        if pivot_lang:
+                            ordered_langs.remove(pivot_lang)
+                            ordered_langs.insert(0, pivot_lang)
+                            st.info(f"🔗 Langue pivot hreflang: {pivot_lang.upper()} - les autres langues suivent les traductions")
+                        
+                        active_langs = [lang for lang in ordered_langs if old_grouped[lang] and new_grouped[lang]]
+                        
+                        # Toutes les langues partagent un même pool de lots ; la langue pivot
+                        # passe d'abord car les autres dérivent de ses correspondances
+                        if pivot_lang in active_langs:
+                            waves = [[pivot_lang], [lang for lang in active_langs if lang != pivot_lang]]
+                        else:
+                            waves = [active_langs]
+                        
+                        pivot_matches = []
+                        derived_by_lang = {}
+                        results_by_lang = {}
+                        
+                        for wave in waves:
+                            jobs = {}
+                            for lang in wave:
+                                # Correspondances dérivées des traductions de la langue pivot
+                                lang_old_urls = old_grouped[lang]
+                                if pivot_lang and lang != pivot_lang:
+                                    derived_by_lang[lang], lang_old_urls = propagate_matches(
+                                        pivot_matches, old_clusters, new_clusters,
+                                        lang, old_grouped[lang], new_grouped[lang]
+                                    )
                                 
-                                # Matching IA pour cette langue
-                                result = ai_mapper.match_urls(
-                                    old_grouped[lang],
-                                    new_grouped[lang],
-                                    contexte_metier=contexte_metier,
-                                    langue=lang
+                                # Matching IA pour les URLs non résolues de cette langue
+                                if lang_old_urls:
+                                    jobs[lang] = (lang_old_urls, new_grouped[lang])
+                                else:
+                                    results_by_lang[lang] = MatchResult(correspondances=[], non_matchees=[])
+                            
+                            if jobs and local_matcher is not None:
+                                for lang, (lang_old_urls, lang_new_urls) in jobs.items():
+                                    results_by_lang[lang] = local_matcher.match_urls(
+                                        lang_old_urls, lang_new_urls, langue=lang, min_confidence=0.0
+                                    )
+                            elif jobs:
+                                results_by_lang.update(
+                                    match_languages_with_live_progress(ai_mapper, jobs, contexte_metier,
+                                                                       min_confidence=0.0)
                                 )
-                                
-                                # Affichage des résultats
-                                matches = result.correspondances
-                                unmatched = result.non_matchees
-                                
-                                st.success(f"✅ {len(matches)} correspondances trouvées")
-                                if unmatched:
-                                    st.warning(f"⚠️ {len(unmatched)} URLs non matchées")
-                                
-                                # Filtre par confiance
-                                filtered_matches = [
-                                    match for match in matches 
-                                    if match.get('confidence', 0) >= confidence_threshold
-                                ]
-                                
-                                if len(filtered_matches) < len(matches):
-                                    excluded = len(matches) - len(filtered_matches)
-                                    st.info(f"🎯 {excluded} matches exclus (confiance < {confidence_threshold})")
-                                
-                                all_matches.extend(filtered_matches)
-                                all_unmatched.extend(unmatched)
+                            
+                            # Correspondances pivot brutes propagées aux traductions : chaque
+                            # dérivée porte la confidence de sa paire pivot, le seuil appliqué
+                            # à la lecture les retient ou les écarte ensemble
+                            if pivot_lang in results_by_lang:
+                                pivot_matches = results_by_lang[pivot_lang].correspondances
                         
-                        # Sauvegarde des résultats dans le cache
-                        gpt_results = {
-                            "all_matches": all_matches,
-                            "all_unmatched": all_unmatched,
-                            "missing_langs": missing_langs,
-                            "old_grouped": old_grouped
-                        }
+                        for lang in active_langs:
+                            st.write(f"**🔄 Langue: {lang.upper()}**")
+                            
+                            derived_matches = derived_by_lang.get(lang, [])
+                            if derived_matches:
+                                st.info(f"🔗 {len(derived_matches)} correspondances dérivées via hreflang (sans appel IA)")
+                            result = results_by_lang[lang]
+                            
+                            # Affichage des résultats
+                            matches = derived_matches + result.correspondances
+                            unmatched = result.non_matchees
+                            abandoned = result.abandonnees
+                            
+                            st.success(f"✅ {len(matches)} correspondances proposées")
+                            local_count = sum(1 for m in matches if m.get('methode') == 'local')
+                            if local_count:
+                                st.info(f"⚡ {local_count} paires évidentes résolues localement (sans appel IA)")
+                            if unmatched:
+                                st.warning(f"⚠️ {len(unmatched)} URLs non matchées")
+                            if abandoned:
+                                st.error(f"🛑 {len(abandoned)} URLs abandonnées (aucune réponse exploitable "
+                                         f"de l'IA) : relancez la génération pour les retenter")
+                            
+                            raw_matches.extend(matches)
+                            raw_unmatched.extend(unmatched)
+                            raw_abandoned.extend(abandoned)
                         
-                        cache_file = cache_manager.save_gpt_cache(
-                            old_urls, new_urls, contexte_metier, temperature, gpt_results
-                        )
-                        st.success(f"💾 Résultats sauvegardés en cache: {cache_file}")
+                        # Réutilisation du cache par URL (seules les URLs modifiées ont été envoyées)
+                        if ai_mapper is not None:
+                            mapper_stats = ai_mapper.get_statistics()
+                            if mapper_stats['match_cache_hits']:
+                                st.info(
+                                    f"♻️ {mapper_stats['match_cache_hits']} URLs réutilisées depuis le cache par URL "
+                                    f"({mapper_stats['match_cache_reuse_rate']:.0%}), "
+                                    f"{mapper_stats['match_cache_misses']} envoyées à l'IA"
+                                )
+                            
+                            for tier in mapper_stats.get('tiers', []):
+                                st.info(
+                                    f"🪜 Palier {tier['tier']} : {tier['urls']} URLs, {tier['accepted']} acceptées, "
+                                    f"{tier['escalated']} escaladées ({tier['time_s']:.1f}s)"
+                                )
+                            
+                            if mapper_stats['section_pairs']:
+                                st.info(
+                                    f"🗂️ {mapper_stats['section_pairs']} paires de sections traitées séparément, "
+                                    f"{mapper_stats['section_fallback_urls']} URLs hors section associée"
+                                )
+                            
+                            if mapper_stats['salvaged_responses'] or mapper_stats['bisections']:
+                                st.info(
+                                    f"🩹 {mapper_stats['salvaged_responses']} réponses IA récupérées partiellement, "
+                                    f"{mapper_stats['requeried_urls']} URLs relancées, "
+                                    f"{mapper_stats['bisections']} lots coupés en deux"
+                                )
+                            if mapper_stats['omitted_urls'] or mapper_stats['stray_answers']:
+                                st.info(
+                                    f"🔎 {mapper_stats['omitted_urls']} URLs omises par l'IA "
+                                    f"({mapper_stats['omission_rate']:.1%} des URLs envoyées), relancées en petits lots ; "
+                                    f"{mapper_stats['stray_answers']} réponses hors lot ou en double écartées"
+                                )
+                            if mapper_stats['snapped_targets'] or mapper_stats['hallucinated_targets']:
+                                st.info(
+                                    f"🎯 {mapper_stats['snapped_targets']} cibles IA hors candidates corrigées localement "
+                                    f"(confidence réduite), {mapper_stats['hallucinated_targets']} cibles inventées renvoyées à l'IA"
+                                )
+                            if mapper_stats['abandoned_urls']:
+                                st.warning(f"🛑 {mapper_stats['abandoned_urls']} URLs abandonnées après relances "
+                                           f"et bisection (hors non matchées, hors cache)")
+                        
+                        if ai_mapper is not None:
+                            # Sauvegarde des résultats bruts dans le cache (seuil appliqué à la lecture)
+                            gpt_results = {
+                                "all_matches": raw_matches,
+                                "all_unmatched": raw_unmatched,
+                                "all_abandoned": raw_abandoned,
+                                "missing_langs": missing_langs,
+                                "old_grouped": old_grouped,
+                                "raw": True
+                            }
+                            
+                            cache_file = cache_manager.save_gpt_cache(
+                                old_urls, new_urls, contexte_metier, temperature, gpt_results
+                            )
+                            st.success(f"💾 Résultats sauvegardés en cache: {cache_file}")
+                    
+                    # Seuil de confiance et fan-in appliqués à la lecture des résultats bruts
+                    # (le moteur local applique déjà le fan-in sur ses top-k candidates)
+                    view_fan_in = 0 if use_local_engine else max_fan_in
+                    all_matches, all_unmatched = apply_result_view(
+                        raw_matches, raw_unmatched, confidence_threshold, view_fan_in
+                    )
+                    below_threshold = sum(
+                        1 for match in raw_matches if match.get('confidence', 0) < confidence_threshold
+                    )
+                    if below_threshold:
+                        st.info(f"🎯 {below_threshold} matches exclus (confiance < {confidence_threshold})")
+                    over_fan_in = len(all_unmatched) - len(raw_unmatched) - below_threshold
+                    if over_fan_in:
+                        st.info(f"🧲 {over_fan_in} URLs en surnombre sur leur cible (max {view_fan_in} par cible)")
+                    
+                    # Aperçu instantané d'autres seuils, sans nouvel appel
+                    st.session_state['raw_ai_results'] = {
+                        "matches": raw_matches,
+                        "unmatched": raw_unmatched,
+                        "max_fan_in": view_fan_in,
+                        "threshold": confidence_threshold
+                    }
                     
                     # Les variables all_matches, all_unmatched, etc. sont maintenant disponibles
                     # que ce soit depuis le cache ou depuis l'API GPT
@@ -904,6 +1438,7 @@ https://nouveau-site.com/fr/page2
                             "total_301": len(all_matches),
                             "total_302": len(redirects_302),
                             "unmatched": len(all_unmatched),
+                            "abandoned": len(raw_abandoned),
                             "languages_processed": len(common_langs),
                             "missing_languages": len(missing_langs)
                         }
@@ -914,6 +1449,10 @@ https://nouveau-site.com/fr/page2
                             with st.expander("⚠️ URLs non matchées"):
                                 for url in all_unmatched:
                                     st.text(url)
+                        if raw_abandoned:
+                            with st.expander("🛑 URLs abandonnées (à relancer)"):
+                                for url in raw_abandoned:
+                                    st.text(url)
                     
                     # Sprint 3 - Bouton export CSV fallback 302
                     if enable_fallback_302 and fallback_302_csv_data:
@@ -3,12 +3,62 @@ Mapper IA pour matching sémantique entre URLs (US009)
 Utilise GPT-3.5-turbo pour correspondances intelligentes
 """
 
+import asyncio
 import json
 import time
 import math
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
-from openai import OpenAI
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
+from dataclasses import dataclass, field
+from openai import OpenAI, AsyncOpenAI
+
+try:
+    from rate_limiter import RateLimiter
+    from candidate_index import CandidateIndex
+    from local_matcher import LocalPreMatcher
+    from cache_manager import MatchCache, fingerprint_candidates
+    from token_estimator import TokenEstimator, get_model_limits, get_model_pricing
+    from partial_json import PartialJSONScanner, salvage_json
+    from usage_ledger import UsageLedger
+    from section_mapper import SectionMapper
+    from target_validator import TargetValidator
+except ImportError:
+    from src.rate_limiter import RateLimiter
+    from src.candidate_index import CandidateIndex
+    from src.local_matcher import LocalPreMatcher
+    from src.cache_manager import MatchCache, fingerprint_candidates
+    from src.token_estimator import TokenEstimator, get_model_limits, get_model_pricing
+    from src.partial_json import PartialJSONScanner, salvage_json
+    from src.usage_ledger import UsageLedger
+    from src.section_mapper import SectionMapper
+    from src.target_validator import TargetValidator
+
+
+# Version du prompt et du schéma de réponse, incluse dans les clés du cache par URL :
+# à incrémenter à chaque changement qui modifie les réponses du modèle
+# (2 : meilleure candidate demandée pour chaque URL, même sous 0.7 ;
+#  3 : cibles alternatives pour l'affectation globale)
+PROMPT_VERSION = 3
+
+# Cibles alternatives conservées par ancienne URL (replis de l'affectation globale)
+MAX_ALTERNATIVES = 2
+
+
+def _compact_confidence(value: Any) -> float:
+    """
+    Confidence du protocole compact : toujours un pourcentage (0-100), comme le demande le prompt
+    
+    Args:
+        value: Confidence renvoyée par le modèle
+    
+    Returns:
+        Confidence entre 0.0 et 1.0 (0.0 si la valeur n'est pas un nombre, booléens compris)
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0.0
+    return round(min(max(value / 100, 0.0), 1.0), 2)
 
 
 class AIMatchingError(Exception):
@@ -21,6 +71,8 @@ class MatchResult:
     """Résultat d'un matching IA"""
     correspondances: List[Dict[str, Any]]
     non_matchees: List[str]
+    # URLs sans réponse exploitable après relances et bisection (jamais mises en cache)
+    abandonnees: List[str] = field(default_factory=list)
     
     def get_confidence_stats(self) -> Dict[str, float]:
         """Calcule les statistiques de confidence"""
@@ -33,6 +85,28 @@ class MatchResult:
             "min": min(confidences),
             "max": max(confidences)
         }
+    
+    def filter_confidence(self, min_confidence: float) -> 'MatchResult':
+        """
+        Vue du résultat à un seuil de confidence (le résultat brut n'est pas modifié)
+        
+        Args:
+            min_confidence: Seuil minimum de confidence
+        
+        Returns:
+            Résultat filtré ; les URLs sous le seuil rejoignent les non matchées
+        """
+        return MatchResult(
+            correspondances=[
+                match for match in self.correspondances
+                if match.get("confidence", 0) >= min_confidence
+            ],
+            non_matchees=self.non_matchees + [
+                match["ancienne"] for match in self.correspondances
+                if match.get("confidence", 0) < min_confidence
+            ],
+            abandonnees=list(self.abandonnees)
+        )
 
 
 class AIMapper:
@@ -40,7 +114,19 @@ class AIMapper:
     
     def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", 
                  temperature: float = 0.1, max_retries: int = 3, 
-                 chunk_size: int = 50):
+                 chunk_size: Optional[int] = None, max_concurrency: int = 4,
+                 requests_per_minute: int = 500, tokens_per_minute: int = 200000,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 max_candidates: int = 200, candidates_per_url: int = 20,
+                 pre_matcher: Optional[LocalPreMatcher] = None, local_prematch: bool = True,
+                 compact_protocol: bool = False, match_cache: Optional[MatchCache] = None,
+                 max_input_tokens: Optional[int] = None, bisect_after: int = 2,
+                 omission_batch_size: int = 5, snap_threshold: float = 0.9,
+                 stream: bool = False, client: Optional[Any] = None,
+                 base_url: Optional[str] = None, async_client: Optional[Any] = None,
+                 usage_ledger: Optional[UsageLedger] = None, project: str = "default",
+                 section_mode: Optional[str] = None, section_mapper: Optional[SectionMapper] = None,
+                 tier: Optional[str] = None):
         """
         Initialise le mapper IA
         
@@ -49,25 +135,115 @@ class AIMapper:
             model: Modèle à utiliser (gpt-3.5-turbo par défaut)
             temperature: Température pour le sampling (0.1 = très déterministe)
             max_retries: Nombre maximum de tentatives en cas d'erreur
-            chunk_size: Taille des lots d'URLs (50 par défaut)
+            chunk_size: Taille maximale des lots d'URLs (None = lots remplis selon le budget de tokens)
+            max_concurrency: Nombre maximum de chunks envoyés en parallèle
+            requests_per_minute: Limite RPM du compte OpenAI
+            tokens_per_minute: Limite TPM du compte OpenAI
+            rate_limiter: Limiteur partagé (prioritaire sur les limites RPM/TPM)
+            max_candidates: Nombre maximum de nouvelles URLs par prompt
+            candidates_per_url: Candidates lexicales retenues par ancienne URL
+            pre_matcher: Pré-matcher local personnalisé
+            local_prematch: Si True, résout localement les paires évidentes avant l'IA
+            compact_protocol: Si True, URLs numérotées et réponse en triplets d'indices
+            match_cache: Cache par URL pour ne ré-interroger que les URLs modifiées
+            max_input_tokens: Budget de tokens d'entrée par lot (défaut: selon le contexte du modèle)
+            bisect_after: Tentatives sans progrès avant de couper un lot en deux
+            omission_batch_size: Taille des lots de relance des URLs omises d'une réponse complète
+            snap_threshold: Similarité d'édition minimum pour corriger localement une cible
+                hors candidates (voir TargetValidator)
+            stream: Si True, complétions streamées et correspondances émises dès leur fermeture
+            client: Client compatible OpenAI (enregistrement/rejeu, serveur simulé)
+            base_url: URL d'une API compatible OpenAI (ex: serveur simulé local)
+            async_client: Client compatible AsyncOpenAI pour match_urls_async
+                (défaut: créé à la première utilisation)
+            usage_ledger: Journal de consommation réelle de chaque appel (calibre aussi l'estimateur)
+            project: Projet sous lequel les appels sont journalisés (ex: domaine cible)
+            section_mode: Matching hiérarchique : None (lots à plat), 'local' (sections
+                associées par votes lexicaux) ou 'ai' (un appel au modèle sur les seuls
+                noms de sections, complété par les votes lexicaux)
+            section_mapper: Mapper de sections personnalisé (profondeur, seuils de votes)
+            tier: Palier de cascade journalisé avec chaque appel (voir ModelCascade)
         """
         self.api_key = api_key
         self.model = model
         self.temperature = temperature
         self.max_retries = max_retries
-        self.client = OpenAI(api_key=api_key)
+        self.bisect_after = max(1, bisect_after)
+        self.omission_batch_size = max(1, omission_batch_size)
+        self.snap_threshold = snap_threshold
+        self.stream = stream
+        self.client = client or OpenAI(api_key=api_key, base_url=base_url)
+        self.base_url = base_url
+        self._async_client = async_client
         
-        # Configuration de chunking
+        # Configuration de chunking : lots remplis jusqu'aux budgets d'entrée et de sortie
         self.chunk_size = chunk_size
-        self.max_tokens = 4000
+        self.context_window, model_max_output = get_model_limits(model)
+        self.max_tokens = min(4000, model_max_output)
+        self.output_token_budget = int(self.max_tokens * 0.8)  # Marge contre la troncature
+        self.input_token_budget = max_input_tokens or int((self.context_window - self.max_tokens) * 0.9)
+        self.token_estimator = TokenEstimator(
+            model, output_tokens_per_url=12 if compact_protocol else 50
+        )
+        
+        # Journal des appels : la consommation mesurée des sessions précédentes
+        # sert de point de départ à l'estimateur
+        self.usage_ledger = usage_ledger
+        self.project = project
+        self.tier = tier
+        if usage_ledger is not None:
+            calibration = usage_ledger.calibration(model, "compact" if compact_protocol else "json")
+            if calibration:
+                self.token_estimator.calibrate(**calibration)
+        
+        # Envoi parallèle des chunks sous limites RPM/TPM
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = rate_limiter or RateLimiter(requests_per_minute, tokens_per_minute)
         
-        # Coûts approximatifs (USD pour 1K tokens)
-        self.cost_per_1k_input = 0.0015  # GPT-3.5-turbo input
-        self.cost_per_1k_output = 0.002  # GPT-3.5-turbo output
+        # Présélection des candidates au-delà de max_candidates nouvelles URLs
+        self.max_candidates = max_candidates
+        self.candidates_per_url = candidates_per_url
+        
+        # Pré-matching local déterministe (aucun appel API pour les paires évidentes)
+        self.pre_matcher = pre_matcher or (LocalPreMatcher() if local_prematch else None)
+        
+        # Protocole compact : le modèle renvoie des indices au lieu des URLs
+        self.compact_protocol = compact_protocol
+        
+        # Matching hiérarchique : sections d'abord, puis pages au sein des paires de sections
+        if section_mode not in (None, "local", "ai"):
+            raise ValueError(f"section_mode inconnu: {section_mode}")
+        self.section_mode = section_mode
+        self.section_mapper = section_mapper or (SectionMapper() if section_mode else None)
+        
+        # Cache fin par URL et statistiques de réutilisation
+        self.match_cache = match_cache
+        self.statistics = {
+            'match_cache_hits': 0,
+            'match_cache_misses': 0,
+            'salvaged_responses': 0,
+            'requeried_urls': 0,
+            'requested_urls': 0,
+            'omitted_urls': 0,
+            'stray_answers': 0,
+            'snapped_targets': 0,
+            'hallucinated_targets': 0,
+            'bisections': 0,
+            'abandoned_urls': 0,
+            'section_pairs': 0,
+            'section_fallback_urls': 0
+        }
+        self._stats_lock = threading.Lock()
+        
+        # Coûts approximatifs (USD pour 1K tokens), selon le modèle
+        self.cost_per_1k_input, self.cost_per_1k_output = get_model_pricing(model)
+        self.cached_input_discount = 0.5  # Remise sur les tokens d'entrée servis par le cache de préfixe
+        self.batch_discount = 0.5  # Tarif des requêtes traitées en batch (BatchJobManager)
     
     def match_urls(self, old_urls: List[str], new_urls: List[str], 
                    contexte_metier: str = "", langue: str = "fr",
-                   min_confidence: float = 0.7) -> MatchResult:
+                   min_confidence: float = 0.0,
+                   on_match: Optional[Callable[[Dict[str, Any]], None]] = None) -> MatchResult:
         """
         Effectue le matching sémantique entre deux listes d'URLs
         
@@ -76,7 +252,9 @@ class AIMapper:
             new_urls: URLs du nouveau site
             contexte_metier: Instructions contextuelles du chef de projet
             langue: Langue pour optimiser le prompt
-            min_confidence: Seuil minimum de confidence
+            min_confidence: Seuil minimum de confidence (0.0 = résultat brut, seuil appliqué à la lecture)
+            on_match: Appelé pour chaque correspondance retenue dès son arrivée
+                (depuis les threads de chunks : le callback doit être thread-safe)
             
         Returns:
             Résultat du matching avec correspondances et non-matchées
@@ -84,93 +262,1011 @@ class AIMapper:
         if not old_urls or not new_urls:
             return MatchResult(correspondances=[], non_matchees=old_urls)
         
-        # Chunking pour gérer les gros volumes
-        chunks = self._create_chunks(old_urls, new_urls, self.chunk_size)
+        emit = self._confidence_emitter(on_match, min_confidence)
+        prepared = self._prepare_matching(old_urls, new_urls, contexte_metier, langue)
+        self._emit_prepared(prepared, emit)
+        chunks = prepared["chunks"]
         
-        all_correspondances = []
-        all_non_matchees = []
+        # Envoi concurrent des chunks ; map() conserve l'ordre des chunks
+        chunk_results = []
+        if chunks:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as executor:
+                chunk_results = list(executor.map(
+                    lambda chunk: self._match_chunk(
+                        chunk["old_urls"],
+                        chunk["new_urls"],
+                        contexte_metier,
+                        langue,
+                        emit
+                    ),
+                    chunks
+                ))
         
-        for chunk in chunks:
-            chunk_result = self._match_chunk(
-                chunk["old_urls"], 
-                chunk["new_urls"],
-                contexte_metier, 
-                langue
-            )
-            
-            # Filtrage par confidence
-            valid_matches = [
-                match for match in chunk_result.correspondances 
-                if match.get("confidence", 0) >= min_confidence
-            ]
-            
-            # URLs non matchées = rejetées par confidence + explicitement non matchées
-            rejected_by_confidence = [
-                match["ancienne"] for match in chunk_result.correspondances
-                if match.get("confidence", 0) < min_confidence
-            ]
+        return self.finish_matching(prepared, chunk_results, min_confidence)
+    
+    async def match_urls_async(self, old_urls: List[str], new_urls: List[str],
+                               contexte_metier: str = "", langue: str = "fr",
+                               min_confidence: float = 0.0,
+                               on_match: Optional[Callable[[Dict[str, Any]], None]] = None,
+                               concurrency_limiter: Optional[asyncio.Semaphore] = None) -> MatchResult:
+        """
+        Variante asynchrone de match_urls (client AsyncOpenAI)
+        
+        Mêmes étapes et même résultat que la version synchrone ; les attentes
+        (backoff, limiteur RPM/TPM) ne bloquent pas la boucle d'événements.
+        L'annulation de la tâche annule les lots en cours.
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            contexte_metier: Instructions contextuelles du chef de projet
+            langue: Langue pour optimiser le prompt
+            min_confidence: Seuil minimum de confidence (0.0 = résultat brut, seuil appliqué à la lecture)
+            on_match: Appelé dans la boucle d'événements pour chaque correspondance retenue
+            concurrency_limiter: Sémaphore partagé entre plusieurs appels
+                (défaut: max_concurrency lots en vol pour cet appel)
             
-            all_correspondances.extend(valid_matches)
-            all_non_matchees.extend(chunk_result.non_matchees)
-            all_non_matchees.extend(rejected_by_confidence)
+        Returns:
+            Résultat du matching avec correspondances et non-matchées
+        """
+        if not old_urls or not new_urls:
+            return MatchResult(correspondances=[], non_matchees=old_urls)
+        
+        emit = self._confidence_emitter(on_match, min_confidence)
+        
+        # Index lexical et empreintes calculés hors de la boucle d'événements
+        prepared = await asyncio.to_thread(self._prepare_matching, old_urls, new_urls,
+                                           contexte_metier, langue)
+        self._emit_prepared(prepared, emit)
+        
+        limiter = concurrency_limiter or asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_chunk(chunk: Dict[str, Any]) -> MatchResult:
+            async with limiter:
+                return await self._match_chunk_async(
+                    chunk["old_urls"], chunk["new_urls"], contexte_metier, langue, emit
+                )
+        
+        # gather() conserve l'ordre des chunks ; un échec annule les lots restants
+        tasks = [asyncio.ensure_future(run_chunk(chunk)) for chunk in prepared["chunks"]]
+        try:
+            chunk_results = list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        
+        return await asyncio.to_thread(self.finish_matching, prepared, chunk_results, min_confidence)
+    
+    @property
+    def async_client(self) -> Any:
+        """Client AsyncOpenAI, créé à la première utilisation du mode asynchrone"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._async_client
+    
+    def _confidence_emitter(self, on_match: Optional[Callable[[Dict[str, Any]], None]],
+                            min_confidence: float) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """Enveloppe on_match : les correspondances sous le seuil ne sont pas émises en avance"""
+        if on_match is None:
+            return None
+        
+        def emit(match: Dict[str, Any]):
+            if match.get("confidence", 0) >= min_confidence:
+                on_match(match)
+        
+        return emit
+    
+    def _prepare_matching(self, old_urls: List[str], new_urls: List[str],
+                          contexte_metier: str, langue: str) -> Dict[str, Any]:
+        """
+        Étapes locales du matching, communes aux versions synchrone et asynchrone
+        
+        Returns:
+            Dictionnaire avec local_matches, cached_result, cache_keys et chunks
+        """
+        prepared = {"local_matches": [], "cached_result": None, "cache_keys": {}, "chunks": []}
+        
+        # Pré-matching local : seules les URLs restantes partent vers l'IA
+        if self.pre_matcher is not None:
+            prepared["local_matches"], old_urls = self.pre_matcher.match(old_urls, new_urls)
+            if not old_urls:
+                return prepared
+        
+        # Index lexical partagé entre le cache par URL et le chunking
+        candidate_index = None
+        if len(new_urls) > self.max_candidates:
+            candidate_index = CandidateIndex(new_urls)
+        
+        # Cache par URL : seules les URLs dont les entrées ont changé partent vers l'IA
+        if self.match_cache is not None:
+            prepared["cache_keys"] = self._get_cache_keys(old_urls, new_urls, candidate_index,
+                                                          contexte_metier, langue)
+            prepared["cached_result"], old_urls = self._lookup_match_cache(old_urls, prepared["cache_keys"])
+        
+        # Chunking pour gérer les gros volumes (par paire de sections en mode hiérarchique)
+        if self.section_mode and old_urls:
+            prepared["chunks"] = self._create_section_chunks(old_urls, new_urls, candidate_index,
+                                                             contexte_metier, langue)
+        else:
+            prepared["chunks"] = self._create_chunks(old_urls, new_urls, self.chunk_size,
+                                                     candidate_index=candidate_index,
+                                                     contexte_metier=contexte_metier, langue=langue)
+        return prepared
+    
+    def _create_section_chunks(self, old_urls: List[str], new_urls: List[str],
+                               candidate_index: Optional[CandidateIndex],
+                               contexte_metier: str, langue: str) -> List[Dict[str, List[str]]]:
+        """
+        Lots du matching hiérarchique
+        
+        Les sections anciennes sont associées aux sections nouvelles, puis
+        chaque paire de sections est découpée en lots qui ne montrent que
+        les pages de ses sections nouvelles. Les paires sont indépendantes :
+        leurs lots partent en parallèle dans le même pool. Les pages d'une
+        section sans association gardent toutes les candidates.
+        """
+        if candidate_index is None:
+            candidate_index = CandidateIndex(new_urls)
+        section_map = self.section_mapper.map_sections(old_urls, new_urls, candidate_index)
+        
+        if self.section_mode == "ai":
+            # Associations du modèle, complétées par les votes lexicaux
+            model_map = self._map_sections_with_model(old_urls, new_urls, contexte_metier, langue)
+            for section, targets in model_map.items():
+                section_map[section] = sorted(set(targets) | set(section_map.get(section, [])))
+        
+        pairs, unmapped = self.section_mapper.plan(old_urls, new_urls, section_map)
+        self._count('section_pairs', len(pairs))
+        self._count('section_fallback_urls', len(unmapped))
+        
+        chunks = []
+        for pair_old_urls, pair_new_urls in pairs:
+            chunks.extend(self._create_chunks(pair_old_urls, pair_new_urls, self.chunk_size,
+                                              contexte_metier=contexte_metier, langue=langue))
+        if unmapped:
+            chunks.extend(self._create_chunks(unmapped, new_urls, self.chunk_size,
+                                              candidate_index=candidate_index,
+                                              contexte_metier=contexte_metier, langue=langue))
+        return chunks
+    
+    def _map_sections_with_model(self, old_urls: List[str], new_urls: List[str],
+                                 contexte_metier: str, langue: str) -> Dict[str, List[str]]:
+        """
+        Associe les sections en un seul appel au modèle, sur les noms de sections
+        
+        Les sections (ex: '/fr/logements/') sont soumises comme des URLs :
+        même prompt, même décodage, mêmes relances et même journal que les pages.
+        
+        Returns:
+            {section ancienne: [section nouvelle]} pour les associations retenues
+        """
+        old_sections = list(self.section_mapper.group(old_urls))
+        new_sections = list(self.section_mapper.group(new_urls))
+        if len(new_sections) < 2:
+            return {section: new_sections for section in old_sections}
+        
+        result = self._match_chunk(old_sections, new_sections, contexte_metier, langue)
+        return {
+            match["ancienne"]: [match["nouvelle"]]
+            for match in result.correspondances
+            if match.get("confidence", 0) >= 0.5
+        }
+    
+    def _emit_prepared(self, prepared: Dict[str, Any],
+                       emit: Optional[Callable[[Dict[str, Any]], None]]):
+        """Émet les correspondances locales et celles du cache par URL"""
+        if emit is None:
+            return
+        
+        for match in prepared["local_matches"]:
+            emit(match)
+        if prepared["cached_result"] is not None:
+            for match in prepared["cached_result"].correspondances:
+                emit(match)
+    
+    def prepare_requests(self, old_urls: List[str], new_urls: List[str],
+                         contexte_metier: str = "", langue: str = "fr") -> Dict[str, Any]:
+        """
+        Prépare un matching différé (API Batch) : étapes locales puis requêtes des lots
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            contexte_metier: Instructions contextuelles du chef de projet
+            langue: Langue pour optimiser le prompt
+        
+        Returns:
+            Dictionnaire avec local_matches, cached_result, cache_keys et chunks ;
+            chaque lot porte old_urls, new_urls, params (corps de l'appel),
+            raw_prompt_tokens et estimated_tokens
+        """
+        prepared = self._prepare_matching(old_urls, new_urls, contexte_metier, langue)
+        for chunk in prepared["chunks"]:
+            request = self._build_request(chunk["old_urls"], chunk["new_urls"], contexte_metier, langue)
+            chunk["params"] = request["params"]
+            chunk["raw_prompt_tokens"] = request["raw_prompt_tokens"]
+            chunk["estimated_tokens"] = request["estimated_tokens"]
+        return prepared
+    
+    def finish_response(self, chunk: Dict[str, Any], content: str,
+                        usage: Any = None) -> Tuple[MatchResult, List[str], str]:
+        """
+        Décode et réconcilie la réponse différée d'un lot de prepare_requests
+        
+        Args:
+            chunk: Lot préparé (old_urls, new_urls, raw_prompt_tokens, estimated_tokens)
+            content: Contenu de la réponse du modèle
+            usage: Consommation de l'appel (objet à la forme de response.usage)
+        
+        Returns:
+            Tuple (résultat réconcilié, URLs du lot sans réponse valide,
+            issue du décodage 'ok', 'salvaged' ou 'empty')
+        """
+        request = {
+            "raw_prompt_tokens": chunk["raw_prompt_tokens"],
+            "estimated_tokens": chunk["estimated_tokens"],
+            "candidates": chunk["new_urls"],
+            "batch": True
+        }
+        return self._finish_request(request, content, usage, chunk["old_urls"], chunk["new_urls"],
+                                    None, set())
+    
+    def requery(self, old_urls: List[str], new_urls: List[str], contexte_metier: str = "",
+                langue: str = "fr", omitted: bool = False) -> MatchResult:
+        """
+        Relance en interactif des URLs restées sans réponse exploitable
+        
+        Args:
+            old_urls: URLs à relancer
+            new_urls: Candidates de leur lot
+            contexte_metier: Instructions contextuelles du chef de projet
+            langue: Langue pour optimiser le prompt
+            omitted: URLs omises d'une réponse complète (relancées en petits lots)
+        
+        Returns:
+            Résultat brut (sans seuil), avec les URLs abandonnées à part
+        """
+        batches = self._omission_batches(old_urls) if omitted else [old_urls]
+        results = [self._match_chunk(batch, new_urls, contexte_metier, langue) for batch in batches]
+        return MatchResult(
+            correspondances=[match for result in results for match in result.correspondances],
+            non_matchees=[url for result in results for url in result.non_matchees],
+            abandonnees=[url for result in results for url in result.abandonnees]
+        )
+    
+    def finish_matching(self, prepared: Dict[str, Any], chunk_results: List[MatchResult],
+                        min_confidence: float = 0.0) -> MatchResult:
+        """
+        Met en cache les résultats bruts des chunks puis applique le seuil de confidence
+        
+        Args:
+            prepared: Préparation du matching (prepare_requests ou interne)
+            chunk_results: Résultat brut de chaque lot, dans l'ordre des lots
+            min_confidence: Seuil minimum de confidence (0.0 = résultat brut)
+        
+        Returns:
+            Résultat final : locales, cache par URL et lots
+        """
+        if self.match_cache is not None:
+            for chunk, chunk_result in zip(prepared["chunks"], chunk_results):
+                self._store_match_cache(chunk["old_urls"], chunk_result, prepared["cache_keys"])
+        
+        all_correspondances = list(prepared["local_matches"])
+        all_non_matchees = []
+        all_abandonnees = []
+        
+        if prepared["cached_result"] is not None:
+            chunk_results = [prepared["cached_result"]] + chunk_results
+        
+        for chunk_result in chunk_results:
+            # URLs non matchées = explicitement non matchées + rejetées par confidence ;
+            # les URLs abandonnées restent à part (aucune réponse du modèle)
+            filtered = chunk_result.filter_confidence(min_confidence)
+            all_correspondances.extend(filtered.correspondances)
+            all_non_matchees.extend(filtered.non_matchees)
+            all_abandonnees.extend(filtered.abandonnees)
         
         return MatchResult(
             correspondances=all_correspondances,
-            non_matchees=all_non_matchees
+            non_matchees=all_non_matchees,
+            abandonnees=all_abandonnees
         )
     
+    def iter_matches(self, old_urls: List[str], new_urls: List[str],
+                     contexte_metier: str = "", langue: str = "fr",
+                     min_confidence: float = 0.0) -> Iterator[Dict[str, Any]]:
+        """
+        Itère sur les correspondances au fil de leur arrivée
+        
+        Le matching tourne dans un thread ; les correspondances sont livrées
+        dans le thread appelant (compatible Streamlit). Le MatchResult final
+        est la valeur de retour du générateur (StopIteration.value).
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            contexte_metier: Instructions contextuelles du chef de projet
+            langue: Langue pour optimiser le prompt
+            min_confidence: Seuil minimum de confidence (0.0 = résultat brut, seuil appliqué à la lecture)
+        
+        Yields:
+            Correspondances retenues, dans leur ordre d'arrivée
+        """
+        events = queue.Queue()
+        finished = object()
+        outcome = {}
+        
+        def run():
+            try:
+                outcome["result"] = self.match_urls(
+                    old_urls, new_urls, contexte_metier, langue, min_confidence,
+                    on_match=events.put
+                )
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                events.put(finished)
+        
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        
+        while True:
+            event = events.get()
+            if event is finished:
+                break
+            yield event
+        
+        worker.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+    
+    def _get_cache_keys(self, old_urls: List[str], new_urls: List[str],
+                        candidate_index: Optional[CandidateIndex],
+                        contexte_metier: str, langue: str) -> Dict[str, str]:
+        """Calcule la clé du cache par URL de chaque ancienne URL"""
+        full_fingerprint = fingerprint_candidates(new_urls)
+        
+        cache_keys = {}
+        for url in old_urls:
+            if candidate_index is None:
+                fingerprint = full_fingerprint
+            else:
+                # Candidates propres à l'URL : stables quelle que soit la composition du lot
+                # (sans candidate lexicale, l'URL reçoit des candidates de repli : liste complète)
+                candidates = candidate_index.candidates_for(
+                    [url], k_per_url=self.candidates_per_url, max_candidates=self.max_candidates
+                )
+                fingerprint = fingerprint_candidates(candidates) if candidates else full_fingerprint
+            cache_keys[url] = MatchCache.make_key(
+                url, fingerprint, contexte_metier, langue, self.model, self.temperature,
+                section_mode=self.section_mode, prompt_version=PROMPT_VERSION,
+                compact_protocol=self.compact_protocol
+            )
+        
+        return cache_keys
+    
+    def _lookup_match_cache(self, old_urls: List[str],
+                            cache_keys: Dict[str, str]) -> Tuple[MatchResult, List[str]]:
+        """Sépare les URLs déjà en cache de celles à envoyer à l'IA"""
+        correspondances = []
+        non_matchees = []
+        remaining = []
+        
+        for url in old_urls:
+            entry = self.match_cache.get(cache_keys[url])
+            if entry is None:
+                remaining.append(url)
+                continue
+            
+            if entry.get("correspondance"):
+                correspondances.append(entry["correspondance"])
+            else:
+                non_matchees.append(url)
+        
+        self._count('match_cache_hits', len(old_urls) - len(remaining))
+        self._count('match_cache_misses', len(remaining))
+        
+        return MatchResult(correspondances=correspondances, non_matchees=non_matchees), remaining
+    
+    def _store_match_cache(self, old_urls: List[str], chunk_result: MatchResult,
+                           cache_keys: Dict[str, str]):
+        """
+        Enregistre les résultats bruts d'un chunk dans le cache par URL
+        
+        Seules les réponses du modèle sont mises en cache : une URL abandonnée
+        (réponses invalides ou cibles inventées répétées) repart au passage suivant.
+        """
+        by_old_url = {match.get("ancienne"): match for match in chunk_result.correspondances}
+        unmatched = set(chunk_result.non_matchees)
+        
+        for url in old_urls:
+            if url in by_old_url:
+                self.match_cache.put(cache_keys[url], url, by_old_url[url])
+            elif url in unmatched:
+                self.match_cache.put(cache_keys[url], url, None)
+    
+    def _count(self, name: str, amount: int = 1):
+        """Incrémente une statistique (appelé depuis les threads de chunks)"""
+        with self._stats_lock:
+            self.statistics[name] += amount
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques cumulées du mapper
+        
+        Returns:
+            Dictionnaire avec les statistiques (cache par URL, récupération des réponses,
+            taux d'omission : URLs absentes d'une réponse complète / URLs envoyées)
+        """
+        with self._stats_lock:
+            stats = dict(self.statistics)
+        total = stats['match_cache_hits'] + stats['match_cache_misses']
+        stats['match_cache_reuse_rate'] = stats['match_cache_hits'] / total if total else 0.0
+        stats['omission_rate'] = stats['omitted_urls'] / stats['requested_urls'] if stats['requested_urls'] else 0.0
+        return stats
+    
+    def get_usage_summary(self) -> Optional[Dict[str, Any]]:
+        """
+        Consommation mesurée du projet (totaux et percentiles du journal)
+        
+        Returns:
+            Résumé UsageLedger.summary du projet, None sans journal
+        """
+        if self.usage_ledger is None:
+            return None
+        return self.usage_ledger.summary(self.project)
+    
     def _match_chunk(self, old_urls: List[str], new_urls: List[str],
-                     contexte_metier: str, langue: str) -> MatchResult:
-        """Traite un chunk d'URLs avec retry automatique"""
+                     contexte_metier: str, langue: str,
+                     on_match: Optional[Callable[[Dict[str, Any]], None]] = None) -> MatchResult:
+        """
+        Traite un chunk avec récupération partielle et bisection
+        
+        Les correspondances valides d'une réponse tronquée ou mal formée sont
+        conservées et seules les URLs sans réponse sont renvoyées au modèle.
+        Les URLs omises d'une réponse complète sont relancées en petits lots
+        de `omission_batch_size`. Après `bisect_after` tentatives sans progrès,
+        le lot est coupé en deux : une URL problématique ne peut plus faire
+        échouer tout le lot.
+        """
+        correspondances = []
+        non_matchees = []
+        abandonnees = []
+        pending = list(old_urls)
+        stalled = 0
+        
+        while pending:
+            result, missing, outcome = self._request_chunk(pending, new_urls, contexte_metier, langue, on_match)
+            correspondances.extend(result.correspondances)
+            non_matchees.extend(result.non_matchees)
+            
+            action, stalled = self._next_chunk_action(pending, missing, stalled, outcome)
+            if action == "requery":
+                pending = missing
+            elif action == "split":
+                for batch in self._omission_batches(missing):
+                    batch_result = self._match_chunk(batch, new_urls, contexte_metier, langue, on_match)
+                    correspondances.extend(batch_result.correspondances)
+                    non_matchees.extend(batch_result.non_matchees)
+                    abandonnees.extend(batch_result.abandonnees)
+                break
+            elif action == "bisect":
+                middle = len(pending) // 2
+                for half in (pending[:middle], pending[middle:]):
+                    half_result = self._match_chunk(half, new_urls, contexte_metier, langue, on_match)
+                    correspondances.extend(half_result.correspondances)
+                    non_matchees.extend(half_result.non_matchees)
+                    abandonnees.extend(half_result.abandonnees)
+                break
+            elif action == "abandon":
+                abandonnees.extend(pending)
+                break
+        
+        return MatchResult(correspondances=correspondances, non_matchees=non_matchees,
+                           abandonnees=abandonnees)
+    
+    async def _match_chunk_async(self, old_urls: List[str], new_urls: List[str],
+                                 contexte_metier: str, langue: str,
+                                 on_match: Optional[Callable[[Dict[str, Any]], None]] = None) -> MatchResult:
+        """Variante asynchrone de _match_chunk (mêmes décisions de relance et de bisection)"""
+        correspondances = []
+        non_matchees = []
+        abandonnees = []
+        pending = list(old_urls)
+        stalled = 0
+        
+        while pending:
+            result, missing, outcome = await self._request_chunk_async(pending, new_urls, contexte_metier,
+                                                                       langue, on_match)
+            correspondances.extend(result.correspondances)
+            non_matchees.extend(result.non_matchees)
+            
+            action, stalled = self._next_chunk_action(pending, missing, stalled, outcome)
+            if action == "requery":
+                pending = missing
+            elif action == "split":
+                for batch in self._omission_batches(missing):
+                    batch_result = await self._match_chunk_async(batch, new_urls, contexte_metier,
+                                                                 langue, on_match)
+                    correspondances.extend(batch_result.correspondances)
+                    non_matchees.extend(batch_result.non_matchees)
+                    abandonnees.extend(batch_result.abandonnees)
+                break
+            elif action == "bisect":
+                middle = len(pending) // 2
+                for half in (pending[:middle], pending[middle:]):
+                    half_result = await self._match_chunk_async(half, new_urls, contexte_metier,
+                                                                langue, on_match)
+                    correspondances.extend(half_result.correspondances)
+                    non_matchees.extend(half_result.non_matchees)
+                    abandonnees.extend(half_result.abandonnees)
+                break
+            elif action == "abandon":
+                abandonnees.extend(pending)
+                break
+        
+        return MatchResult(correspondances=correspondances, non_matchees=non_matchees,
+                           abandonnees=abandonnees)
+    
+    def _next_chunk_action(self, pending: List[str], missing: List[str],
+                           stalled: int, outcome: str = "ok") -> Tuple[str, int]:
+        """
+        Décide de la suite d'un lot après une réponse
+        
+        Returns:
+            Tuple (action, tentatives sans progrès) ; action parmi
+            'requery' (relance des URLs manquantes), 'split' (relance des URLs
+            omises en petits lots), 'retry', 'bisect' et 'abandon'
+        """
+        if len(missing) < len(pending):
+            # Progrès : on ne relance que les URLs restées sans réponse
+            if missing:
+                self._count('requeried_urls', len(missing))
+            if outcome == "ok" and len(missing) > self.omission_batch_size:
+                # Réponse complète qui omet des URLs : petits lots plutôt que tout le reste
+                return "split", 0
+            return "requery", 0
+        
+        stalled += 1
+        
+        if len(pending) > 1 and stalled >= min(self.bisect_after, self.max_retries):
+            self._count('bisections')
+            return "bisect", stalled
+        
+        if len(pending) == 1 and stalled >= self.max_retries:
+            # URL isolée sans réponse exploitable : non matchée plutôt qu'un échec global
+            self._count('abandoned_urls')
+            return "abandon", stalled
+        
+        return "retry", stalled
+    
+    def _omission_batches(self, urls: List[str]) -> List[List[str]]:
+        """Découpe des URLs omises en lots de relance de `omission_batch_size`"""
+        size = self.omission_batch_size
+        return [urls[start:start + size] for start in range(0, len(urls), size)]
+    
+    def _build_request(self, old_urls: List[str], new_urls: List[str],
+                       contexte_metier: str, langue: str) -> Dict[str, Any]:
+        """Construit les paramètres d'appel et les estimations de tokens d'un lot"""
+        prompt = self._render_prompt(old_urls, new_urls, contexte_metier, langue)
+        system_prompt = self._get_system_prompt(contexte_metier)
+        
+        return {
+            "params": {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens
+            },
+            "raw_prompt_tokens": self.token_estimator.count_raw(system_prompt + prompt),
+            "estimated_tokens": self._estimate_request_tokens(system_prompt + prompt, len(old_urls)),
+            "candidates": new_urls,
+            "validator": TargetValidator(new_urls, snap_threshold=self.snap_threshold)
+        }
+    
+    def _request_chunk(self, old_urls: List[str], new_urls: List[str],
+                       contexte_metier: str, langue: str,
+                       on_match: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[MatchResult, List[str], str]:
+        """
+        Envoie un lot au modèle (retry sur erreur API) et décode la réponse
+        
+        Returns:
+            Tuple (résultat réconcilié, URLs anciennes restées sans réponse,
+            issue du décodage 'ok', 'salvaged' ou 'empty')
+        """
+        request = self._build_request(old_urls, new_urls, contexte_metier, langue)
+        emitted = set()
         
         for attempt in range(self.max_retries):
             try:
-                # Construction du prompt
-                prompt = self._build_prompt(old_urls, new_urls, contexte_metier, langue)
+                # Réservation RPM/TPM avant l'appel
+                self.rate_limiter.acquire(request["estimated_tokens"])
+                request["retries"], started = attempt, time.perf_counter()
                 
-                # Appel à l'API OpenAI
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": self._get_system_prompt(contexte_metier)
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens
-                )
+                if self.stream:
+                    content, usage = self._stream_completion(
+                        request["params"], old_urls, new_urls, on_match, emitted, request["validator"]
+                    )
+                    request["latency_s"] = time.perf_counter() - started
+                    break
                 
-                # Parse la réponse
+                # Appel à l'API OpenAI
+                response = self.client.chat.completions.create(**request["params"])
+                request["latency_s"] = time.perf_counter() - started
                 content = response.choices[0].message.content
-                result_data = self._parse_ai_response(content)
-                
-                return MatchResult(
-                    correspondances=result_data.get("correspondances", []),
-                    non_matchees=result_data.get("non_matchees", [])
-                )
+                usage = getattr(response, "usage", None)
+                break
                 
             except Exception as e:
                 if attempt == self.max_retries - 1:
+                    self._record_call(request, None, len(old_urls), "api_error")
                     raise AIMatchingError(f"Échec du matching IA après {self.max_retries} tentatives: {e}")
                 
                 # Délai exponentiel entre les tentatives
                 time.sleep(2 ** attempt)
+        
+        return self._finish_request(request, content, usage, old_urls, new_urls, on_match, emitted)
+    
+    async def _request_chunk_async(self, old_urls: List[str], new_urls: List[str],
+                                   contexte_metier: str, langue: str,
+                                   on_match: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[MatchResult, List[str], str]:
+        """Variante asynchrone de _request_chunk (attentes non bloquantes, annulable)"""
+        request = self._build_request(old_urls, new_urls, contexte_metier, langue)
+        emitted = set()
+        
+        for attempt in range(self.max_retries):
+            try:
+                await self.rate_limiter.acquire_async(request["estimated_tokens"])
+                request["retries"], started = attempt, time.perf_counter()
+                
+                if self.stream:
+                    content, usage = await self._stream_completion_async(
+                        request["params"], old_urls, new_urls, on_match, emitted, request["validator"]
+                    )
+                    request["latency_s"] = time.perf_counter() - started
+                    break
+                
+                response = await self.async_client.chat.completions.create(**request["params"])
+                request["latency_s"] = time.perf_counter() - started
+                content = response.choices[0].message.content
+                usage = getattr(response, "usage", None)
+                break
+                
+            except Exception as e:
+                # asyncio.CancelledError n'hérite pas d'Exception : l'annulation n'est pas relancée
+                if attempt == self.max_retries - 1:
+                    self._record_call(request, None, len(old_urls), "api_error")
+                    raise AIMatchingError(f"Échec du matching IA après {self.max_retries} tentatives: {e}")
+                
+                await asyncio.sleep(2 ** attempt)
+        
+        return self._finish_request(request, content, usage, old_urls, new_urls, on_match, emitted)
+    
+    def _finish_request(self, request: Dict[str, Any], content: Any, usage: Any,
+                        old_urls: List[str], new_urls: List[str],
+                        on_match: Optional[Callable[[Dict[str, Any]], None]],
+                        emitted: set) -> Tuple[MatchResult, List[str], str]:
+        """Corrige limiteur et estimateur, décode et réconcilie la réponse, émet les correspondances"""
+        # Correction de la réservation et de l'estimateur avec la consommation réelle
+        # (réponse de batch : rien n'a été réservé auprès du limiteur)
+        if not request.get("batch"):
+            self.rate_limiter.record_usage(request["estimated_tokens"], self._get_usage_tokens(usage))
+        self.token_estimator.record_usage(request["raw_prompt_tokens"], len(old_urls), usage)
+        
+        result_data, outcome = self._decode_response(content if isinstance(content, str) else "",
+                                                     old_urls, new_urls)
+        validator = request.get("validator") or TargetValidator(new_urls, snap_threshold=self.snap_threshold)
+        result, missing, hallucinated = self._reconcile_response(result_data, old_urls, validator)
+        
+        # Réponse complète mais sans certaines URLs du lot : omissions du modèle
+        # (ni les URLs manquantes d'une réponse tronquée, ni les cibles inventées)
+        omitted = len(missing) - hallucinated if outcome == "ok" else 0
+        self._count('requested_urls', len(old_urls))
+        self._count('omitted_urls', omitted)
+        self._record_call(request, usage, len(old_urls), outcome, omitted)
+        
+        # Correspondances pas encore émises pendant le streaming (ou mode non streamé)
+        if on_match is not None:
+            for match in result.correspondances:
+                if match.get("ancienne") not in emitted:
+                    on_match(match)
+        
+        return result, missing, outcome
+    
+    def _reconcile_response(self, data: Dict[str, Any], old_urls: List[str],
+                            validator: TargetValidator) -> Tuple[MatchResult, List[str], int]:
+        """
+        Confronte une réponse décodée aux URLs envoyées et aux candidates
+        
+        Les réponses à des URLs hors du lot et les réponses en double sont
+        écartées ; une correspondance l'emporte sur un non-match de la même URL.
+        Une cible proche d'une candidate est corrigée localement (confidence
+        réduite) ; une cible inventée renvoie l'URL au modèle.
+        
+        Returns:
+            Tuple (résultat réconcilié, URLs du lot sans réponse valide,
+            nombre de cibles inventées parmi elles)
+        """
+        expected = set(old_urls)
+        answered = set()
+        correspondances = []
+        non_matchees = []
+        
+        rejected = set()
+        
+        for match in data.get("correspondances", []):
+            url = match.get("ancienne") if isinstance(match, dict) else None
+            if not isinstance(url, str) or url not in expected or url in answered \
+                    or not isinstance(match.get("nouvelle"), str):
+                continue
+            
+            target, similarity = validator.resolve(match["nouvelle"])
+            if target is None:
+                rejected.add(url)
+                continue
+            if target != match["nouvelle"]:
+                # Cible corrigée localement : aucune relance du modèle
+                self._count('snapped_targets')
+                match = {
+                    **match,
+                    "nouvelle": target,
+                    "confidence": round(match.get("confidence", 0) * similarity, 2),
+                    "raison": f"{match.get('raison', '')} (cible corrigée : {match['nouvelle']})".strip()
+                }
+            answered.add(url)
+            correspondances.append(self._resolve_alternatives(match, validator))
+        
+        for url in data.get("non_matchees", []):
+            if isinstance(url, str) and url in expected and url not in answered:
+                answered.add(url)
+                non_matchees.append(url)
+        
+        # Cibles inventées : l'URL repart vers le modèle (sauf non-match explicite)
+        hallucinated = len(rejected - answered)
+        self._count('hallucinated_targets', hallucinated)
+        stray = len(data.get("correspondances", [])) + len(data.get("non_matchees", [])) \
+            - len(answered | rejected)
+        if stray:
+            self._count('stray_answers', stray)
+        
+        return (MatchResult(correspondances=correspondances, non_matchees=non_matchees),
+                [url for url in old_urls if url not in answered], hallucinated)
+    
+    def _resolve_alternatives(self, match: Dict[str, Any], validator: TargetValidator) -> Dict[str, Any]:
+        """
+        Valide les cibles alternatives d'une correspondance
+        
+        Une alternative inventée est simplement écartée (aucune relance) ;
+        une alternative proche d'une candidate est corrigée, confidence réduite.
+        """
+        proposed = match.get("alternatives")
+        match = {key: value for key, value in match.items() if key != "alternatives"}
+        alternatives = []
+        seen = {match["nouvelle"]}
+        
+        for alternative in proposed if isinstance(proposed, list) else []:
+            if not isinstance(alternative, dict) or not isinstance(alternative.get("nouvelle"), str):
+                continue
+            target, similarity = validator.resolve(alternative["nouvelle"])
+            if target is None or target in seen:
+                continue
+            seen.add(target)
+            confidence = alternative.get("confidence", 0)
+            confidence = confidence if isinstance(confidence, (int, float)) else 0.0
+            alternatives.append({"nouvelle": target, "confidence": round(confidence * similarity, 2)})
+            if len(alternatives) == MAX_ALTERNATIVES:
+                break
+        
+        if alternatives:
+            match["alternatives"] = alternatives
+        return match
+    
+    def _decode_response(self, content: str, old_urls: List[str],
+                         new_urls: List[str]) -> Tuple[Dict[str, Any], str]:
+        """
+        Décode une réponse ; si elle est invalide, récupère ses éléments complets
+        
+        Returns:
+            Tuple (données décodées, issue 'ok', 'salvaged' ou 'empty')
+        """
+        try:
+            if self.compact_protocol:
+                return self._parse_compact_response(content, old_urls, new_urls), "ok"
+            return self._parse_ai_response(content), "ok"
+        except AIMatchingError:
+            pass
+        
+        decoded = self._decode_salvaged(salvage_json(content), old_urls, new_urls)
+        if decoded["correspondances"] or decoded["non_matchees"]:
+            self._count('salvaged_responses')
+            return decoded, "salvaged"
+        return decoded, "empty"
+    
+    def _record_call(self, request: Dict[str, Any], usage: Any, nb_old_urls: int, outcome: str,
+                     omitted: int = 0):
+        """Journalise la consommation mesurée d'un appel (sans journal : rien)"""
+        if self.usage_ledger is None:
+            return
+        
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else None
+        completion_tokens = completion_tokens if isinstance(completion_tokens, int) else None
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+        cached_tokens = cached_tokens if isinstance(cached_tokens, int) else 0
+        
+        billed_input = (prompt_tokens or 0) - cached_tokens * self.cached_input_discount
+        cost = (billed_input / 1000) * self.cost_per_1k_input
+        cost += ((completion_tokens or 0) / 1000) * self.cost_per_1k_output
+        if request.get("batch"):
+            cost *= self.batch_discount
+        
+        self.usage_ledger.record(self.project, {
+            "model": self.model,
+            "protocol": "compact" if self.compact_protocol else "json",
+            "stream": self.stream,
+            "mode": "batch" if request.get("batch") else "interactif",
+            "tier": self.tier,
+            "chunk_size": nb_old_urls,
+            "candidates": len(request["candidates"]),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "total_tokens": self._get_usage_tokens(usage),
+            "raw_prompt_tokens": request["raw_prompt_tokens"],
+            "estimated_tokens": request["estimated_tokens"],
+            "latency_s": round(request.get("latency_s", 0.0), 4),
+            "retries": request.get("retries", 0),
+            "parse_outcome": outcome,
+            "omitted_urls": omitted,
+            "cost_usd": round(cost, 6)
+        })
+    
+    def _decode_salvaged(self, data: Dict[str, List[Any]], old_urls: List[str],
+                         new_urls: List[str]) -> Dict[str, Any]:
+        """Garde les éléments récupérés qui concernent bien les URLs du lot"""
+        if self.compact_protocol:
+            return self._decode_compact_data(data, old_urls, new_urls)
+        
+        expected = set(old_urls)
+        return {
+            "correspondances": [
+                match for match in data.get("correspondances", [])
+                if isinstance(match, dict) and match.get("ancienne") in expected
+                and isinstance(match.get("nouvelle"), str)
+            ],
+            "non_matchees": [url for url in data.get("non_matchees", []) if url in expected]
+        }
+    
+    def _stream_completion(self, params: Dict[str, Any],
+                           old_urls: List[str], new_urls: List[str],
+                           on_match: Optional[Callable[[Dict[str, Any]], None]],
+                           emitted: set, validator: TargetValidator) -> Tuple[str, Any]:
+        """
+        Consomme une complétion streamée en émettant chaque correspondance dès sa fermeture
+        
+        Seules les cibles présentes parmi les candidates sont émises en avance ;
+        les autres le sont après validation de la réponse complète.
+        
+        Returns:
+            Tuple (texte complet reçu, response.usage du dernier événement)
+        """
+        stream = self.client.chat.completions.create(
+            **params, stream=True, stream_options={"include_usage": True}
+        )
+        
+        scanner = PartialJSONScanner()
+        parts = []
+        usage = None
+        
+        try:
+            for event in stream:
+                usage = self._consume_stream_event(event, scanner, parts, old_urls, new_urls,
+                                                   on_match, emitted, validator) or usage
+        except Exception:
+            # Flux interrompu : le texte déjà reçu sera récupéré partiellement
+            if not parts:
+                raise
+        
+        return "".join(parts), usage
+    
+    async def _stream_completion_async(self, params: Dict[str, Any],
+                                       old_urls: List[str], new_urls: List[str],
+                                       on_match: Optional[Callable[[Dict[str, Any]], None]],
+                                       emitted: set, validator: TargetValidator) -> Tuple[str, Any]:
+        """Variante asynchrone de _stream_completion"""
+        stream = await self.async_client.chat.completions.create(
+            **params, stream=True, stream_options={"include_usage": True}
+        )
+        
+        scanner = PartialJSONScanner()
+        parts = []
+        usage = None
+        
+        try:
+            async for event in stream:
+                usage = self._consume_stream_event(event, scanner, parts, old_urls, new_urls,
+                                                   on_match, emitted, validator) or usage
+        except Exception:
+            if not parts:
+                raise
+        
+        return "".join(parts), usage
+    
+    def _consume_stream_event(self, event: Any, scanner: PartialJSONScanner, parts: List[str],
+                              old_urls: List[str], new_urls: List[str],
+                              on_match: Optional[Callable[[Dict[str, Any]], None]],
+                              emitted: set, validator: TargetValidator) -> Any:
+        """Traite un événement de flux ; retourne son usage éventuel"""
+        usage = getattr(event, "usage", None)
+        if not event.choices:
+            return usage
+        
+        delta = event.choices[0].delta.content
+        if not delta:
+            return usage
+        parts.append(delta)
+        
+        for key, element in scanner.feed(delta):
+            decoded = self._decode_salvaged({key: [element]}, old_urls, new_urls)
+            for match in decoded["correspondances"]:
+                if match["ancienne"] in emitted or match["nouvelle"] not in validator:
+                    continue
+                emitted.add(match["ancienne"])
+                if on_match is not None:
+                    on_match(match)
+        
+        return usage
+    
+    def _estimate_request_tokens(self, prompt_text: str, nb_old_urls: int) -> int:
+        """Estime les tokens d'un appel (entrée + sortie) pour le limiteur TPM"""
+        input_tokens = self.token_estimator.count(prompt_text)
+        output_tokens = min(self.max_tokens, self.token_estimator.estimate_output(nb_old_urls))
+        return input_tokens + output_tokens
+    
+    def _get_usage_tokens(self, usage) -> Optional[int]:
+        """Extrait response.usage.total_tokens si disponible"""
+        total_tokens = getattr(usage, "total_tokens", None)
+        return total_tokens if isinstance(total_tokens, int) else None
     
     def _get_system_prompt(self, contexte_metier: str) -> str:
         """Construit le prompt système avec contexte métier"""
         
-        base_prompt = """Tu es un expert en redirections 301 pour des refontes de sites web.
+        if self.compact_protocol:
+            confidence_rules = (
+                "- Score de confidence entier entre 0 et 100\n"
+                "- Pour chaque ancienne URL, donner la meilleure nouvelle URL avec sa confidence, "
+                "même faible : le seuil est appliqué ensuite\n"
+                '- Placer dans "u" uniquement les URLs sans aucune nouvelle URL en rapport\n'
+                f'- Ajouter dans "a" jusqu\'à {MAX_ALTERNATIVES} autres nouvelles URLs plausibles par ancienne URL'
+            )
+            format_rule = ('- Format compact par indices : {"m": [[i_ancienne, i_nouvelle, confidence], ...], '
+                           '"a": [[i_ancienne, i_nouvelle, confidence], ...], "u": [i_ancienne, ...]}')
+        else:
+            confidence_rules = (
+                "- Score de confidence entre 0.0 et 1.0\n"
+                "- Pour chaque ancienne URL, donner la meilleure nouvelle URL avec sa confidence, "
+                "même faible : le seuil est appliqué ensuite\n"
+                '- Placer dans "non_matchees" uniquement les URLs sans aucune nouvelle URL en rapport\n'
+                f'- Ajouter dans "alternatives" jusqu\'à {MAX_ALTERNATIVES} autres nouvelles URLs plausibles'
+            )
+            format_rule = '- Format : {"correspondances": [...], "non_matchees": [...]}'
+        
+        base_prompt = f"""Tu es un expert en redirections 301 pour des refontes de sites web.
 Ton rôle est d'associer chaque ancienne URL à la nouvelle URL la plus pertinente sémantiquement.
 
 Règles :
 - Analyse le sens et le contenu de chaque URL
 - Une ancienne URL = une seule nouvelle URL maximum
-- Score de confidence entre 0.0 et 1.0
-- Si confidence < 0.7, placer dans "non_matchees"
+{confidence_rules}
 - Réponse obligatoire en JSON valide
-- Format : {"correspondances": [...], "non_matchees": [...]}"""
+{format_rule}"""
         
         if contexte_metier.strip():
             base_prompt += f"""
@@ -188,23 +1284,24 @@ Priorise ABSOLUMENT les informations du contexte métier dans tes décisions."""
         
         return base_prompt
     
+    def _render_prompt(self, old_urls: List[str], new_urls: List[str],
+                       contexte_metier: str = "", langue: str = "fr") -> str:
+        """Construit le prompt utilisateur selon le protocole configuré"""
+        if self.compact_protocol:
+            return self._build_compact_prompt(old_urls, new_urls, contexte_metier, langue)
+        return self._build_prompt(old_urls, new_urls, contexte_metier, langue)
+    
     def _build_prompt(self, old_urls: List[str], new_urls: List[str], 
                      contexte_metier: str = "", langue: str = "fr") -> str:
-        """Construit le prompt utilisateur"""
-        
-        prompt_parts = []
-        
-        # Ajouter le contexte métier au début du prompt si fourni
-        if contexte_metier.strip():
-            prompt_parts.append(f"""CONTEXTE MÉTIER :
-{contexte_metier}
-
-""")
+        """
+        Construit le prompt utilisateur
         
-        prompt_parts.append(f"""ANCIENNES URLS ({len(old_urls)}):
-{chr(10).join(old_urls)}
-
-NOUVELLES URLS ({len(new_urls)}):
+        Le bloc des candidates et les consignes précèdent les anciennes URLs :
+        avec le prompt système (qui porte seul le contexte métier), ils forment
+        un préfixe identique octet pour octet entre les lots d'une même langue,
+        réutilisable par le cache de préfixe du fournisseur.
+        """
+        return f"""NOUVELLES URLS ({len(new_urls)}):
 {chr(10).join(new_urls)}
 
 LANGUE PRINCIPALE : {langue}
@@ -217,13 +1314,110 @@ Réponse en JSON avec cette structure exacte :
             "ancienne": "URL_ancienne",
             "nouvelle": "URL_nouvelle",
             "confidence": 0.85,
-            "raison": "Explication courte"
+            "raison": "Explication courte",
+            "alternatives": [{{"nouvelle": "URL_nouvelle_2", "confidence": 0.6}}]
         }}
     ],
     "non_matchees": ["URL_sans_correspondance"]
-}}""")
+}}
+
+ANCIENNES URLS ({len(old_urls)}):
+{chr(10).join(old_urls)}"""
+    
+    def _build_compact_prompt(self, old_urls: List[str], new_urls: List[str],
+                              contexte_metier: str = "", langue: str = "fr") -> str:
+        """Construit le prompt utilisateur du protocole compact (URLs numérotées, même ordre de blocs)"""
+        numbered_old = "\n".join(f"{i}: {url}" for i, url in enumerate(old_urls))
+        numbered_new = "\n".join(f"{i}: {url}" for i, url in enumerate(new_urls))
+        
+        return f"""NOUVELLES URLS ({len(new_urls)}):
+{numbered_new}
+
+LANGUE PRINCIPALE : {langue}
+
+Associe chaque ancienne URL à la meilleure nouvelle URL en utilisant UNIQUEMENT leurs numéros.
+Réponse en JSON compact avec cette structure exacte :
+{{"m": [[0, 3, 85]], "a": [[0, 7, 60]], "u": [1]}}
+- "m" : triplets [numéro ancienne, numéro nouvelle, confidence 0-100]
+- "a" : triplets des autres nouvelles URLs plausibles ({MAX_ALTERNATIVES} au plus par ancienne URL)
+- "u" : numéros des anciennes URLs sans correspondance
+Une courte raison peut être ajoutée en 4e élément d'un triplet si elle est indispensable.
+
+ANCIENNES URLS ({len(old_urls)}):
+{numbered_old}"""
+    
+    def _parse_compact_response(self, response: str, old_urls: List[str],
+                                new_urls: List[str]) -> Dict[str, Any]:
+        """
+        Décode une réponse du protocole compact en correspondances complètes
+        
+        Les indices hors liste sont écartés : l'ancienne URL concernée est
+        placée dans les non matchées plutôt que de produire une URL inventée.
+        """
+        try:
+            cleaned = response.strip()
+            if cleaned.startswith("```"):
+                lines = cleaned.split("\n")
+                cleaned = "\n".join(line for line in lines if not line.startswith("```"))
+            
+            data = json.loads(cleaned)
+            
+            if not isinstance(data, dict) or "m" not in data:
+                raise ValueError("Structure JSON compacte invalide")
+            
+        except (json.JSONDecodeError, ValueError) as e:
+            raise AIMatchingError(f"Impossible de parser la réponse IA: {e}")
         
-        return "".join(prompt_parts)
+        return self._decode_compact_data(data, old_urls, new_urls)
+    
+    def _decode_compact_data(self, data: Dict[str, Any], old_urls: List[str],
+                             new_urls: List[str]) -> Dict[str, Any]:
+        """Convertit les triplets d'indices en correspondances complètes"""
+        correspondances = []
+        non_matchees = []
+        seen = set()
+        by_old_idx = {}
+        
+        for entry in data.get("m", []):
+            if not isinstance(entry, list) or len(entry) < 3:
+                continue
+            
+            old_idx, new_idx, confidence = entry[0], entry[1], entry[2]
+            if not isinstance(old_idx, int) or not 0 <= old_idx < len(old_urls) or old_idx in seen:
+                continue
+            seen.add(old_idx)
+            
+            if not isinstance(new_idx, int) or not 0 <= new_idx < len(new_urls):
+                non_matchees.append(old_urls[old_idx])
+                continue
+            
+            by_old_idx[old_idx] = {
+                "ancienne": old_urls[old_idx],
+                "nouvelle": new_urls[new_idx],
+                "confidence": _compact_confidence(confidence),
+                "raison": str(entry[3]) if len(entry) > 3 else ""
+            }
+            correspondances.append(by_old_idx[old_idx])
+        
+        # Alternatives rattachées à la correspondance principale de leur ancienne URL
+        for entry in data.get("a", []):
+            if not isinstance(entry, list) or len(entry) < 3:
+                continue
+            match = by_old_idx.get(entry[0]) if isinstance(entry[0], int) else None
+            new_idx = entry[1]
+            if match is None or not isinstance(new_idx, int) or not 0 <= new_idx < len(new_urls):
+                continue
+            match.setdefault("alternatives", []).append({
+                "nouvelle": new_urls[new_idx],
+                "confidence": _compact_confidence(entry[2])
+            })
+        
+        for old_idx in data.get("u", []):
+            if isinstance(old_idx, int) and 0 <= old_idx < len(old_urls) and old_idx not in seen:
+                seen.add(old_idx)
+                non_matchees.append(old_urls[old_idx])
+        
+        return {"correspondances": correspondances, "non_matchees": non_matchees}
     
     def _parse_ai_response(self, response: str) -> Dict[str, Any]:
         """Parse la réponse JSON de l'IA avec gestion d'erreurs"""
@@ -251,25 +1445,140 @@ Réponse en JSON avec cette structure exacte :
             raise AIMatchingError(f"Impossible de parser la réponse IA: {e}")
     
     def _create_chunks(self, old_urls: List[str], new_urls: List[str], 
-                      chunk_size: int) -> List[Dict[str, List[str]]]:
-        """Découpe les URLs en chunks pour traitement par lots"""
+                      chunk_size: Optional[int] = None,
+                      candidate_index: Optional[CandidateIndex] = None,
+                      contexte_metier: str = "", langue: str = "fr") -> List[Dict[str, List[str]]]:
+        """
+        Découpe les URLs en lots remplis jusqu'aux budgets de tokens
+        
+        Un lot est fermé dès que l'URL suivante ferait dépasser le budget
+        d'entrée (prompt complet), le budget de sortie (réponse estimée) ou
+        la taille maximale `chunk_size` si elle est fixée. Avec présélection
+        des candidates, les URLs de même meilleure candidate sont regroupées
+        et les lots de même bloc de candidates se suivent (cache de préfixe).
+        """
         
         chunks = []
+        estimator = self.token_estimator
+        
+        # Trop de nouvelles URLs pour un seul prompt : index lexical pour
+        # ne montrer à chaque lot que ses candidates les plus proches
+        if candidate_index is None and len(new_urls) > self.max_candidates:
+            candidate_index = CandidateIndex(new_urls)
         
-        for i in range(0, len(old_urls), chunk_size):
-            chunk_old = old_urls[i:i + chunk_size]
+        # Gabarit du prompt compté une fois, puis coût marginal de chaque ligne d'URL
+        overhead = estimator.count(
+            self._get_system_prompt(contexte_metier) + self._render_prompt([], [], contexte_metier, langue)
+        )
+        line_tokens = 3 if self.compact_protocol else 1  # Numéro et retour à la ligne
+        new_costs = [estimator.count(url) + line_tokens for url in new_urls]
+        shared_new_tokens = sum(new_costs)
+        
+        hits_by_url: Dict[str, List[Tuple[int, float]]] = {}
+        if candidate_index is not None:
+            hits_by_url = {url: candidate_index.search(url, self.candidates_per_url) for url in old_urls}
+            # URLs voisines dans le même lot : blocs de candidates plus petits et partagés
+            old_urls = sorted(old_urls, key=lambda url: hits_by_url[url][0][0] if hits_by_url[url] else len(new_urls))
+            # URL sans aucun token commun avec les candidates : meilleures candidates
+            # de l'ensemble plutôt qu'un bloc vide (appel payé sans réponse possible)
+            fallback_hits = self._fallback_hits(hits_by_url, len(new_urls))
+            hits_by_url = {url: hits or fallback_hits for url, hits in hits_by_url.items()}
+        
+        chunk_old = []
+        old_tokens = 0
+        best_scores: Dict[int, float] = {}
+        union_tokens = 0
+        
+        for url in old_urls:
+            url_tokens = estimator.count(url) + line_tokens
+            hits = hits_by_url.get(url, [])
             
-            # Pour les nouvelles URLs, on prend tout (ou un échantillon si trop gros)
-            chunk_new = new_urls
-            if len(new_urls) > 200:  # Limite pour éviter les prompts trop longs
-                chunk_new = new_urls[:200]
+            new_block_tokens = self._new_block_tokens(candidate_index, hits, best_scores,
+                                                      union_tokens, new_costs, shared_new_tokens)
+            input_tokens = overhead + old_tokens + url_tokens + new_block_tokens
+            fits = self._chunk_fits(len(chunk_old) + 1, chunk_size, input_tokens)
             
-            chunks.append({
-                "old_urls": chunk_old,
-                "new_urls": chunk_new
-            })
+            if chunk_old and not fits:
+                chunks.append(self._close_chunk(chunk_old, new_urls, candidate_index, best_scores))
+                chunk_old = []
+                old_tokens = 0
+                best_scores = {}
+                union_tokens = 0
+            
+            chunk_old.append(url)
+            old_tokens += url_tokens
+            for index, _ in hits:
+                if index not in best_scores:
+                    union_tokens += new_costs[index]
+            CandidateIndex.merge_scores(best_scores, hits)
         
-        return chunks
+        if chunk_old:
+            chunks.append(self._close_chunk(chunk_old, new_urls, candidate_index, best_scores))
+        
+        return self._group_by_candidates(chunks)
+    
+    def _fallback_hits(self, hits_by_url: Dict[str, List[Tuple[int, float]]],
+                       nb_new_urls: int) -> List[Tuple[int, float]]:
+        """
+        Candidates des URLs sans résultat lexical
+        
+        Returns:
+            Meilleures candidates de l'ensemble des URLs du découpage, ou les
+            premières nouvelles URLs si aucune n'a de résultat lexical
+        """
+        best_scores: Dict[int, float] = {}
+        for hits in hits_by_url.values():
+            CandidateIndex.merge_scores(best_scores, hits)
+        if not best_scores:
+            return [(index, 0.0) for index in range(min(self.candidates_per_url, nb_new_urls))]
+        
+        top = sorted(best_scores, key=lambda i: (-best_scores[i], i))[:self.candidates_per_url]
+        return [(index, best_scores[index]) for index in top]
+    
+    def _group_by_candidates(self, chunks: List[Dict[str, List[str]]]) -> List[Dict[str, List[str]]]:
+        """Fait se suivre les lots de même bloc de candidates (même préfixe de prompt)"""
+        groups: Dict[Tuple[str, ...], List[Dict[str, List[str]]]] = {}
+        for chunk in chunks:
+            groups.setdefault(tuple(chunk["new_urls"]), []).append(chunk)
+        return [chunk for group in groups.values() for chunk in group]
+    
+    def _new_block_tokens(self, candidate_index: Optional[CandidateIndex],
+                          hits: List[Tuple[int, float]], best_scores: Dict[int, float],
+                          union_tokens: int, new_costs: List[int], shared_new_tokens: int) -> int:
+        """Estime les tokens du bloc NOUVELLES URLS si le lot accueille une URL de plus"""
+        if candidate_index is None:
+            return shared_new_tokens
+        
+        added = [index for index, _ in hits if index not in best_scores]
+        total = union_tokens + sum(new_costs[index] for index in added)
+        nb_candidates = len(best_scores) + len(added)
+        
+        # Seules max_candidates candidates sont retenues : coût moyen au-delà
+        if nb_candidates > self.max_candidates:
+            total = total * self.max_candidates / nb_candidates
+        return int(total)
+    
+    def _chunk_fits(self, nb_old_urls: int, chunk_size: Optional[int], input_tokens: int) -> bool:
+        """Indique si un lot de nb_old_urls URLs tient dans les budgets"""
+        if chunk_size is not None and nb_old_urls > chunk_size:
+            return False
+        if input_tokens > self.input_token_budget:
+            return False
+        return self.token_estimator.estimate_output(nb_old_urls) <= self.output_token_budget
+    
+    def _close_chunk(self, chunk_old: List[str], new_urls: List[str],
+                     candidate_index: Optional[CandidateIndex],
+                     best_scores: Dict[int, float]) -> Dict[str, List[str]]:
+        """Construit un lot avec ses nouvelles URLs candidates"""
+        if candidate_index is None:
+            chunk_new = new_urls
+        else:
+            chunk_new = candidate_index.select(best_scores, self.max_candidates)
+        
+        return {
+            "old_urls": chunk_old,
+            "new_urls": chunk_new
+        }
     
     def estimate_cost(self, old_urls: List[str], new_urls: List[str],
                      contexte_metier: str = "") -> float:
@@ -279,14 +1588,17 @@ Réponse en JSON avec cette structure exacte :
         Returns:
             Coût estimé en USD
         """
-        # Calcul approximatif des tokens
-        total_chars = sum(len(url) for url in old_urls + new_urls)
-        total_chars += len(contexte_metier)
-        total_chars += 1000  # Overhead du prompt système
+        # Tokens des lots réellement envoyés (gabarit, candidates et réponse estimée)
+        chunks = self._create_chunks(old_urls, new_urls, self.chunk_size,
+                                     contexte_metier=contexte_metier)
+        system_prompt = self._get_system_prompt(contexte_metier)
         
-        # Approximation : 4 caractères = 1 token
-        estimated_input_tokens = total_chars / 4
-        estimated_output_tokens = len(old_urls) * 50  # ~50 tokens par correspondance
+        estimated_input_tokens = 0
+        estimated_output_tokens = 0
+        for chunk in chunks:
+            prompt = self._render_prompt(chunk["old_urls"], chunk["new_urls"], contexte_metier)
+            estimated_input_tokens += self.token_estimator.count(system_prompt + prompt)
+            estimated_output_tokens += self.token_estimator.estimate_output(len(chunk["old_urls"]))
         
         # Calcul du coût
         input_cost = (estimated_input_tokens / 1000) * self.cost_per_1k_input
@@ -301,5 +1613,16 @@ Réponse en JSON avec cette structure exacte :
             "temperature": self.temperature,
             "chunk_size": self.chunk_size,
             "max_tokens": self.max_tokens,
-            "max_retries": self.max_retries
+            "context_window": self.context_window,
+            "input_token_budget": self.input_token_budget,
+            "output_token_budget": self.output_token_budget,
+            "max_retries": self.max_retries,
+            "max_concurrency": self.max_concurrency,
+            "max_candidates": self.max_candidates,
+            "candidates_per_url": self.candidates_per_url,
+            "local_prematch": self.pre_matcher is not None,
+            "compact_protocol": self.compact_protocol,
+            "stream": self.stream,
+            "section_mode": self.section_mode,
+            "token_estimator": self.token_estimator.get_statistics()
         }
\ No newline at end of file
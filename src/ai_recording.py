@@ -0,0 +1,206 @@
+"""
+Enregistrement et rejeu des échanges avec l'API OpenAI
+Permet de rejouer une session réelle hors ligne (tests de non-régression, benchmarks)
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Iterator
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """
+    Calcule la clé d'un appel chat.completions (modèle, messages, température)
+    
+    Args:
+        request: Paramètres de l'appel (kwargs de chat.completions.create)
+    
+    Returns:
+        Empreinte SHA-256 hexadécimale
+    """
+    payload = json.dumps({
+        "model": request.get("model"),
+        "messages": request.get("messages"),
+        "temperature": request.get("temperature")
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _usage_to_dict(usage: Any) -> Optional[Dict[str, int]]:
+    """Convertit response.usage en dictionnaire sérialisable"""
+    if usage is None:
+        return None
+    
+    values = {
+        name: getattr(usage, name, None)
+        for name in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+    if not all(isinstance(value, int) for value in values.values()):
+        return None
+    return values
+
+
+class ReplayStore:
+    """Enregistrements indexés par clé de requête (fichier JSONL)"""
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialise le stockage
+        
+        Args:
+            path: Fichier JSONL (None = enregistrements en mémoire uniquement)
+        """
+        self.path = Path(path) if path else None
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        
+        if self.path is not None and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[record["key"]] = record
+    
+    def add(self, record: Dict[str, Any]):
+        """Ajoute un enregistrement (et l'écrit dans le fichier JSONL)"""
+        with self._lock:
+            self.records[record["key"]] = record
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def lookup(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Retourne l'enregistrement correspondant à une requête, ou None"""
+        with self._lock:
+            return self.records.get(request_key(request))
+
+
+class RecordingClient:
+    """
+    Proxy d'un client OpenAI qui enregistre chaque échange et sa latence
+    
+    S'utilise à la place du client dans AIMapper(client=...). Les réponses
+    streamées sont enregistrées une fois le flux entièrement consommé.
+    """
+    
+    def __init__(self, client: Any, store: Optional[ReplayStore] = None):
+        """
+        Initialise le proxy
+        
+        Args:
+            client: Client OpenAI réel (ou compatible)
+            store: Stockage des enregistrements (défaut: en mémoire)
+        """
+        self.client = client
+        self.store = store or ReplayStore()
+        self.latencies: List[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    def _create(self, **kwargs) -> Any:
+        """Appelle le client réel puis enregistre l'échange"""
+        started = time.perf_counter()
+        
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        
+        if kwargs.get("stream"):
+            return self._record_stream(kwargs, response, started)
+        
+        self._record(kwargs, response.choices[0].message.content,
+                     _usage_to_dict(getattr(response, "usage", None)),
+                     response.choices[0].finish_reason, started)
+        return response
+    
+    def _record_stream(self, request: Dict[str, Any], stream: Any, started: float) -> Iterator[Any]:
+        """Relaie un flux en accumulant son contenu pour l'enregistrer à la fin"""
+        parts = []
+        usage = None
+        finish_reason = None
+        
+        for event in stream:
+            usage = _usage_to_dict(getattr(event, "usage", None)) or usage
+            if event.choices:
+                choice = event.choices[0]
+                if choice.delta.content:
+                    parts.append(choice.delta.content)
+                finish_reason = choice.finish_reason or finish_reason
+            yield event
+        
+        self._record(request, "".join(parts), usage, finish_reason, started)
+    
+    def _record(self, request: Dict[str, Any], content: str, usage: Optional[Dict[str, int]],
+                finish_reason: Optional[str], started: float):
+        """Ajoute un échange au stockage"""
+        latency = time.perf_counter() - started
+        with self._lock:
+            self.latencies.append(latency)
+        
+        self.store.add({
+            "key": request_key(request),
+            "model": request.get("model"),
+            "messages": request.get("messages"),
+            "temperature": request.get("temperature"),
+            "content": content,
+            "finish_reason": finish_reason,
+            "usage": usage,
+            "latency_seconds": round(latency, 4)
+        })
+
+
+class ReplayClient:
+    """
+    Client compatible OpenAI qui rejoue des échanges enregistrés
+    
+    Aucune requête réseau : une requête absente des enregistrements lève
+    LookupError pour signaler que la session a divergé.
+    """
+    
+    def __init__(self, store: ReplayStore):
+        """
+        Initialise le client de rejeu
+        
+        Args:
+            store: Enregistrements à rejouer
+        """
+        self.store = store
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    def _create(self, **kwargs) -> Any:
+        """Retourne la réponse enregistrée pour la requête"""
+        record = self.store.lookup(kwargs)
+        if record is None:
+            raise LookupError("Aucun enregistrement pour cette requête (session divergente)")
+        
+        usage = SimpleNamespace(**record["usage"]) if record.get("usage") else None
+        
+        if kwargs.get("stream"):
+            return self._replay_stream(record, usage)
+        
+        message = SimpleNamespace(role="assistant", content=record["content"])
+        choice = SimpleNamespace(index=0, message=message, finish_reason=record.get("finish_reason"))
+        return SimpleNamespace(choices=[choice], usage=usage, model=record.get("model"))
+    
+    def _replay_stream(self, record: Dict[str, Any], usage: Any) -> Iterator[Any]:
+        """Rejoue une réponse sous forme de flux (un événement par bloc de texte)"""
+        content = record["content"] or ""
+        for start in range(0, len(content), 16):
+            delta = SimpleNamespace(role="assistant", content=content[start:start + 16])
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)],
+                                  usage=None)
+        
+        delta = SimpleNamespace(role=None, content=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta,
+                                                       finish_reason=record.get("finish_reason"))],
+                              usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
@@ -0,0 +1,284 @@
+"""
+Affectation globale des correspondances sous contrainte de fan-in
+Flot de coût minimum sur la matrice creuse des scores, bloc connexe par bloc connexe
+"""
+
+import heapq
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    from ai_mapper import MatchResult
+except ImportError:
+    from src.ai_mapper import MatchResult
+
+
+class AssignmentOptimizer:
+    """
+    Réaffectation globale des anciennes URLs vers les nouvelles
+    
+    Chaque chunk est scoré indépendamment : plusieurs anciennes URLs peuvent
+    s'empiler sur une cible générique pendant que de meilleures cibles
+    restent libres. L'optimiseur maximise la somme des scores avec au plus
+    une cible par ancienne URL et au plus `max_fan_in` anciennes URLs par
+    cible (une URL peut rester non matchée).
+    
+    La matrice est découpée en composantes connexes, résolues séparément
+    et exactement par plus courts chemins augmentants (flot de coût
+    minimum) : aucune matrice dense, coût proportionnel aux arêtes
+    réellement explorées.
+    """
+    
+    def __init__(self, max_fan_in: Optional[int] = 1,
+                 fan_in_overrides: Optional[Dict[str, Optional[int]]] = None):
+        """
+        Initialise l'optimiseur
+        
+        Args:
+            max_fan_in: Anciennes URLs maximum par nouvelle URL (None = illimité)
+            fan_in_overrides: Fan-in par nouvelle URL (ex: page d'accueil illimitée)
+        """
+        self.max_fan_in = max_fan_in
+        self.fan_in_overrides = fan_in_overrides or {}
+        
+        self.statistics = {
+            'components': 0,
+            'largest_component': 0,
+            'augmenting_paths': 0,
+            'reassigned_urls': 0,
+            'dropped_urls': 0
+        }
+    
+    def assign(self, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray,
+               n_old: int, capacities: np.ndarray) -> np.ndarray:
+        """
+        Résout l'affectation sur une matrice creuse au format COO
+        
+        Args:
+            rows: Indice de l'ancienne URL de chaque score
+            cols: Indice de la nouvelle URL de chaque score
+            scores: Scores (plus grand = meilleur, non positifs ignorés)
+            n_old: Nombre d'anciennes URLs
+            capacities: Fan-in de chaque nouvelle URL
+        
+        Returns:
+            Indice de la nouvelle URL affectée à chaque ancienne URL (-1 = aucune)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+        
+        keep = scores > 0
+        rows, cols, scores = rows[keep], cols[keep], scores[keep]
+        assignment = np.full(n_old, -1, dtype=np.int64)
+        if not len(rows):
+            return assignment
+        
+        # Arêtes regroupées par ancienne URL
+        order = np.lexsort((cols, rows))
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        starts = np.searchsorted(rows, np.arange(n_old + 1))
+        
+        for component in self._components(rows, cols, n_old, len(capacities)):
+            edges = {
+                person: list(zip(cols[starts[person]:starts[person + 1]].tolist(),
+                                 scores[starts[person]:starts[person + 1]].tolist()))
+                for person in component
+            }
+            for person, target in self._shortest_paths(edges, capacities).items():
+                assignment[person] = target
+            
+            self.statistics['components'] += 1
+            self.statistics['largest_component'] = max(self.statistics['largest_component'], len(component))
+        
+        return assignment
+    
+    def optimize_matches(self, candidates: List[Dict[str, Any]]) -> MatchResult:
+        """
+        Réaffecte des correspondances candidates (plusieurs possibles par ancienne URL)
+        
+        Args:
+            candidates: Correspondances {ancienne, nouvelle, confidence, ...} ;
+                la confidence sert de score
+        
+        Returns:
+            Correspondances retenues et anciennes URLs restées sans cible
+        """
+        old_index: Dict[str, int] = {}
+        new_index: Dict[str, int] = {}
+        best: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        
+        for match in candidates:
+            old_id = old_index.setdefault(match["ancienne"], len(old_index))
+            new_id = new_index.setdefault(match["nouvelle"], len(new_index))
+            current = best.get((old_id, new_id))
+            if current is None or match.get("confidence", 0) > current.get("confidence", 0):
+                best[(old_id, new_id)] = match
+        
+        if not best:
+            return MatchResult(correspondances=[], non_matchees=[])
+        
+        pairs = list(best)
+        rows = np.array([old_id for old_id, _ in pairs], dtype=np.int64)
+        cols = np.array([new_id for _, new_id in pairs], dtype=np.int64)
+        scores = np.array([best[pair].get("confidence", 0) for pair in pairs], dtype=np.float64)
+        new_urls = list(new_index)
+        
+        assignment = self.assign(rows, cols, scores, len(old_index), self.capacities(new_urls, len(old_index)))
+        
+        # Comparaison avec le choix local (meilleure candidate de chaque ancienne URL)
+        greedy = np.full(len(old_index), -1, dtype=np.int64)
+        greedy_scores = np.full(len(old_index), -np.inf)
+        for row, col, score in zip(rows.tolist(), cols.tolist(), scores.tolist()):
+            if score > greedy_scores[row]:
+                greedy[row], greedy_scores[row] = col, score
+        
+        correspondances = []
+        non_matchees = []
+        for old_url, old_id in old_index.items():
+            target = int(assignment[old_id])
+            if target < 0:
+                non_matchees.append(old_url)
+                if greedy[old_id] >= 0:
+                    self.statistics['dropped_urls'] += 1
+                continue
+            if target != greedy[old_id]:
+                self.statistics['reassigned_urls'] += 1
+            correspondances.append(best[(old_id, target)])
+        
+        return MatchResult(correspondances=correspondances, non_matchees=non_matchees)
+    
+    def capacities(self, new_urls: List[str], n_old: int) -> np.ndarray:
+        """
+        Fan-in de chaque nouvelle URL (illimité = nombre d'anciennes URLs)
+        
+        Args:
+            new_urls: Nouvelles URLs, dans l'ordre des indices de colonne
+            n_old: Nombre d'anciennes URLs
+        
+        Returns:
+            Tableau des capacités
+        """
+        capacities = np.empty(len(new_urls), dtype=np.int64)
+        for index, url in enumerate(new_urls):
+            fan_in = self.fan_in_overrides.get(url, self.max_fan_in)
+            capacities[index] = n_old if fan_in is None else max(0, fan_in)
+        return capacities
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques cumulées de l'optimiseur
+        
+        Returns:
+            Dictionnaire avec les statistiques
+        """
+        return dict(self.statistics)
+    
+    def _components(self, rows: np.ndarray, cols: np.ndarray, n_old: int,
+                    n_new: int) -> List[List[int]]:
+        """Composantes connexes du graphe biparti (anciennes URLs de chaque bloc)"""
+        parent = list(range(n_old + n_new))
+        
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+        
+        for row, col in zip(rows.tolist(), (cols + n_old).tolist()):
+            root_row, root_col = find(row), find(col)
+            if root_row != root_col:
+                parent[root_col] = root_row
+        
+        components: Dict[int, List[int]] = {}
+        for row in np.unique(rows).tolist():
+            components.setdefault(find(row), []).append(row)
+        return list(components.values())
+    
+    def _shortest_paths(self, edges: Dict[int, List[Tuple[int, float]]],
+                        capacities: np.ndarray) -> Dict[int, int]:
+        """
+        Flot de coût minimum par plus courts chemins augmentants successifs
+        
+        Les anciennes URLs sont ajoutées une à une ; Dijkstra (coûts réduits
+        par potentiels) cherche le meilleur chemin vers le puits : une place
+        libre d'une cible, ou l'option « non matchée » (coût 0) d'une URL
+        déjà placée, quitte à déplacer d'autres URLs en chaîne. Exact, et la
+        recherche s'arrête dès que le puits est atteint : les chemins restent
+        locaux tant que les cibles ne sont pas saturées.
+        """
+        top_score = 0.0
+        target_potential: Dict[int, float] = {}
+        for person_edges in edges.values():
+            for target, score in person_edges:
+                top_score = max(top_score, score)
+                target_potential[target] = min(target_potential.get(target, 0.0), -score)
+        
+        sink = (2, 0)
+        potential: Dict[Tuple[int, int], float] = {sink: -top_score}
+        potential.update(((1, target), value) for target, value in target_potential.items())
+        assigned: Dict[int, int] = {}
+        holders: Dict[int, Dict[int, float]] = {}
+        
+        for source in edges:
+            start = (0, source)
+            distance = {start: 0.0}
+            parent: Dict[Tuple[int, int], Tuple[int, int]] = {}
+            done: Dict[Tuple[int, int], float] = {}
+            heap = [(0.0, start)]
+            
+            while heap:
+                dist, node = heapq.heappop(heap)
+                if node in done:
+                    continue
+                done[node] = dist
+                if node == sink:
+                    break
+                
+                kind, index = node
+                base = dist + potential.get(node, 0.0)
+                if kind == 0:
+                    current = assigned.get(index)
+                    arcs = [((1, target), -score) for target, score in edges[index]
+                            if target != current and capacities[target] > 0]
+                    arcs.append((sink, 0.0))
+                else:
+                    occupants = holders.get(index, {})
+                    arcs = [((0, person), score) for person, score in occupants.items()]
+                    if len(occupants) < capacities[index]:
+                        arcs.append((sink, 0.0))
+                
+                for neighbour, cost in arcs:
+                    if neighbour in done:
+                        continue
+                    candidate = base + cost - potential.get(neighbour, 0.0)
+                    if candidate < distance.get(neighbour, np.inf):
+                        distance[neighbour] = candidate
+                        parent[neighbour] = node
+                        heapq.heappush(heap, (candidate, neighbour))
+            
+            # Potentiels : seuls les nœuds fixés avant le puits bougent
+            sink_distance = done[sink]
+            for node, dist in done.items():
+                potential[node] = potential.get(node, 0.0) + dist - sink_distance
+            
+            node = sink
+            path = [sink]
+            while node != start:
+                node = parent[node]
+                path.append(node)
+            path.reverse()
+            if len(path) > 3:
+                self.statistics['augmenting_paths'] += 1
+            
+            for (kind, index), (next_kind, next_index) in zip(path, path[1:]):
+                if kind == 0 and next_kind == 1:
+                    holders.setdefault(next_index, {})[index] = dict(edges[index])[next_index]
+                    assigned[index] = next_index
+                elif kind == 1 and next_kind == 0:
+                    del holders[index][next_index]
+                elif kind == 0:
+                    assigned.pop(index, None)
+        
+        return assigned
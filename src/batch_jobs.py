@@ -0,0 +1,444 @@
+"""
+Mode batch d'AIMapper pour les très grosses migrations
+Requêtes de lots écrites en JSONL, soumises à un service différé, résultats ingérés plus tard
+"""
+
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
+
+try:
+    from ai_mapper import AIMapper, AIMatchingError, MatchResult
+    from token_estimator import TokenEstimator
+except ImportError:
+    from src.ai_mapper import AIMapper, AIMatchingError, MatchResult
+    from src.token_estimator import TokenEstimator
+
+
+# Statuts de fin d'un batch (vocabulaire de l'API Batch d'OpenAI)
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def _write_json(path: Path, data: Any):
+    """Écriture atomique d'un fichier JSON (un arrêt ne laisse pas de fichier tronqué)"""
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    """Lit un fichier JSONL (lignes vides ignorées)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _usage_from_dict(usage: Optional[Dict[str, Any]]) -> Any:
+    """Convertit un usage JSON en objet à attributs, comme response.usage"""
+    if not usage:
+        return None
+    details = usage.get("prompt_tokens_details")
+    return SimpleNamespace(**{
+        **usage,
+        "prompt_tokens_details": SimpleNamespace(**details) if isinstance(details, dict) else None
+    })
+
+
+def list_batch_jobs(jobs_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Liste les travaux d'un répertoire, du plus récent au plus ancien
+    
+    Args:
+        jobs_dir: Répertoire des travaux
+    
+    Returns:
+        Manifestes résumés (job_id, created, status, requests, languages, metadata)
+    """
+    jobs = []
+    for manifest_path in Path(jobs_dir).glob("*/manifest.json"):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            continue
+        jobs.append({
+            "job_id": manifest["job_id"],
+            "created": manifest["created"],
+            "status": manifest["status"],
+            "requests": manifest.get("requests", 0),
+            "languages": list(manifest["languages"]),
+            "metadata": manifest["metadata"]
+        })
+    
+    jobs.sort(key=lambda job: job["created"], reverse=True)
+    return jobs
+
+
+class BatchBackend(ABC):
+    """
+    Service de traitement différé d'un fichier de requêtes
+    
+    Le fichier suit le format de l'API Batch d'OpenAI : une ligne
+    {"custom_id", "method", "url", "body"} par requête ; chaque résultat
+    porte le custom_id de sa requête et une réponse chat.completion.
+    """
+    
+    @abstractmethod
+    def submit(self, requests_path: Path) -> str:
+        """
+        Soumet un fichier de requêtes
+        
+        Args:
+            requests_path: Fichier JSONL des requêtes
+        
+        Returns:
+            Identifiant du batch
+        """
+    
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Statut du batch (validating, in_progress, completed, failed, expired, cancelled)"""
+    
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Lignes de résultat d'un batch terminé ({"custom_id", "response", "error"})"""
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    Stand-in local du service batch, sur fichiers (tests, démonstrations)
+    
+    L'état de chaque batch est sur disque : un batch soumis avant un
+    redémarrage est traité au premier poll qui suit le délai de
+    traitement. Les réponses viennent du répondeur fourni (ex: le répondeur
+    déterministe du serveur simulé dans les tests).
+    """
+    
+    def __init__(self, root_dir: Path, responder: Callable[[Dict[str, Any]], str],
+                 completion_delay: float = 0.0):
+        """
+        Initialise le backend
+        
+        Args:
+            root_dir: Répertoire des batchs
+            responder: Fonction corps de requête chat.completions -> contenu de la réponse
+            completion_delay: Secondes entre la soumission et la fin du batch
+        """
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.responder = responder
+        self.completion_delay = completion_delay
+        self.token_estimator = TokenEstimator(use_tiktoken=False)
+    
+    def submit(self, requests_path: Path) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch_dir = self.root_dir / batch_id
+        batch_dir.mkdir()
+        
+        (batch_dir / "input.jsonl").write_bytes(Path(requests_path).read_bytes())
+        _write_json(batch_dir / "state.json", {"status": "in_progress", "submitted_at": time.time()})
+        return batch_id
+    
+    def status(self, batch_id: str) -> str:
+        batch_dir = self.root_dir / batch_id
+        with open(batch_dir / "state.json", 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        
+        if state["status"] == "in_progress" and time.time() - state["submitted_at"] >= self.completion_delay:
+            self._process(batch_dir)
+            state["status"] = "completed"
+            _write_json(batch_dir / "state.json", state)
+        return state["status"]
+    
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        yield from _read_jsonl(self.root_dir / batch_id / "output.jsonl")
+    
+    def _process(self, batch_dir: Path):
+        """Génère les réponses de toutes les requêtes du batch"""
+        lines = []
+        for request in _read_jsonl(batch_dir / "input.jsonl"):
+            body = request["body"]
+            try:
+                content = self.responder(body)
+            except Exception as e:
+                lines.append({"custom_id": request["custom_id"], "response": None,
+                              "error": {"code": "server_error", "message": str(e)}})
+                continue
+            
+            prompt_text = "".join(message.get("content", "") for message in body.get("messages", []))
+            usage = {
+                "prompt_tokens": self.token_estimator.count_raw(prompt_text),
+                "completion_tokens": self.token_estimator.count_raw(content)
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            
+            lines.append({
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": {
+                    "object": "chat.completion",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": usage
+                }},
+                "error": None
+            })
+        
+        tmp_path = batch_dir / "output.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, batch_dir / "output.jsonl")
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """Service batch d'OpenAI (fenêtre de 24 h, tarif réduit)"""
+    
+    def __init__(self, client: Any, completion_window: str = "24h"):
+        """
+        Initialise le backend
+        
+        Args:
+            client: Client OpenAI
+            completion_window: Délai de traitement accepté
+        """
+        self.client = client
+        self.completion_window = completion_window
+    
+    def submit(self, requests_path: Path) -> str:
+        with open(requests_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                           completion_window=self.completion_window)
+        return batch.id
+    
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+    
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        # Requêtes réussies puis requêtes en erreur (fichier séparé)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+class BatchJobManager:
+    """
+    Travaux batch persistants : mise en file, suivi et ingestion
+    
+    Un travail couvre une ou plusieurs langues. Les étapes locales
+    d'AIMapper (pré-matching, cache par URL, chunking) sont faites à la
+    mise en file ; seules les requêtes des lots partent au backend. Le
+    manifeste du travail est sur disque : il peut être repris après un
+    redémarrage. À l'ingestion, chaque réponse passe par le même décodage
+    que le mode interactif ; les URLs restées sans réponse sont relancées
+    en mode interactif (ou passent en non matchées).
+    """
+    
+    def __init__(self, ai_mapper: AIMapper, backend: Optional[BatchBackend] = None,
+                 jobs_dir: str = "outputs/batch_jobs"):
+        """
+        Initialise le gestionnaire
+        
+        Args:
+            ai_mapper: Mapper dont la configuration (modèle, prompts, cache) est utilisée
+            backend: Service batch (défaut: API Batch d'OpenAI via le client du mapper)
+            jobs_dir: Répertoire des travaux
+        """
+        self.ai_mapper = ai_mapper
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.backend = backend or OpenAIBatchBackend(ai_mapper.client)
+    
+    def enqueue(self, jobs: Dict[str, Tuple[List[str], List[str]]], contexte_metier: str = "",
+                min_confidence: float = 0.0, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Prépare les lots de chaque langue et soumet le fichier de requêtes
+        
+        Args:
+            jobs: {langue: (anciennes URLs, nouvelles URLs)}
+            contexte_metier: Contexte métier fourni par le chef de projet
+            min_confidence: Seuil de confidence appliqué à l'ingestion (0.0 = résultat brut)
+            metadata: Données libres conservées avec le travail (ex: reprise dans l'interface)
+        
+        Returns:
+            Identifiant du travail
+        """
+        job_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        job_dir = self.jobs_dir / job_id
+        job_dir.mkdir()
+        
+        manifest = {
+            "job_id": job_id,
+            "created": datetime.now().isoformat(),
+            "status": "pending",
+            "batch_id": None,
+            "model": self.ai_mapper.model,
+            "contexte_metier": contexte_metier,
+            "min_confidence": min_confidence,
+            "metadata": metadata or {},
+            "languages": {}
+        }
+        
+        requests_path = job_dir / "requests.jsonl"
+        nb_requests = 0
+        with open(requests_path, 'w', encoding='utf-8') as f:
+            for langue, (old_urls, new_urls) in jobs.items():
+                prepared = self.ai_mapper.prepare_requests(old_urls, new_urls, contexte_metier, langue)
+                
+                for index, chunk in enumerate(prepared["chunks"]):
+                    # Le corps de l'appel va dans le JSONL, pas dans le manifeste
+                    params = chunk.pop("params")
+                    chunk["custom_id"] = f"{langue}-{index}"
+                    f.write(json.dumps({"custom_id": chunk["custom_id"], "method": "POST",
+                                        "url": BATCH_ENDPOINT, "body": params},
+                                       ensure_ascii=False) + "\n")
+                    nb_requests += 1
+                
+                cached_result = prepared["cached_result"]
+                manifest["languages"][langue] = {
+                    "local_matches": prepared["local_matches"],
+                    "cached_result": asdict(cached_result) if cached_result is not None else None,
+                    "cache_keys": prepared["cache_keys"],
+                    "chunks": prepared["chunks"]
+                }
+        
+        manifest["requests"] = nb_requests
+        if nb_requests:
+            manifest["batch_id"] = self.backend.submit(requests_path)
+            manifest["status"] = "submitted"
+        else:
+            # Tout est résolu localement ou par le cache : rien à soumettre
+            manifest["status"] = "completed"
+        
+        _write_json(job_dir / "manifest.json", manifest)
+        return job_id
+    
+    def load(self, job_id: str) -> Dict[str, Any]:
+        """
+        Lit le manifeste d'un travail
+        
+        Returns:
+            Manifeste (statut, batch, langues, métadonnées)
+        """
+        with open(self.jobs_dir / job_id / "manifest.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def poll(self, job_id: str) -> str:
+        """
+        Met à jour le statut d'un travail auprès du backend
+        
+        Returns:
+            Statut (submitted, in_progress, completed, failed, expired, cancelled, ingested)
+        """
+        manifest = self.load(job_id)
+        if manifest["status"] in TERMINAL_STATUSES + ("ingested",):
+            return manifest["status"]
+        
+        status = self.backend.status(manifest["batch_id"])
+        if status != manifest["status"]:
+            manifest["status"] = status
+            _write_json(self.jobs_dir / job_id / "manifest.json", manifest)
+        return status
+    
+    def collect(self, job_id: str, requery_missing: bool = True) -> Dict[str, MatchResult]:
+        """
+        Ingère les résultats d'un travail terminé
+        
+        Args:
+            job_id: Identifiant du travail
+            requery_missing: Si True, les URLs sans réponse exploitable (ligne en
+                erreur, réponse incomplète, batch expiré) sont relancées en mode interactif
+        
+        Returns:
+            Résultat par langue, au seuil de confidence du travail
+        
+        Raises:
+            AIMatchingError: Si le batch n'est pas encore terminé
+        """
+        job_dir = self.jobs_dir / job_id
+        status = self.poll(job_id)
+        
+        if status == "ingested":
+            with open(job_dir / "results.json", 'r', encoding='utf-8') as f:
+                return {langue: MatchResult(**result) for langue, result in json.load(f).items()}
+        if status not in TERMINAL_STATUSES:
+            raise AIMatchingError(f"Batch {job_id} pas encore terminé (statut: {status})")
+        
+        manifest = self.load(job_id)
+        outputs = {}
+        if status == "completed" and manifest["batch_id"]:
+            outputs = {line["custom_id"]: line for line in self.backend.results(manifest["batch_id"])}
+        
+        results = {}
+        for langue, language in manifest["languages"].items():
+            chunk_results = [
+                self._ingest_chunk(chunk, outputs.get(chunk["custom_id"]), manifest["contexte_metier"],
+                                   langue, requery_missing)
+                for chunk in language["chunks"]
+            ]
+            cached_result = language["cached_result"]
+            prepared = {
+                "local_matches": language["local_matches"],
+                "cached_result": MatchResult(**cached_result) if cached_result is not None else None,
+                "cache_keys": language["cache_keys"],
+                "chunks": language["chunks"]
+            }
+            results[langue] = self.ai_mapper.finish_matching(prepared, chunk_results,
+                                                              manifest["min_confidence"])
+        
+        _write_json(job_dir / "results.json", {langue: asdict(result) for langue, result in results.items()})
+        manifest["status"] = "ingested"
+        _write_json(job_dir / "manifest.json", manifest)
+        return results
+    
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Travaux de ce gestionnaire, du plus récent au plus ancien (voir list_batch_jobs)"""
+        return list_batch_jobs(self.jobs_dir)
+    
+    def _ingest_chunk(self, chunk: Dict[str, Any], output: Optional[Dict[str, Any]],
+                      contexte_metier: str, langue: str, requery_missing: bool) -> MatchResult:
+        """Décode la réponse d'un lot ; relance ou abandonne les URLs sans réponse"""
+        old_urls = chunk["old_urls"]
+        correspondances = []
+        non_matchees = []
+        abandonnees = []
+        missing = old_urls
+        outcome = "empty"
+        
+        response = (output or {}).get("response") or {}
+        body = response.get("body") if response.get("status_code") == 200 else None
+        if body:
+            content = body["choices"][0]["message"]["content"]
+            result, missing, outcome = self.ai_mapper.finish_response(
+                chunk, content, _usage_from_dict(body.get("usage"))
+            )
+            correspondances.extend(result.correspondances)
+            non_matchees.extend(result.non_matchees)
+        
+        if missing and requery_missing:
+            # URLs omises d'une réponse complète : petits lots ; sinon le reste du lot
+            retried = self.ai_mapper.requery(missing, chunk["new_urls"], contexte_metier, langue,
+                                             omitted=(outcome == "ok"))
+            correspondances.extend(retried.correspondances)
+            non_matchees.extend(retried.non_matchees)
+            abandonnees.extend(retried.abandonnees)
+        else:
+            # Sans réponse du modèle : abandonnées, donc hors du cache par URL
+            abandonnees.extend(missing)
+        
+        return MatchResult(correspondances=correspondances, non_matchees=non_matchees,
+                           abandonnees=abandonnees)
@@ -6,10 +6,132 @@ Gestionnaire de cache pour éviter les appels API GPT répétés
 import json
 import hashlib
 import os
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable
 from pathlib import Path
 
+try:
+    from usage_ledger import UsageLedger
+except ImportError:
+    from src.usage_ledger import UsageLedger
+
+
+def fingerprint_candidates(candidates: Iterable[str]) -> str:
+    """
+    Empreinte d'un ensemble d'URLs candidates (indépendante de l'ordre)
+    
+    Args:
+        candidates: URLs candidates montrées au modèle
+        
+    Returns:
+        Empreinte SHA-256 (hexadécimal)
+    """
+    content = "\n".join(sorted(set(candidates)))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class MatchCache:
+    """
+    Cache par URL des résultats de matching IA (adressé par contenu)
+    
+    Chaque entrée est indexée sur l'ancienne URL, l'empreinte des candidates
+    qui lui ont été montrées, le contexte métier, le modèle, le mode de
+    sections, le protocole de réponse (JSON ou compact) et la version du
+    prompt. Ajouter une URL à la liste n'invalide
+    donc que les entrées réellement concernées.
+    """
+    
+    def __init__(self, cache_dir: Path):
+        """
+        Initialise le cache par URL
+        
+        Args:
+            cache_dir: Répertoire des entrées (un fichier JSON par clé)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(old_url: str, candidates_fingerprint: str, contexte_metier: str,
+                 langue: str, model: str, temperature: float,
+                 section_mode: Optional[str] = None, prompt_version: int = 0,
+                 compact_protocol: bool = False) -> str:
+        """
+        Génère la clé d'une entrée
+        
+        Args:
+            section_mode: Mode de matching hiérarchique (None = lots à plat)
+            prompt_version: Version du prompt et du schéma de réponse
+            compact_protocol: Protocole compact par indices (False = JSON complet)
+        
+        Returns:
+            Clé SHA-256 (hexadécimal)
+        """
+        content = {
+            "old_url": old_url,
+            "candidates": candidates_fingerprint,
+            "contexte_metier": contexte_metier.strip(),
+            "langue": langue,
+            "model": model,
+            "temperature": temperature,
+            "section_mode": section_mode,
+            "prompt_version": prompt_version,
+            "compact_protocol": compact_protocol
+        }
+        content_str = json.dumps(content, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content_str.encode()).hexdigest()
+    
+    def _entry_path(self, key: str) -> Path:
+        """Chemin d'une entrée (sous-dossiers par préfixe pour limiter la taille des dossiers)"""
+        return self.cache_dir / key[:2] / f"{key}.json"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une entrée
+        
+        Returns:
+            Entrée {"old_url", "correspondance", "timestamp"} ou None
+        """
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            return None
+        
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            # Entrée corrompue, on l'ignore
+            return None
+    
+    def put(self, key: str, old_url: str, correspondance: Optional[Dict[str, Any]]):
+        """
+        Enregistre le résultat d'une URL
+        
+        Args:
+            key: Clé de l'entrée (make_key)
+            old_url: Ancienne URL
+            correspondance: Correspondance brute, ou None si non matchée
+        """
+        entry_path = self._entry_path(key)
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "old_url": old_url,
+            "correspondance": correspondance
+        }
+        
+        with self._lock:
+            entry_path.parent.mkdir(exist_ok=True)
+            tmp_path = entry_path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+    
+    def count_entries(self) -> int:
+        """Nombre d'entrées en cache"""
+        return sum(1 for _ in self.cache_dir.glob("*/*.json"))
+
 
 class CacheManager:
     """Gestionnaire de cache pour les résultats GPT et fichiers .htaccess"""
@@ -30,6 +152,12 @@ class CacheManager:
         
         self.gpt_cache_dir.mkdir(exist_ok=True)
         self.htaccess_dir.mkdir(exist_ok=True)
+        
+        # Cache fin par URL pour les re-runs incrémentaux
+        self.match_cache = MatchCache(self.cache_dir / "match_cache")
+        
+        # Journal de consommation réelle des appels IA (tokens, latence, coût)
+        self.usage_ledger = UsageLedger(self.cache_dir / "usage_ledger")
     
     def _generate_cache_key(self, old_urls: List[str], new_urls: List[str], 
                            contexte_metier: str = "", temperature: float = 0.1) -> str:
@@ -188,7 +316,10 @@ class CacheManager:
         cutoff_date = datetime.now() - timedelta(days=days)
         deleted_count = 0
         
-        for cache_file in self.gpt_cache_dir.glob("gpt_results_*.json"):
+        cache_files = list(self.gpt_cache_dir.glob("gpt_results_*.json"))
+        cache_files.extend(self.match_cache.cache_dir.glob("*/*.json"))
+        
+        for cache_file in cache_files:
             try:
                 file_time = datetime.fromtimestamp(cache_file.stat().st_mtime)
                 if file_time < cutoff_date:
@@ -214,6 +345,7 @@ class CacheManager:
         return {
             "gpt_cache_files": len(gpt_files),
             "htaccess_files": len(htaccess_files),
+            "match_cache_entries": self.match_cache.count_entries(),
             "total_size_mb": round(total_size / (1024 * 1024), 2),
             "cache_dir": str(self.cache_dir)
         }
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Index lexical de recherche de candidats parmi les nouvelles URLs
+TF-IDF sur tokens de chemin et n-grammes de caractères (NumPy, sans appel API)
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Tuple
+from urllib.parse import urlparse, unquote
+
+import numpy as np
+
+
+def tokenize_url(url: str) -> List[str]:
+    """
+    Découpe le chemin d'une URL en tokens normalisés
+    
+    Args:
+        url: URL absolue ou chemin relatif
+    
+    Returns:
+        Tokens en minuscules, sans accents (ex: ['fr', 'hebergements', 'chalet'])
+    """
+    path = urlparse(url).path if '://' in url else url
+    path = unquote(path).lower()
+    path = unicodedata.normalize('NFKD', path).encode('ascii', 'ignore').decode('ascii')
+    return [token for token in re.split(r'[^a-z0-9]+', path) if token]
+
+
+def extract_features(url: str, ngram_size: int = 3) -> Counter:
+    """
+    Extrait les features lexicales d'une URL (tokens + n-grammes de caractères)
+    
+    Args:
+        url: URL à analyser
+        ngram_size: Taille des n-grammes de caractères
+    
+    Returns:
+        Compteur {feature: occurrences}
+    """
+    features = Counter()
+    
+    for token in tokenize_url(url):
+        features['w:' + token] += 1
+        
+        # Marqueurs de début/fin pour distinguer préfixes et suffixes
+        padded = f'^{token}$'
+        for i in range(len(padded) - ngram_size + 1):
+            features['c:' + padded[i:i + ngram_size]] += 1
+    
+    return features
+
+
+class CandidateIndex:
+    """
+    Index TF-IDF creux sur les nouvelles URLs
+    
+    Les postings sont stockés par feature dans des tableaux NumPy (format
+    colonne compressé) : une requête ne touche que les documents partageant
+    au moins une feature, ce qui tient sur 50k+ URLs.
+    """
+    
+    def __init__(self, urls: List[str], ngram_size: int = 3):
+        """
+        Construit l'index
+        
+        Args:
+            urls: URLs candidates (nouveau site)
+            ngram_size: Taille des n-grammes de caractères
+        """
+        self.urls = list(urls)
+        self.ngram_size = ngram_size
+        self.vocabulary: Dict[str, int] = {}
+        
+        doc_ids = []
+        term_ids = []
+        term_freqs = []
+        
+        for doc_id, url in enumerate(self.urls):
+            for feature, count in extract_features(url, ngram_size).items():
+                term_id = self.vocabulary.setdefault(feature, len(self.vocabulary))
+                doc_ids.append(doc_id)
+                term_ids.append(term_id)
+                term_freqs.append(count)
+        
+        n_docs = len(self.urls)
+        n_terms = len(self.vocabulary)
+        
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        term_freqs = np.asarray(term_freqs, dtype=np.float32)
+        
+        # IDF lissé
+        document_frequency = np.bincount(term_ids, minlength=n_terms)
+        self.idf = (np.log((1 + n_docs) / (1 + document_frequency)) + 1).astype(np.float32)
+        
+        # Poids TF-IDF normalisés L2 par document
+        weights = (1 + np.log(term_freqs)) * self.idf[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights ** 2, minlength=n_docs))
+        norms[norms == 0] = 1.0
+        weights = weights / norms[doc_ids]
+        
+        # Postings triés par feature (équivalent CSC)
+        order = np.argsort(term_ids, kind='stable')
+        self.posting_docs = doc_ids[order]
+        self.posting_weights = weights[order].astype(np.float32)
+        self.indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=self.indptr[1:])
+    
+    def score(self, url: str) -> np.ndarray:
+        """
+        Calcule la similarité cosinus entre une URL et toutes les candidates
+        
+        Args:
+            url: URL requête (ancien site)
+        
+        Returns:
+            Tableau de scores (un par URL candidate)
+        """
+        scores = np.zeros(len(self.urls), dtype=np.float32)
+        
+        query = [
+            (self.vocabulary[feature], count)
+            for feature, count in extract_features(url, self.ngram_size).items()
+            if feature in self.vocabulary
+        ]
+        if not query:
+            return scores
+        
+        term_ids = np.array([term_id for term_id, _ in query], dtype=np.int64)
+        query_weights = (1 + np.log([count for _, count in query])) * self.idf[term_ids]
+        query_weights /= np.linalg.norm(query_weights) or 1.0
+        
+        starts = self.indptr[term_ids]
+        ends = self.indptr[term_ids + 1]
+        lengths = ends - starts
+        
+        # Concatène les postings des features de la requête
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        contributions = self.posting_weights[positions] * np.repeat(query_weights, lengths)
+        scores += np.bincount(self.posting_docs[positions], weights=contributions,
+                              minlength=len(self.urls)).astype(np.float32)
+        
+        return scores
+    
+    def search(self, url: str, k: int = 20) -> List[Tuple[int, float]]:
+        """
+        Retourne les k candidates les plus proches d'une URL
+        
+        Args:
+            url: URL requête
+            k: Nombre de candidates
+        
+        Returns:
+            Liste de tuples (indice candidate, score), score décroissant
+        """
+        scores = self.score(url)
+        if not len(scores):
+            return []
+        
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[scores[top] > 0]
+        
+        # Tri stable : score décroissant puis ordre d'origine
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(int(i), float(scores[i])) for i in top]
+    
+    def candidates_for(self, urls: List[str], k_per_url: int = 20,
+                       max_candidates: int = 200) -> List[str]:
+        """
+        Sélectionne les candidates d'un lot d'URLs anciennes
+        
+        Args:
+            urls: URLs anciennes du lot
+            k_per_url: Candidates retenues par URL ancienne
+            max_candidates: Nombre maximum de candidates pour le lot
+        
+        Returns:
+            URLs candidates (ordre d'origine des nouvelles URLs)
+        """
+        best_scores: Dict[int, float] = {}
+        
+        for url in urls:
+            self.merge_scores(best_scores, self.search(url, k_per_url))
+        
+        return self.select(best_scores, max_candidates)
+    
+    @staticmethod
+    def merge_scores(best_scores: Dict[int, float], hits: List[Tuple[int, float]]) -> None:
+        """Fusionne les résultats d'une recherche dans les meilleurs scores d'un lot"""
+        for index, score in hits:
+            best_scores[index] = max(score, best_scores.get(index, 0.0))
+    
+    def select(self, best_scores: Dict[int, float], max_candidates: int = 200) -> List[str]:
+        """
+        Retient les meilleures candidates d'un lot
+        
+        Args:
+            best_scores: Meilleur score par indice de candidate
+            max_candidates: Nombre maximum de candidates
+        
+        Returns:
+            URLs candidates (ordre d'origine des nouvelles URLs)
+        """
+        selected = sorted(best_scores, key=lambda i: (-best_scores[i], i))[:max_candidates]
+        return [self.urls[i] for i in sorted(selected)]
@@ -0,0 +1,371 @@
+"""
+Moteur de matching local par embeddings hachés (hors ligne, sans clé API)
+N-grammes hachés en vecteurs denses, top-k cosinus par blocs avec NumPy
+"""
+
+import math
+import zlib
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
+
+import numpy as np
+
+try:
+    from candidate_index import extract_features, tokenize_url
+    from ai_mapper import MatchResult
+    from assignment_optimizer import AssignmentOptimizer
+except ImportError:
+    from src.candidate_index import extract_features, tokenize_url
+    from src.ai_mapper import MatchResult
+    from src.assignment_optimizer import AssignmentOptimizer
+
+
+class HashedNgramEncoder:
+    """
+    Encodeur d'URLs en vecteurs denses de dimension fixe (hashing trick signé)
+    
+    Les features lexicales (tokens du chemin, n-grammes de caractères,
+    tokens du titre) sont pondérées TF-IDF puis projetées par hachage :
+    aucun vocabulaire à stocker dans les vecteurs, dimension indépendante
+    du nombre d'URLs.
+    """
+    
+    def __init__(self, n_features: int = 512, ngram_size: int = 3, title_weight: float = 0.5):
+        """
+        Initialise l'encodeur
+        
+        Args:
+            n_features: Dimension des vecteurs
+            ngram_size: Taille des n-grammes de caractères
+            title_weight: Poids relatif des tokens de titre face aux features du chemin
+        """
+        self.n_features = n_features
+        self.ngram_size = ngram_size
+        self.title_weight = title_weight
+        self.idf: Dict[str, float] = {}
+        self.default_idf = 1.0
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+        self._weights: Dict[str, Tuple[int, float]] = {}
+    
+    def features(self, url: str, title: Optional[str] = None) -> Counter:
+        """
+        Extrait les features d'une URL et de son titre éventuel
+        
+        Args:
+            url: URL à encoder
+            title: Titre de la page (balise <title>), si capturé
+        
+        Returns:
+            Compteur {feature: occurrences}
+        """
+        features = extract_features(url, self.ngram_size)
+        if title:
+            for token in tokenize_url('/' + title):
+                features['t:' + token] += 1
+        return features
+    
+    def fit(self, urls: List[str], titles: Optional[Dict[str, str]] = None) -> "HashedNgramEncoder":
+        """
+        Calcule l'IDF des features sur le corpus de référence (nouvelles URLs)
+        
+        Args:
+            urls: URLs du corpus
+            titles: Titres par URL
+        
+        Returns:
+            L'encodeur lui-même
+        """
+        titles = titles or {}
+        document_frequency = Counter()
+        for url in urls:
+            document_frequency.update(self.features(url, titles.get(url)).keys())
+        
+        n_docs = len(urls)
+        self.idf = {
+            feature: math.log((1 + n_docs) / (1 + count)) + 1
+            for feature, count in document_frequency.items()
+        }
+        # Feature absente du corpus : poids d'une feature vue une seule fois
+        self.default_idf = math.log((1 + n_docs) / 2) + 1
+        self._weights = {}
+        return self
+    
+    def transform(self, urls: List[str], titles: Optional[Dict[str, str]] = None) -> np.ndarray:
+        """
+        Encode des URLs en vecteurs normalisés L2
+        
+        Args:
+            urls: URLs à encoder
+            titles: Titres par URL
+        
+        Returns:
+            Matrice float32 (len(urls) x n_features)
+        """
+        titles = titles or {}
+        positions = []
+        values = []
+        
+        for row, url in enumerate(urls):
+            offset = row * self.n_features
+            for feature, count in self.features(url, titles.get(url)).items():
+                column, weight = self._weight(feature)
+                positions.append(offset + column)
+                values.append(weight if count == 1 else weight * (1 + math.log(count)))
+        
+        vectors = np.bincount(np.asarray(positions, dtype=np.int64), weights=values,
+                              minlength=len(urls) * self.n_features)
+        vectors = vectors.reshape(len(urls), self.n_features).astype(np.float32)
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def _weight(self, feature: str) -> Tuple[int, float]:
+        """Colonne et poids signé (IDF, poids du titre) d'une feature, mis en cache"""
+        cached = self._weights.get(feature)
+        if cached is None:
+            column, sign = self._bucket(feature)
+            weight = sign * self.idf.get(feature, self.default_idf)
+            if feature.startswith('t:'):
+                weight *= self.title_weight
+            cached = (column, weight)
+            self._weights[feature] = cached
+        return cached
+    
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        """Colonne et signe d'une feature (hachage stable entre exécutions)"""
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = zlib.crc32(feature.encode('utf-8'))
+            bucket = (digest % self.n_features, 1.0 if (digest // self.n_features) % 2 else -1.0)
+            self._buckets[feature] = bucket
+        return bucket
+
+
+class EmbeddingIndex:
+    """
+    Index dense des nouvelles URLs pour la recherche top-k par blocs
+    
+    Seuls les vecteurs des nouvelles URLs sont conservés ; les anciennes
+    URLs sont encodées et comparées bloc par bloc, la mémoire de travail
+    est donc bornée par block_size x nombre de nouvelles URLs.
+    """
+    
+    def __init__(self, urls: List[str], titles: Optional[Dict[str, str]] = None,
+                 encoder: Optional[HashedNgramEncoder] = None, block_size: int = 256):
+        """
+        Construit l'index
+        
+        Args:
+            urls: URLs candidates (nouveau site)
+            titles: Titres par URL (anciennes et nouvelles)
+            encoder: Encodeur personnalisé (défaut: HashedNgramEncoder)
+            block_size: Anciennes URLs comparées par produit matriciel
+        """
+        self.urls = list(urls)
+        self.titles = titles or {}
+        self.block_size = max(1, block_size)
+        self.encoder = (encoder or HashedNgramEncoder()).fit(self.urls, self.titles)
+        self.vectors = self.encoder.transform(self.urls, self.titles)
+    
+    def iter_top_k(self, urls: List[str], k: int = 5) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """
+        Itère sur les k plus proches candidates, bloc d'anciennes URLs par bloc
+        
+        Args:
+            urls: URLs requêtes (ancien site)
+            k: Candidates par URL
+        
+        Yields:
+            Tuples (position du bloc, indices (bloc x k), scores (bloc x k)), score décroissant
+        """
+        k = min(k, len(self.urls))
+        if k == 0:
+            return
+        
+        for start in range(0, len(urls), self.block_size):
+            block = self.encoder.transform(urls[start:start + self.block_size], self.titles)
+            similarities = block @ self.vectors.T
+            
+            top = np.argpartition(similarities, -k, axis=1)[:, -k:]
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            
+            # Tri stable : score décroissant puis ordre d'origine des candidates
+            order = np.lexsort((top, -top_scores), axis=1)
+            yield (start,
+                   np.take_along_axis(top, order, axis=1),
+                   np.take_along_axis(top_scores, order, axis=1))
+    
+    def search(self, urls: List[str], k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne les k plus proches candidates de chaque URL
+        
+        Args:
+            urls: URLs requêtes (ancien site)
+            k: Candidates par URL
+        
+        Returns:
+            Tuple (indices int64 (len(urls) x k), scores float32 (len(urls) x k))
+        """
+        k = min(k, len(self.urls))
+        indices = np.zeros((len(urls), k), dtype=np.int64)
+        scores = np.zeros((len(urls), k), dtype=np.float32)
+        
+        for start, block_indices, block_scores in self.iter_top_k(urls, k):
+            indices[start:start + len(block_indices)] = block_indices
+            scores[start:start + len(block_scores)] = block_scores
+        
+        return indices, scores
+
+
+class EmbeddingMatcher:
+    """
+    Matching sémantique local, alternative hors ligne à AIMapper
+    
+    Même interface que AIMapper.match_urls (MatchResult) : chaque ancienne
+    URL est associée à sa candidate la plus proche en cosinus. La confidence
+    combine la similarité et l'écart avec la deuxième candidate : une page
+    supprimée a des voisines proches entre elles, une page déplacée se
+    détache nettement.
+    
+    Avec max_fan_in, les top_k candidates de chaque URL passent par
+    AssignmentOptimizer : une cible générique ne capte plus toutes les
+    anciennes URLs, les suivantes se rabattent sur leur 2e ou 3e choix.
+    """
+    
+    def __init__(self, n_features: int = 512, ngram_size: int = 3, block_size: int = 256,
+                 top_k: int = 5, margin_weight: float = 1.0,
+                 titles: Optional[Dict[str, str]] = None,
+                 encoder: Optional[HashedNgramEncoder] = None,
+                 max_fan_in: Optional[int] = None,
+                 fan_in_overrides: Optional[Dict[str, Optional[int]]] = None):
+        """
+        Initialise le moteur
+        
+        Args:
+            n_features: Dimension des vecteurs hachés
+            ngram_size: Taille des n-grammes de caractères
+            block_size: Anciennes URLs comparées par produit matriciel (borne la mémoire)
+            top_k: Candidates conservées par ancienne URL
+            margin_weight: Bonus de confidence par point d'écart avec la 2e candidate
+            titles: Titres capturés par URL (anciennes et nouvelles), optionnels
+            encoder: Encodeur personnalisé (remplace n_features et ngram_size)
+            max_fan_in: Anciennes URLs maximum par nouvelle URL (None = illimité, sans optimisation)
+            fan_in_overrides: Fan-in par nouvelle URL, prioritaire sur max_fan_in
+        """
+        self.n_features = n_features
+        self.ngram_size = ngram_size
+        self.block_size = block_size
+        self.top_k = max(2, top_k)
+        self.margin_weight = margin_weight
+        self.titles = titles or {}
+        self.encoder = encoder
+        self.max_fan_in = max_fan_in
+        self.fan_in_overrides = fan_in_overrides or {}
+        
+        self.statistics = {
+            'indexed_urls': 0,
+            'queried_urls': 0,
+            'matched_urls': 0,
+            'reassigned_urls': 0
+        }
+    
+    def build_index(self, new_urls: List[str]) -> EmbeddingIndex:
+        """
+        Construit l'index des nouvelles URLs
+        
+        Args:
+            new_urls: URLs du nouveau site
+        
+        Returns:
+            Index prêt pour la recherche par blocs
+        """
+        encoder = self.encoder or HashedNgramEncoder(self.n_features, self.ngram_size)
+        self.statistics['indexed_urls'] += len(new_urls)
+        return EmbeddingIndex(new_urls, self.titles, encoder, self.block_size)
+    
+    def match_urls(self, old_urls: List[str], new_urls: List[str],
+                   contexte_metier: str = "", langue: str = "fr",
+                   min_confidence: float = 0.0,
+                   on_match: Optional[Callable[[Dict[str, Any]], None]] = None) -> MatchResult:
+        """
+        Associe chaque ancienne URL à la nouvelle URL la plus proche
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            contexte_metier: Ignoré (compatibilité avec AIMapper)
+            langue: Ignorée (compatibilité avec AIMapper)
+            min_confidence: Seuil minimum de confidence (0.0 = résultat brut, seuil appliqué à la lecture)
+            on_match: Appelé pour chaque correspondance retenue, bloc par bloc
+        
+        Returns:
+            Résultat du matching avec correspondances et non-matchées
+        """
+        if not old_urls or not new_urls:
+            return MatchResult(correspondances=[], non_matchees=list(old_urls))
+        
+        index = self.build_index(new_urls)
+        optimize = self.max_fan_in is not None or bool(self.fan_in_overrides)
+        correspondances = []
+        non_matchees = []
+        
+        for start, indices, scores in index.iter_top_k(old_urls, self.top_k):
+            for offset, (row_indices, row_scores) in enumerate(zip(indices, scores)):
+                old_url = old_urls[start + offset]
+                # Avec fan-in borné, toutes les candidates restent en lice
+                ranks = range(len(row_scores)) if optimize else range(1)
+                candidates = [
+                    match for match in (self._candidate(old_url, index, row_indices, row_scores, rank)
+                                        for rank in ranks)
+                    if match["confidence"] >= min_confidence
+                ]
+                
+                if not candidates:
+                    non_matchees.append(old_url)
+                elif optimize:
+                    correspondances.extend(candidates)
+                else:
+                    correspondances.append(candidates[0])
+                    if on_match is not None:
+                        on_match(candidates[0])
+        
+        if optimize:
+            optimizer = AssignmentOptimizer(self.max_fan_in, self.fan_in_overrides)
+            assigned = optimizer.optimize_matches(correspondances)
+            correspondances = assigned.correspondances
+            non_matchees.extend(assigned.non_matchees)
+            self.statistics['reassigned_urls'] += optimizer.statistics['reassigned_urls']
+            if on_match is not None:
+                for match in correspondances:
+                    on_match(match)
+        
+        self.statistics['queried_urls'] += len(old_urls)
+        self.statistics['matched_urls'] += len(correspondances)
+        
+        return MatchResult(correspondances=correspondances, non_matchees=non_matchees)
+    
+    def _candidate(self, old_url: str, index: EmbeddingIndex, row_indices: np.ndarray,
+                   row_scores: np.ndarray, rank: int) -> Dict[str, Any]:
+        """Correspondance vers la candidate de rang `rank`, écart mesuré avec la meilleure autre"""
+        score = float(row_scores[rank])
+        others = [float(other) for position, other in enumerate(row_scores) if position != rank]
+        margin = score - max(others) if others else score
+        confidence = max(0.0, min(0.99, score + self.margin_weight * margin))
+        
+        return {
+            "ancienne": old_url,
+            "nouvelle": index.urls[int(row_indices[rank])],
+            "confidence": round(confidence, 2),
+            "raison": f"Embedding local : similarité {score:.2f} (écart {margin:.2f} avec la meilleure autre candidate)",
+            "methode": "embedding"
+        }
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques cumulées du moteur
+        
+        Returns:
+            Dictionnaire avec les statistiques
+        """
+        return dict(self.statistics)
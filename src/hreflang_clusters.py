@@ -0,0 +1,240 @@
+"""
+Clusters de traductions hreflang pour sites multilingues
+Évite de payer un matching IA par langue quand l'arborescence est traduite
+"""
+
+from typing import Dict, List, Optional, Tuple, Iterable, Any
+
+
+def normalize_hreflang(hreflang: str) -> Optional[str]:
+    """
+    Ramène un code hreflang à la langue principale
+    
+    Args:
+        hreflang: Code hreflang (ex: 'fr-FR', 'en-gb', 'x-default')
+    
+    Returns:
+        Code langue (ex: 'fr', 'en') ou None pour x-default / code vide
+    """
+    if not hreflang:
+        return None
+    
+    code = hreflang.strip().lower().replace('_', '-')
+    if not code or code == 'x-default':
+        return None
+    
+    return code.split('-')[0]
+
+
+def _url_key(url: str) -> str:
+    """Clé de comparaison d'une URL (insensible au trailing slash)"""
+    url = url.strip()
+    if url.endswith('/') and url.count('/') > 3:
+        url = url.rstrip('/')
+    return url
+
+
+class TranslationClusters:
+    """
+    Regroupe les URLs d'un site en clusters de traductions
+    
+    Deux URLs reliées par un lien hreflang (dans un sens ou dans l'autre)
+    appartiennent au même cluster (union-find). Chaque cluster associe
+    une langue à une URL.
+    """
+    
+    def __init__(self):
+        self._parent: Dict[str, str] = {}
+        self._languages: Dict[str, Dict[str, str]] = {}
+        self._cluster_cache: Optional[Dict[str, Dict[str, str]]] = None
+    
+    @classmethod
+    def from_alternates(cls, alternates_by_url: Dict[str, Dict[str, str]]) -> 'TranslationClusters':
+        """
+        Construit les clusters depuis un dictionnaire {url: {hreflang: url}}
+        
+        Args:
+            alternates_by_url: Alternates hreflang par URL (sitemap ou crawl)
+        
+        Returns:
+            Clusters de traductions
+        """
+        clusters = cls()
+        for url, alternates in alternates_by_url.items():
+            clusters.add(url, alternates)
+        return clusters
+    
+    def add(self, url: str, alternates: Dict[str, str]) -> None:
+        """
+        Ajoute une URL et ses traductions
+        
+        Args:
+            url: URL de la page
+            alternates: Traductions {hreflang: url}
+        """
+        self._register(url)
+        
+        for hreflang, alternate_url in alternates.items():
+            self._register(alternate_url)
+            self._union(url, alternate_url)
+            
+            language = normalize_hreflang(hreflang)
+            if language:
+                self._pending_language(alternate_url, language)
+        
+        # Les langues par cluster seront recalculées à la prochaine lecture
+        self._cluster_cache = None
+    
+    def get_translation(self, url: str, language: str) -> Optional[str]:
+        """
+        Retourne la traduction d'une URL dans une langue
+        
+        Args:
+            url: URL de référence
+            language: Code langue cible (ex: 'en')
+        
+        Returns:
+            URL traduite ou None si inconnue
+        """
+        key = _url_key(url)
+        if key not in self._parent:
+            return None
+        
+        languages = self._cluster_languages(self._find(key))
+        return languages.get(language)
+    
+    def get_cluster(self, url: str) -> Dict[str, str]:
+        """Retourne toutes les traductions connues d'une URL {langue: url}"""
+        key = _url_key(url)
+        if key not in self._parent:
+            return {}
+        return dict(self._cluster_languages(self._find(key)))
+    
+    def has_url(self, url: str) -> bool:
+        """Indique si l'URL appartient à un cluster"""
+        return _url_key(url) in self._parent
+    
+    def cluster_count(self) -> int:
+        """Nombre de clusters (pages distinctes, toutes langues confondues)"""
+        return len({self._find(key) for key in self._parent})
+    
+    def _register(self, url: str) -> None:
+        """Crée un cluster singleton pour une URL inconnue"""
+        key = _url_key(url)
+        if key not in self._parent:
+            self._parent[key] = key
+    
+    def _pending_language(self, url: str, language: str) -> None:
+        """Mémorise la langue d'une URL (résolue par cluster à la lecture)"""
+        self._languages.setdefault(_url_key(url), {})[language] = url.strip()
+    
+    def _find(self, key: str) -> str:
+        """Retourne la racine du cluster d'une clé (avec compression de chemin)"""
+        root = key
+        while self._parent[root] != root:
+            root = self._parent[root]
+        
+        while self._parent[key] != root:
+            self._parent[key], key = root, self._parent[key]
+        
+        return root
+    
+    def _union(self, url1: str, url2: str) -> None:
+        """Fusionne les clusters de deux URLs"""
+        root1 = self._find(_url_key(url1))
+        root2 = self._find(_url_key(url2))
+        if root1 != root2:
+            self._parent[root2] = root1
+    
+    def _cluster_languages(self, root: str) -> Dict[str, str]:
+        """Retourne les URLs par langue d'un cluster (index recalculé si besoin)"""
+        cache = self._cluster_cache
+        if cache is None:
+            cache = {}
+            for key, languages in self._languages.items():
+                cluster = cache.setdefault(self._find(key), {})
+                for language, url in languages.items():
+                    cluster.setdefault(language, url)
+            self._cluster_cache = cache
+        
+        return cache.get(root, {})
+
+
+def choose_pivot_language(languages: Iterable[str],
+                          old_grouped: Dict[str, List[str]],
+                          old_clusters: TranslationClusters) -> Optional[str]:
+    """
+    Choisit la langue pivot : celle dont le plus d'URLs sont en cluster
+    
+    Args:
+        languages: Langues communes aux deux sites
+        old_grouped: URLs de l'ancien site groupées par langue
+        old_clusters: Clusters hreflang de l'ancien site
+    
+    Returns:
+        Code langue pivot ou None si aucune URL n'est en cluster
+    """
+    best_lang = None
+    best_score = (0, 0)
+    
+    for lang in sorted(languages):
+        urls = old_grouped.get(lang, [])
+        clustered = sum(1 for url in urls if old_clusters.has_url(url))
+        score = (clustered, len(urls))
+        if clustered and score > best_score:
+            best_lang = lang
+            best_score = score
+    
+    return best_lang
+
+
+def propagate_matches(pivot_matches: List[Dict[str, Any]],
+                      old_clusters: TranslationClusters,
+                      new_clusters: TranslationClusters,
+                      language: str,
+                      old_urls: List[str],
+                      new_urls: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Dérive les correspondances d'une langue depuis celles de la langue pivot
+    
+    Pour chaque correspondance pivot (ancienne → nouvelle), on suit le cluster
+    de l'ancienne URL et celui de la nouvelle URL jusqu'à la langue cible.
+    
+    Args:
+        pivot_matches: Correspondances IA de la langue pivot
+        old_clusters: Clusters hreflang de l'ancien site
+        new_clusters: Clusters hreflang du nouveau site
+        language: Langue cible
+        old_urls: URLs de l'ancien site dans la langue cible
+        new_urls: URLs du nouveau site dans la langue cible
+    
+    Returns:
+        Tuple (correspondances dérivées, URLs anciennes restant à matcher)
+    """
+    old_by_key = {_url_key(url): url for url in old_urls}
+    new_by_key = {_url_key(url): url for url in new_urls}
+    
+    derived = []
+    resolved = set()
+    
+    for match in pivot_matches:
+        old_translation = old_clusters.get_translation(match['ancienne'], language)
+        new_translation = new_clusters.get_translation(match['nouvelle'], language)
+        if not old_translation or not new_translation:
+            continue
+        
+        old_url = old_by_key.get(_url_key(old_translation))
+        new_url = new_by_key.get(_url_key(new_translation))
+        if old_url is None or new_url is None or old_url in resolved:
+            continue
+        
+        resolved.add(old_url)
+        derived.append({
+            "ancienne": old_url,
+            "nouvelle": new_url,
+            "confidence": match.get("confidence", 0),
+            "raison": f"Traduction hreflang de {match['ancienne']} → {match['nouvelle']}"
+        })
+    
+    remaining = [url for url in old_urls if url not in resolved]
+    return derived, remaining
@@ -0,0 +1,128 @@
+"""
+Orchestration concurrente du matching IA multilangue
+Les lots de toutes les langues partagent un même pool de travail limité en débit
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from ai_mapper import AIMapper, AIMatchingError, MatchResult
+except ImportError:
+    from src.ai_mapper import AIMapper, AIMatchingError, MatchResult
+
+
+@dataclass
+class LanguageProgress:
+    """Avancement du matching d'une langue"""
+    langue: str
+    total: int
+    received: int = 0
+    status: str = "en attente"  # en attente, en cours, terminé, échec
+    error: Optional[str] = None
+    
+    @property
+    def fraction(self) -> float:
+        """Part des anciennes URLs déjà associées (1.0 une fois la langue terminée)"""
+        if self.status in ("terminé", "échec") or not self.total:
+            return 1.0
+        return min(1.0, self.received / self.total)
+
+
+class MultiLanguagePipeline:
+    """
+    Matching IA de plusieurs langues dans un pool de travail unique
+    
+    Toutes les langues sont lancées ensemble : leurs lots se partagent un
+    sémaphore (lots en vol) et le limiteur RPM/TPM du mapper. La durée totale
+    devient celle de la plus grosse langue plutôt que la somme des langues.
+    Les callbacks sont appelés dans le thread qui exécute run() (compatible
+    Streamlit).
+    """
+    
+    def __init__(self, ai_mapper: AIMapper, max_concurrency: Optional[int] = None,
+                 on_progress: Optional[Callable[[LanguageProgress], None]] = None,
+                 on_language_done: Optional[Callable[[str, MatchResult], None]] = None):
+        """
+        Initialise le pipeline
+        
+        Args:
+            ai_mapper: Mapper IA partagé par toutes les langues
+            max_concurrency: Lots en vol toutes langues confondues (défaut: celui du mapper)
+            on_progress: Appelé à chaque correspondance reçue et changement de statut
+            on_language_done: Appelé avec le résultat de chaque langue dès qu'elle se termine
+        """
+        self.ai_mapper = ai_mapper
+        self.max_concurrency = max_concurrency or ai_mapper.max_concurrency
+        self.on_progress = on_progress
+        self.on_language_done = on_language_done
+        self.progress: Dict[str, LanguageProgress] = {}
+    
+    def run(self, jobs: Dict[str, Tuple[List[str], List[str]]], contexte_metier: str = "",
+            min_confidence: float = 0.0) -> Dict[str, MatchResult]:
+        """
+        Exécute le matching de toutes les langues (bloquant)
+        
+        Args:
+            jobs: {langue: (anciennes URLs, nouvelles URLs)}
+            contexte_metier: Contexte métier du projet
+            min_confidence: Seuil minimum de confidence (0.0 = résultat brut, seuil appliqué à la lecture)
+        
+        Returns:
+            {langue: MatchResult} ; une langue en échec renvoie ses URLs en non matchées
+        """
+        return asyncio.run(self.run_async(jobs, contexte_metier, min_confidence))
+    
+    async def run_async(self, jobs: Dict[str, Tuple[List[str], List[str]]], contexte_metier: str = "",
+                        min_confidence: float = 0.0) -> Dict[str, MatchResult]:
+        """Variante asynchrone de run()"""
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        self.progress = {
+            langue: LanguageProgress(langue=langue, total=len(old_urls))
+            for langue, (old_urls, new_urls) in jobs.items()
+        }
+        results = {}
+        
+        async def run_language(langue: str, old_urls: List[str], new_urls: List[str]):
+            progress = self.progress[langue]
+            self._update(progress, status="en cours")
+            
+            def on_match(match: Dict[str, Any]):
+                progress.received += 1
+                self._notify(progress)
+            
+            try:
+                result = await self.ai_mapper.match_urls_async(
+                    old_urls, new_urls, contexte_metier=contexte_metier, langue=langue,
+                    min_confidence=min_confidence, on_match=on_match, concurrency_limiter=limiter
+                )
+                self._update(progress, status="terminé")
+            except AIMatchingError as e:
+                # Une langue en échec ne bloque pas les autres : ses URLs sont abandonnées
+                # (distinctes des non matchées, retentées à la génération suivante)
+                result = MatchResult(correspondances=[], non_matchees=[], abandonnees=list(old_urls))
+                self._update(progress, status="échec", error=str(e))
+            
+            results[langue] = result
+            if self.on_language_done is not None:
+                self.on_language_done(langue, result)
+        
+        await asyncio.gather(*(
+            run_language(langue, old_urls, new_urls)
+            for langue, (old_urls, new_urls) in jobs.items()
+        ))
+        
+        # Ordre des langues de `jobs`, quel que soit l'ordre de fin
+        return {langue: results[langue] for langue in jobs}
+    
+    def _update(self, progress: LanguageProgress, **changes):
+        """Modifie l'avancement d'une langue et le notifie"""
+        for name, value in changes.items():
+            setattr(progress, name, value)
+        self._notify(progress)
+    
+    def _notify(self, progress: LanguageProgress):
+        """Transmet l'avancement au callback"""
+        if self.on_progress is not None:
+            self.on_progress(progress)
@@ -0,0 +1,279 @@
+"""
+Pré-matching local déterministe avant l'appel à l'IA
+Résout les paires évidentes (slug identique, accents, mots vides, section renommée)
+"""
+
+import re
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple, Optional, Set
+
+import numpy as np
+
+try:
+    from candidate_index import tokenize_url
+except ImportError:
+    from src.candidate_index import tokenize_url
+
+
+# Mots vides ignorés dans les slugs (multilingue)
+DEFAULT_STOP_WORDS = {
+    # fr
+    'le', 'la', 'les', 'l', 'un', 'une', 'des', 'de', 'du', 'd', 'et', 'a', 'au', 'aux',
+    'en', 'pour', 'par', 'sur', 'nos', 'notre', 'vos', 'votre',
+    # en
+    'the', 'a', 'an', 'of', 'and', 'for', 'to', 'in', 'on', 'our', 'your',
+    # de / nl / es / it
+    'der', 'die', 'das', 'und', 'het', 'een', 'van', 'el', 'los', 'las', 'y', 'il', 'lo', 'e', 'di'
+}
+
+# Extensions techniques sans valeur sémantique
+IGNORED_TOKENS = {'html', 'htm', 'php', 'asp', 'aspx', 'jsp'}
+
+_NUMBER = re.compile(r'\d+')
+
+
+def batch_edit_similarity(source: str, candidates: List[str]) -> np.ndarray:
+    """
+    Similarité de Levenshtein entre une chaîne et un lot de candidates
+    
+    La programmation dynamique est vectorisée sur les candidates : une seule
+    boucle Python par caractère des deux chaînes, quel que soit le lot.
+    
+    Args:
+        source: Chaîne de référence
+        candidates: Chaînes à comparer
+    
+    Returns:
+        Tableau de similarités (1 - distance / longueur max), entre 0 et 1
+    """
+    if not candidates:
+        return np.zeros(0, dtype=np.float32)
+    
+    lengths = np.array([len(c) for c in candidates], dtype=np.int32)
+    max_length = int(lengths.max()) if len(lengths) else 0
+    
+    # Candidates encodées en codes Unicode, complétées par -1
+    encoded = np.full((len(candidates), max_length), -1, dtype=np.int32)
+    for row, candidate in enumerate(candidates):
+        encoded[row, :len(candidate)] = [ord(char) for char in candidate]
+    
+    previous = np.tile(np.arange(max_length + 1, dtype=np.int32), (len(candidates), 1))
+    
+    for i, char in enumerate(source, start=1):
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        substitution = previous[:, :-1] + (encoded != ord(char))
+        deletion = previous[:, 1:] + 1
+        best = np.minimum(substitution, deletion)
+        # L'insertion dépend de la colonne précédente de la ligne courante
+        for j in range(1, max_length + 1):
+            current[:, j] = np.minimum(best[:, j - 1], current[:, j - 1] + 1)
+        previous = current
+    
+    distances = previous[np.arange(len(candidates)), lengths]
+    longest = np.maximum(lengths, len(source))
+    longest[longest == 0] = 1
+    return (1.0 - distances / longest).astype(np.float32)
+
+
+class LocalPreMatcher:
+    """
+    Pré-matcher local : accepte uniquement les paires sans ambiguïté
+    
+    Étapes, de la plus stricte à la plus tolérante :
+    1. chemin normalisé identique (accents, casse, mots vides, extensions)
+    2. dernier segment identique sous une section renommée, si le slug est
+       spécifique ou si les sections se recoupent (un slug générique comme
+       page-2, index ou contact sous une section sans rapport va à l'IA)
+    3. Jaccard des tokens du chemin
+    4. distance d'édition sur le dernier segment
+    Une paire n'est acceptée que si la meilleure candidate devance nettement
+    la deuxième (marge), sinon l'URL reste pour l'IA. Aux étapes 3 et 4, les
+    nombres des deux slugs doivent aussi être identiques (mobil-home-4-places
+    et mobil-home-6-places sont deux pages distinctes).
+    """
+    
+    def __init__(self, jaccard_threshold: float = 0.8, edit_threshold: float = 0.9,
+                 min_margin: float = 0.1, stop_words: Optional[Set[str]] = None):
+        """
+        Initialise le pré-matcher
+        
+        Args:
+            jaccard_threshold: Score Jaccard minimum sur les tokens du chemin
+            edit_threshold: Similarité d'édition minimum sur le dernier segment
+            min_margin: Écart minimum entre la meilleure et la deuxième candidate
+            stop_words: Mots vides ignorés (défaut: liste multilingue)
+        """
+        self.jaccard_threshold = jaccard_threshold
+        self.edit_threshold = edit_threshold
+        self.min_margin = min_margin
+        self.stop_words = DEFAULT_STOP_WORDS if stop_words is None else stop_words
+    
+    def normalize(self, url: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """
+        Normalise une URL en tokens significatifs
+        
+        Args:
+            url: URL à normaliser
+        
+        Returns:
+            Tuple (tokens du chemin complet, tokens du dernier segment)
+        """
+        segments = [s for s in url.split('://')[-1].split('?')[0].split('#')[0].split('/')[1:] if s]
+        all_tokens = []
+        last_tokens = ()
+        
+        for segment in segments:
+            tokens = tuple(
+                token for token in tokenize_url('/' + segment)
+                if token not in self.stop_words and token not in IGNORED_TOKENS
+            )
+            if tokens:
+                all_tokens.extend(tokens)
+                last_tokens = tokens
+        
+        return tuple(all_tokens), last_tokens
+    
+    def match(self, old_urls: List[str], new_urls: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Résout localement les paires évidentes
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+        
+        Returns:
+            Tuple (correspondances locales, URLs anciennes restant pour l'IA)
+        """
+        if not old_urls or not new_urls:
+            return [], list(old_urls)
+        
+        new_normalized = [self.normalize(url) for url in new_urls]
+        
+        by_full = defaultdict(list)
+        by_last = defaultdict(list)
+        for index, (full_tokens, last_tokens) in enumerate(new_normalized):
+            if full_tokens:
+                by_full[full_tokens].append(index)
+            if last_tokens:
+                by_last[last_tokens].append(index)
+        
+        # Index inversé token -> nouvelles URLs pour le Jaccard vectorisé
+        token_postings = defaultdict(list)
+        for index, (full_tokens, _) in enumerate(new_normalized):
+            for token in set(full_tokens):
+                token_postings[token].append(index)
+        token_postings = {t: np.array(ids, dtype=np.int32) for t, ids in token_postings.items()}
+        new_sizes = np.array([len(set(full)) for full, _ in new_normalized], dtype=np.float32)
+        
+        new_slugs = ['-'.join(last) for _, last in new_normalized]
+        slug_lengths = np.array([len(slug) for slug in new_slugs], dtype=np.int32)
+        
+        matches = []
+        remaining = []
+        
+        for old_url in old_urls:
+            full_tokens, last_tokens = self.normalize(old_url)
+            found = None
+            
+            if full_tokens and len(by_full.get(full_tokens, [])) == 1:
+                found = (by_full[full_tokens][0], 1.0, "Chemin identique après normalisation")
+            elif last_tokens and len(by_last.get(last_tokens, [])) == 1:
+                index = by_last[last_tokens][0]
+                if self._slug_corroborated(full_tokens, last_tokens, new_normalized[index][0]):
+                    found = (index, 0.95, "Même slug final (section renommée)")
+            elif full_tokens:
+                found = self._match_jaccard(full_tokens, token_postings, new_sizes)
+                if found is None and last_tokens:
+                    found = self._match_edit(last_tokens, new_slugs, slug_lengths)
+                # Un numéro différent (page-12 / page-13) désigne une autre page : à l'IA
+                if found is not None and \
+                        _NUMBER.findall('-'.join(last_tokens)) != _NUMBER.findall(new_slugs[found[0]]):
+                    found = None
+            
+            if found is None:
+                remaining.append(old_url)
+                continue
+            
+            index, confidence, reason = found
+            matches.append({
+                "ancienne": old_url,
+                "nouvelle": new_urls[index],
+                "confidence": round(float(confidence), 2),
+                "raison": f"Local : {reason}",
+                "methode": "local"
+            })
+        
+        return matches, remaining
+    
+    def _slug_corroborated(self, old_tokens: Tuple[str, ...], last_tokens: Tuple[str, ...],
+                           new_tokens: Tuple[str, ...]) -> bool:
+        """
+        Vérifie qu'un slug final identique suffit à valider la paire
+        
+        Args:
+            old_tokens: Tokens du chemin de l'ancienne URL
+            last_tokens: Tokens du slug final commun
+            new_tokens: Tokens du chemin de la nouvelle URL
+        
+        Returns:
+            True si le slug compte au moins deux mots significatifs, ou si les
+            sections des deux URLs partagent un mot (codes langue exclus)
+        """
+        words = [token for token in last_tokens if len(token) >= 3 and not token.isdigit()]
+        if len(words) >= 2:
+            return True
+        
+        old_sections = {token for token in old_tokens[:-len(last_tokens)] if len(token) >= 3}
+        new_sections = {token for token in new_tokens[:-len(last_tokens)] if len(token) >= 3}
+        return bool(old_sections & new_sections)
+    
+    def _match_jaccard(self, tokens: Tuple[str, ...], token_postings: Dict[str, np.ndarray],
+                       new_sizes: np.ndarray) -> Optional[Tuple[int, float, str]]:
+        """Meilleure candidate par Jaccard des tokens, si nette"""
+        token_set = set(tokens)
+        postings = [token_postings[t] for t in token_set if t in token_postings]
+        if not postings:
+            return None
+        
+        candidates = np.concatenate(postings)
+        intersections = np.bincount(candidates, minlength=len(new_sizes)).astype(np.float32)
+        unions = len(token_set) + new_sizes - intersections
+        unions[unions == 0] = 1.0
+        scores = intersections / unions
+        
+        return self._pick_best(scores, self.jaccard_threshold, "tokens du chemin similaires")
+    
+    def _match_edit(self, last_tokens: Tuple[str, ...], new_slugs: List[str],
+                    slug_lengths: np.ndarray) -> Optional[Tuple[int, float, str]]:
+        """Meilleure candidate par distance d'édition sur le slug, si nette"""
+        slug = '-'.join(last_tokens)
+        
+        # Au-delà de cet écart de longueur, le seuil est inatteignable
+        max_gap = int(len(slug) * (1 - self.edit_threshold) / self.edit_threshold) + 1
+        window = np.nonzero(np.abs(slug_lengths - len(slug)) <= max_gap)[0]
+        if not len(window):
+            return None
+        
+        scores = np.zeros(len(new_slugs), dtype=np.float32)
+        scores[window] = batch_edit_similarity(slug, [new_slugs[i] for i in window])
+        
+        return self._pick_best(scores, self.edit_threshold, "slug quasi identique")
+    
+    def _pick_best(self, scores: np.ndarray, threshold: float,
+                   reason: str) -> Optional[Tuple[int, float, str]]:
+        """Retourne la meilleure candidate si elle dépasse le seuil avec la marge requise"""
+        if len(scores) == 0:
+            return None
+        
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        if best_score < threshold:
+            return None
+        
+        if len(scores) > 1:
+            second_score = float(np.partition(scores, -2)[-2])
+            if best_score - second_score < self.min_margin:
+                return None
+        
+        return best, best_score, reason
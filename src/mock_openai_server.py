@@ -0,0 +1,363 @@
+"""
+Serveur HTTP local compatible OpenAI (chat.completions) pour tests et benchmarks
+Latence, débit de tokens, erreurs 429/5xx et troncature configurables, sans coût API
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from candidate_index import CandidateIndex
+    from token_estimator import TokenEstimator
+    from ai_recording import ReplayStore
+except ImportError:
+    from src.candidate_index import CandidateIndex
+    from src.token_estimator import TokenEstimator
+    from src.ai_recording import ReplayStore
+
+
+_NUMBERED_LINE = re.compile(r"^(\d+): (.*)$")
+
+
+@dataclass
+class MockServerConfig:
+    """Comportement simulé du serveur"""
+    latency_seconds: float = 0.05  # Délai avant le premier token
+    tokens_per_second: float = 0.0  # Débit de génération (0 = instantané)
+    rate_limit_rate: float = 0.0  # Proportion de réponses 429
+    error_rate: float = 0.0  # Proportion de réponses 5xx
+    error_status: int = 503
+    truncate_rate: float = 0.0  # Proportion de réponses coupées (finish_reason=length)
+    retry_after_seconds: float = 1.0
+    seed: int = 42
+    prefix_cache_min_tokens: int = 1024  # Préfixe minimum mis en cache (0 = cache désactivé)
+    prefix_cache_block: int = 128  # Granularité des tokens en cache
+
+
+def _extract_block(prompt: str, header: str, next_header: str) -> List[str]:
+    """Extrait les lignes d'URLs d'un bloc du prompt de matching"""
+    if header not in prompt:
+        return []
+    
+    block = prompt.split(header, 1)[1].split("\n", 1)[-1]
+    block = block.split(next_header, 1)[0]
+    return [line.strip() for line in block.strip().split("\n") if line.strip()]
+
+
+def deterministic_responder(request: Dict[str, Any]) -> str:
+    """
+    Répond au prompt de matching de AIMapper par similarité lexicale
+    
+    Chaque ancienne URL est associée à sa meilleure candidate TF-IDF ; la
+    réponse suit le protocole du prompt (JSON complet ou indices compacts).
+    
+    Args:
+        request: Corps JSON de la requête chat.completions
+    
+    Returns:
+        Contenu de la réponse (JSON)
+    """
+    prompt = request["messages"][-1]["content"]
+    old_lines = _extract_block(prompt, "ANCIENNES URLS", "NOUVELLES URLS")
+    new_lines = _extract_block(prompt, "NOUVELLES URLS", "LANGUE PRINCIPALE")
+    
+    compact = bool(old_lines) and all(_NUMBERED_LINE.match(line) for line in old_lines)
+    if compact:
+        old_urls = [_NUMBERED_LINE.match(line).group(2) for line in old_lines]
+        new_urls = [_NUMBERED_LINE.match(line).group(2) for line in new_lines]
+    else:
+        old_urls, new_urls = old_lines, new_lines
+    
+    index = CandidateIndex(new_urls) if new_urls else None
+    matched = []
+    unmatched = []
+    
+    for old_idx, url in enumerate(old_urls):
+        hits = index.search(url, 1) if index is not None else []
+        if hits and hits[0][1] >= 0.2:
+            matched.append((old_idx, hits[0][0], round(0.6 + 0.39 * hits[0][1], 2)))
+        else:
+            unmatched.append(old_idx)
+    
+    if compact:
+        return json.dumps({
+            "m": [[old_idx, new_idx, int(confidence * 100)] for old_idx, new_idx, confidence in matched],
+            "u": unmatched
+        })
+    
+    return json.dumps({
+        "correspondances": [
+            {
+                "ancienne": old_urls[old_idx],
+                "nouvelle": new_urls[new_idx],
+                "confidence": confidence,
+                "raison": "Similarité lexicale (serveur simulé)"
+            }
+            for old_idx, new_idx, confidence in matched
+        ],
+        "non_matchees": [old_urls[old_idx] for old_idx in unmatched]
+    }, ensure_ascii=False)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    """Serveur HTTP multi-thread portant l'état du serveur simulé"""
+    daemon_threads = True
+    mock: "MockOpenAIServer"
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    """Routeur HTTP : POST /v1/chat/completions uniquement"""
+    
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Route inconnue", "type": "invalid_request_error"}})
+            return
+        
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "JSON invalide", "type": "invalid_request_error"}})
+            return
+        
+        self.server.mock.handle(self, request)
+    
+    def log_message(self, format, *args):
+        """Journal HTTP désactivé (benchmarks)"""
+        pass
+    
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        """Envoie une réponse JSON"""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockOpenAIServer:
+    """
+    Stand-in local de l'API OpenAI chat.completions
+    
+    Les réponses viennent d'un enregistrement (ReplayStore) quand la requête
+    est connue, sinon du répondeur (par défaut: deterministic_responder).
+    Les fautes sont tirées avec un générateur pseudo-aléatoire initialisé
+    par `seed` pour des scénarios reproductibles.
+    
+    Exemple :
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0.2)) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url)
+    """
+    
+    def __init__(self, config: Optional[MockServerConfig] = None,
+                 responder: Callable[[Dict[str, Any]], str] = deterministic_responder,
+                 replay_store: Optional[ReplayStore] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialise le serveur (démarré par start() ou le gestionnaire de contexte)
+        
+        Args:
+            config: Comportement simulé
+            responder: Fonction requête -> contenu de la réponse
+            replay_store: Enregistrements rejoués en priorité
+            host: Adresse d'écoute
+            port: Port d'écoute (0 = port libre attribué par le système)
+        """
+        self.config = config or MockServerConfig()
+        self.responder = responder
+        self.replay_store = replay_store
+        self.token_estimator = TokenEstimator(use_tiktoken=False)
+        
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._seen_prompts: List[str] = []
+        self._thread: Optional[threading.Thread] = None
+        
+        self._httpd = _MockHTTPServer((host, port), _MockRequestHandler)
+        self._httpd.mock = self
+        
+        self.statistics = {
+            'requests': 0,
+            'rate_limited': 0,
+            'server_errors': 0,
+            'truncated': 0,
+            'replayed': 0,
+            'streamed': 0,
+            'cached_tokens': 0
+        }
+    
+    @property
+    def base_url(self) -> str:
+        """URL de base à passer au client OpenAI"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self) -> "MockOpenAIServer":
+        """Démarre le serveur dans un thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Arrête le serveur"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retourne les compteurs du serveur
+        
+        Returns:
+            Dictionnaire avec les statistiques
+        """
+        with self._lock:
+            return dict(self.statistics)
+    
+    def handle(self, handler: _MockRequestHandler, request: Dict[str, Any]):
+        """Traite une requête chat.completions"""
+        with self._lock:
+            self.statistics['requests'] += 1
+            draw = self._random.random()
+            truncate = self._random.random() < self.config.truncate_rate
+        
+        # Fautes injectées avant toute génération
+        if draw < self.config.rate_limit_rate:
+            self._count('rate_limited')
+            handler._send_json(429, {"error": {"message": "Rate limit reached (simulé)",
+                                               "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                               {"Retry-After": str(self.config.retry_after_seconds)})
+            return
+        if draw < self.config.rate_limit_rate + self.config.error_rate:
+            self._count('server_errors')
+            handler._send_json(self.config.error_status, {"error": {"message": "Erreur serveur (simulée)",
+                                                                    "type": "server_error"}})
+            return
+        
+        content = self._generate(request)
+        finish_reason = "stop"
+        if truncate:
+            self._count('truncated')
+            content = content[:max(1, int(len(content) * 0.6))]
+            finish_reason = "length"
+        
+        prompt_text = "".join(message.get("content", "") for message in request.get("messages", []))
+        usage = {
+            "prompt_tokens": self.token_estimator.count_raw(prompt_text),
+            "completion_tokens": self.token_estimator.count_raw(content),
+            "prompt_tokens_details": {"cached_tokens": self._cached_prefix_tokens(prompt_text)}
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        
+        time.sleep(self.config.latency_seconds)
+        
+        if request.get("stream"):
+            self._count('streamed')
+            self._send_stream(handler, request, content, finish_reason, usage)
+        else:
+            self._pace(usage["completion_tokens"])
+            handler._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason
+                }],
+                "usage": usage
+            })
+    
+    def _generate(self, request: Dict[str, Any]) -> str:
+        """Contenu de la réponse : enregistrement rejoué ou répondeur"""
+        if self.replay_store is not None:
+            record = self.replay_store.lookup(request)
+            if record is not None:
+                self._count('replayed')
+                return record["content"]
+        return self.responder(request)
+    
+    def _send_stream(self, handler: _MockRequestHandler, request: Dict[str, Any],
+                     content: str, finish_reason: str, usage: Dict[str, int]):
+        """Envoie la réponse en Server-Sent Events, au débit de tokens configuré"""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        base = {"id": completion_id, "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": request.get("model", "mock")}
+        
+        # ~4 caractères par token
+        for start in range(0, len(content), 4):
+            piece = content[start:start + 4]
+            self._write_event(handler, dict(base, choices=[{
+                "index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None
+            }]))
+            self._pace(1)
+        
+        self._write_event(handler, dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._write_event(handler, dict(base, choices=[], usage=usage))
+        
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+    
+    def _write_event(self, handler: _MockRequestHandler, payload: Dict[str, Any]):
+        """Écrit un événement SSE"""
+        handler.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+        handler.wfile.flush()
+    
+    def _cached_prefix_tokens(self, prompt_text: str) -> int:
+        """
+        Simule le cache de préfixe du fournisseur
+        
+        Tokens du plus long préfixe commun avec un prompt déjà reçu, par
+        blocs de prefix_cache_block, à partir de prefix_cache_min_tokens.
+        """
+        if self.config.prefix_cache_min_tokens <= 0:
+            return 0
+        
+        with self._lock:
+            seen = list(self._seen_prompts)
+            self._seen_prompts = (self._seen_prompts + [prompt_text])[-64:]
+        
+        prefix = max((os.path.commonprefix([prompt_text, other]) for other in seen), key=len, default="")
+        tokens = self.token_estimator.count_raw(prefix)
+        tokens -= tokens % self.config.prefix_cache_block
+        if tokens < self.config.prefix_cache_min_tokens:
+            return 0
+        
+        with self._lock:
+            self.statistics['cached_tokens'] += tokens
+        return tokens
+    
+    def _pace(self, tokens: int):
+        """Simule le temps de génération de `tokens` tokens"""
+        if self.config.tokens_per_second > 0 and tokens > 0:
+            time.sleep(tokens / self.config.tokens_per_second)
+    
+    def _count(self, name: str):
+        """Incrémente un compteur"""
+        with self._lock:
+            self.statistics[name] += 1
@@ -0,0 +1,351 @@
+"""
+Cascade de modèles par niveau de confidence
+Scorer local d'abord, modèle rapide ensuite, modèle fort pour les seules paires incertaines
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable, Tuple, Set
+
+try:
+    from ai_mapper import AIMapper, AIMatchingError, MatchResult
+    from embedding_matcher import EmbeddingMatcher
+except ImportError:
+    from src.ai_mapper import AIMapper, AIMatchingError, MatchResult
+    from src.embedding_matcher import EmbeddingMatcher
+
+
+# Nom du palier du scorer local (sans appel API, absent du journal)
+LOCAL_TIER = "local"
+
+
+@dataclass
+class CascadeTier:
+    """Palier de la cascade : un mapper et le seuil d'acceptation de ses réponses"""
+    mapper: AIMapper
+    accept_confidence: float = 0.85
+
+
+class ModelCascade:
+    """
+    Cascade de matching : chaque palier ne traite que ce que les précédents n'ont pas tranché
+    
+    1. Le scorer local (embeddings hachés) accepte les paires au-dessus de
+       local_accept, sans appel API.
+    2. Chaque palier IA reçoit les URLs restantes ; ses correspondances au
+       moins égales à accept_confidence sont définitives, les autres (et les
+       URLs non matchées ou abandonnées) passent au palier suivant.
+    3. Le dernier palier (modèle fort, plus de candidates) tranche ; les URLs
+       qu'il abandonne restent abandonnées (MatchResult.abandonnees).
+    
+    Même interface que AIMapper (match_urls, match_urls_async, statistiques) :
+    la cascade se branche dans MultiLanguagePipeline. Chaque palier IA
+    journalise ses appels sous son nom : UsageLedger.summary()["by_tier"]
+    donne la dépense et le temps par palier.
+    """
+    
+    def __init__(self, tiers: List[CascadeTier], local_matcher: Optional[EmbeddingMatcher] = None,
+                 local_accept: float = 0.9):
+        """
+        Initialise la cascade
+        
+        Args:
+            tiers: Paliers IA, du moins cher au plus fort
+            local_matcher: Scorer local appliqué avant tout appel (None = aucun)
+            local_accept: Confidence à partir de laquelle le scorer local suffit
+        """
+        if not tiers:
+            raise ValueError("La cascade nécessite au moins un palier IA")
+        
+        self.tiers = tiers
+        self.local_matcher = local_matcher
+        self.local_accept = local_accept
+        self.max_concurrency = max(tier.mapper.max_concurrency for tier in tiers)
+        
+        # Chaque palier journalise ses appels sous son nom
+        for tier in tiers:
+            tier.mapper.tier = tier.mapper.tier or tier.mapper.model
+        
+        names = ([LOCAL_TIER] if local_matcher is not None else []) + [tier.mapper.tier for tier in tiers]
+        self.statistics = {name: {"urls": 0, "accepted": 0, "escalated": 0, "time_s": 0.0} for name in names}
+        self._stats_lock = threading.Lock()
+    
+    @classmethod
+    def from_models(cls, api_key: str, fast_model: str = "gpt-4o-mini",
+                    strong_model: Optional[str] = "gpt-4o", escalate_below: float = 0.85,
+                    local_accept: Optional[float] = 0.9, candidates_factor: int = 2,
+                    **mapper_kwargs) -> 'ModelCascade':
+        """
+        Cascade standard : scorer local, modèle rapide, modèle fort avec plus de candidates
+        
+        Args:
+            api_key: Clé API OpenAI
+            fast_model: Modèle des URLs non résolues localement
+            strong_model: Modèle des paires incertaines (None = pas de palier fort)
+            escalate_below: Confidence sous laquelle une réponse du modèle rapide est escaladée
+            local_accept: Confidence à partir de laquelle le scorer local suffit (None = pas de scorer local)
+            candidates_factor: Multiplicateur des candidates montrées au modèle fort
+            **mapper_kwargs: Réglages communs aux mappers (température, cache, journal, ...)
+        
+        Returns:
+            Cascade configurée
+        """
+        max_candidates = mapper_kwargs.pop("max_candidates", 200)
+        candidates_per_url = mapper_kwargs.pop("candidates_per_url", 20)
+        
+        tiers = [CascadeTier(
+            AIMapper(api_key, model=fast_model, tier="rapide", max_candidates=max_candidates,
+                     candidates_per_url=candidates_per_url, **mapper_kwargs),
+            accept_confidence=escalate_below
+        )]
+        if strong_model:
+            tiers.append(CascadeTier(AIMapper(
+                api_key, model=strong_model, tier="renfort",
+                max_candidates=max_candidates * candidates_factor,
+                candidates_per_url=candidates_per_url * candidates_factor, **mapper_kwargs
+            )))
+        
+        if local_accept is None:
+            return cls(tiers)
+        return cls(tiers, local_matcher=EmbeddingMatcher(), local_accept=local_accept)
+    
+    def match_urls(self, old_urls: List[str], new_urls: List[str],
+                   contexte_metier: str = "", langue: str = "fr",
+                   min_confidence: float = 0.0,
+                   on_match: Optional[Callable[[Dict[str, Any]], None]] = None) -> MatchResult:
+        """
+        Effectue le matching en cascade
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            contexte_metier: Instructions contextuelles du chef de projet
+            langue: Langue pour optimiser le prompt
+            min_confidence: Seuil minimum de confidence du résultat final (0.0 = résultat brut)
+            on_match: Appelé pour chaque correspondance définitive dès son arrivée
+        
+        Returns:
+            Résultat du matching avec correspondances et non-matchées
+        """
+        if not old_urls or not new_urls:
+            return MatchResult(correspondances=[], non_matchees=list(old_urls))
+        
+        accepted, remaining = self._run_local(old_urls, new_urls, on_match, min_confidence)
+        proposals: Dict[str, Dict[str, Any]] = {}
+        abandoned: Set[str] = set()
+        
+        for position, tier in enumerate(self.tiers):
+            if not remaining:
+                break
+            final = position == len(self.tiers) - 1
+            started = time.perf_counter()
+            try:
+                result = tier.mapper.match_urls(
+                    remaining, new_urls, contexte_metier, langue, min_confidence=0.0,
+                    on_match=self._tier_emitter(on_match, tier, final, min_confidence)
+                )
+            except AIMatchingError:
+                if position == 0:
+                    raise
+                result = None
+            remaining = self._settle(tier, result, remaining, final, accepted, proposals,
+                                     on_match, min_confidence, time.perf_counter() - started, abandoned)
+        
+        return self._result(old_urls, accepted, min_confidence, abandoned)
+    
+    async def match_urls_async(self, old_urls: List[str], new_urls: List[str],
+                               contexte_metier: str = "", langue: str = "fr",
+                               min_confidence: float = 0.0,
+                               on_match: Optional[Callable[[Dict[str, Any]], None]] = None,
+                               concurrency_limiter: Optional[asyncio.Semaphore] = None) -> MatchResult:
+        """
+        Variante asynchrone de match_urls (paliers IA en AsyncOpenAI)
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            contexte_metier: Instructions contextuelles du chef de projet
+            langue: Langue pour optimiser le prompt
+            min_confidence: Seuil minimum de confidence du résultat final (0.0 = résultat brut)
+            on_match: Appelé dans la boucle d'événements pour chaque correspondance définitive
+            concurrency_limiter: Sémaphore partagé entre plusieurs appels
+        
+        Returns:
+            Résultat du matching avec correspondances et non-matchées
+        """
+        if not old_urls or not new_urls:
+            return MatchResult(correspondances=[], non_matchees=list(old_urls))
+        
+        accepted, remaining = await asyncio.to_thread(self._run_local, old_urls, new_urls,
+                                                      None, min_confidence)
+        if on_match is not None:
+            for match in accepted.values():
+                on_match(match)
+        proposals: Dict[str, Dict[str, Any]] = {}
+        abandoned: Set[str] = set()
+        
+        for position, tier in enumerate(self.tiers):
+            if not remaining:
+                break
+            final = position == len(self.tiers) - 1
+            started = time.perf_counter()
+            try:
+                result = await tier.mapper.match_urls_async(
+                    remaining, new_urls, contexte_metier, langue, min_confidence=0.0,
+                    on_match=self._tier_emitter(on_match, tier, final, min_confidence),
+                    concurrency_limiter=concurrency_limiter
+                )
+            except AIMatchingError:
+                if position == 0:
+                    raise
+                result = None
+            remaining = self._settle(tier, result, remaining, final, accepted, proposals,
+                                     on_match, min_confidence, time.perf_counter() - started, abandoned)
+        
+        return self._result(old_urls, accepted, min_confidence, abandoned)
+    
+    def _run_local(self, old_urls: List[str], new_urls: List[str],
+                   on_match: Optional[Callable[[Dict[str, Any]], None]],
+                   min_confidence: float) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Palier local : paires au-dessus de local_accept acceptées, le reste pour l'IA"""
+        if self.local_matcher is None:
+            return {}, list(old_urls)
+        
+        started = time.perf_counter()
+        result = self.local_matcher.match_urls(old_urls, new_urls, min_confidence=0.0)
+        accepted = {
+            match["ancienne"]: match for match in result.correspondances
+            if match.get("confidence", 0) >= max(self.local_accept, min_confidence)
+        }
+        remaining = [url for url in old_urls if url not in accepted]
+        
+        if on_match is not None:
+            for match in accepted.values():
+                on_match(match)
+        self._record(LOCAL_TIER, len(old_urls), len(accepted), len(remaining),
+                     time.perf_counter() - started)
+        return accepted, remaining
+    
+    def _tier_emitter(self, on_match: Optional[Callable[[Dict[str, Any]], None]], tier: CascadeTier,
+                      final: bool, min_confidence: float) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """N'émet que les correspondances que le palier rend définitives"""
+        if on_match is None:
+            return None
+        threshold = min_confidence if final else max(tier.accept_confidence, min_confidence)
+        
+        def emit(match: Dict[str, Any]):
+            if match.get("confidence", 0) >= threshold:
+                on_match(match)
+        
+        return emit
+    
+    def _settle(self, tier: CascadeTier, result: Optional[MatchResult], remaining: List[str],
+                final: bool, accepted: Dict[str, Dict[str, Any]], proposals: Dict[str, Dict[str, Any]],
+                on_match: Optional[Callable[[Dict[str, Any]], None]], min_confidence: float,
+                elapsed: float, abandoned: Set[str]) -> List[str]:
+        """
+        Retient les réponses définitives d'un palier
+        
+        Returns:
+            URLs escaladées au palier suivant
+        """
+        if result is None:
+            # Palier en échec : les propositions des paliers précédents sont conservées
+            for url in remaining:
+                if url in proposals:
+                    accepted[url] = proposals[url]
+                    if on_match is not None and proposals[url].get("confidence", 0) >= min_confidence:
+                        on_match(proposals[url])
+                else:
+                    abandoned.add(url)
+            self._record(tier.mapper.tier, len(remaining), 0, 0, elapsed)
+            return []
+        
+        escalated = []
+        settled = 0
+        for match in result.correspondances:
+            url = match["ancienne"]
+            if final or match.get("confidence", 0) >= tier.accept_confidence:
+                accepted[url] = match
+                settled += 1
+            else:
+                proposals[url] = match
+                escalated.append(url)
+        if not final:
+            escalated.extend(result.non_matchees + result.abandonnees)
+        else:
+            # Abandon du dernier palier : la proposition d'un palier précédent est conservée
+            for url in result.abandonnees:
+                if url in proposals:
+                    accepted[url] = proposals[url]
+                    if on_match is not None and proposals[url].get("confidence", 0) >= min_confidence:
+                        on_match(proposals[url])
+                else:
+                    abandoned.add(url)
+        
+        self._record(tier.mapper.tier, len(remaining), settled, len(escalated), elapsed)
+        
+        # Ordre d'origine des anciennes URLs
+        escalated = set(escalated)
+        return [url for url in remaining if url in escalated]
+    
+    def _result(self, old_urls: List[str], accepted: Dict[str, Dict[str, Any]],
+                min_confidence: float, abandoned: Set[str]) -> MatchResult:
+        """Assemble le résultat final dans l'ordre des anciennes URLs"""
+        correspondances = []
+        non_matchees = []
+        abandonnees = []
+        for url in old_urls:
+            match = accepted.get(url)
+            if match is not None and match.get("confidence", 0) >= min_confidence:
+                correspondances.append(match)
+            elif url in abandoned:
+                abandonnees.append(url)
+            else:
+                non_matchees.append(url)
+        return MatchResult(correspondances=correspondances, non_matchees=non_matchees,
+                           abandonnees=abandonnees)
+    
+    def _record(self, name: str, urls: int, accepted: int, escalated: int, elapsed: float):
+        """Cumule les statistiques d'un palier (appelé depuis plusieurs langues en parallèle)"""
+        with self._stats_lock:
+            stats = self.statistics[name]
+            stats["urls"] += urls
+            stats["accepted"] += accepted
+            stats["escalated"] += escalated
+            stats["time_s"] += elapsed
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Statistiques cumulées des mappers et détail par palier
+        
+        Returns:
+            Statistiques additionnées des mappers (mêmes clés que AIMapper.get_statistics)
+            et "tiers" : URLs reçues, acceptées, escaladées et temps par palier
+        """
+        stats: Dict[str, Any] = {}
+        for tier in self.tiers:
+            for name, value in tier.mapper.get_statistics().items():
+                stats[name] = stats.get(name, 0) + value
+        
+        total = stats['match_cache_hits'] + stats['match_cache_misses']
+        stats['match_cache_reuse_rate'] = stats['match_cache_hits'] / total if total else 0.0
+        stats['omission_rate'] = stats['omitted_urls'] / stats['requested_urls'] if stats['requested_urls'] else 0.0
+        
+        with self._stats_lock:
+            stats["tiers"] = [
+                {"tier": name, **tier_stats, "time_s": round(tier_stats["time_s"], 3)}
+                for name, tier_stats in self.statistics.items()
+            ]
+        return stats
+    
+    def get_usage_summary(self) -> Optional[Dict[str, Any]]:
+        """
+        Consommation mesurée du projet, avec le détail par palier (by_tier)
+        
+        Returns:
+            Résumé UsageLedger.summary du projet, None sans journal
+        """
+        return self.tiers[0].mapper.get_usage_summary()
@@ -0,0 +1,143 @@
+"""
+Lecture tolérante des réponses JSON de l'IA
+Extrait les éléments complets des tableaux de premier niveau, même si le JSON est tronqué
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PartialJSONScanner:
+    """
+    Scanner incrémental d'un objet JSON de la forme {"cle": [elements], ...}
+    
+    Chaque élément d'un tableau de premier niveau est décodé dès que sa
+    dernière accolade ou son dernier guillemet est lu. Un élément mal formé
+    est ignoré sans invalider les autres ; une réponse tronquée conserve
+    tous les éléments terminés avant la coupure.
+    """
+    
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_key: Optional[str] = None
+        self._element_start: Optional[int] = None
+        
+        self.closed = False
+        self.malformed_elements = 0
+    
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Ajoute du texte et retourne les éléments terminés
+        
+        Args:
+            text: Fragment de la réponse (complète ou streamée)
+        
+        Returns:
+            Liste de tuples (clé du tableau, élément décodé)
+        """
+        self._text += text
+        elements = []
+        
+        while self._pos < len(self._text):
+            index = self._pos
+            char = self._text[index]
+            self._pos += 1
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._close_string(index, elements)
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+                self._start_element(index)
+            elif char in '{[':
+                self._start_element(index)
+                if len(self._stack) == 1 and char == '[':
+                    self._array_key = self._last_key
+                self._stack.append(char)
+            elif char in '}]':
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._in_array():
+                    self._emit(index + 1, elements)
+                elif len(self._stack) == 1 and char == ']':
+                    # Fin d'un tableau de premier niveau : dernier élément scalaire éventuel
+                    self._emit(index, elements)
+                    self._array_key = None
+                elif not self._stack:
+                    self.closed = True
+            elif self._in_array():
+                if char == ',':
+                    self._emit(index, elements)
+                elif not char.isspace():
+                    self._start_element(index)
+        
+        return elements
+    
+    def _in_array(self) -> bool:
+        """Indique si la lecture est au niveau des éléments d'un tableau de premier niveau"""
+        return len(self._stack) == 2 and self._stack[1] == '[' and self._array_key is not None
+    
+    def _start_element(self, index: int):
+        """Mémorise le début d'un élément de tableau"""
+        if self._in_array() and self._element_start is None:
+            self._element_start = index
+    
+    def _close_string(self, index: int, elements: List[Tuple[str, Any]]):
+        """Traite la fin d'une chaîne : clé de premier niveau ou élément chaîne"""
+        if len(self._stack) == 1:
+            try:
+                self._last_key = json.loads(self._text[self._string_start:index + 1])
+            except ValueError:
+                self._last_key = None
+        elif self._in_array() and self._element_start == self._string_start:
+            self._emit(index + 1, elements)
+    
+    def _emit(self, end: int, elements: List[Tuple[str, Any]]):
+        """Décode l'élément en cours et l'ajoute aux résultats"""
+        if self._element_start is None:
+            return
+        
+        raw = self._text[self._element_start:end].strip()
+        self._element_start = None
+        if not raw:
+            return
+        
+        try:
+            elements.append((self._array_key, json.loads(raw)))
+        except ValueError:
+            self.malformed_elements += 1
+
+
+def salvage_json(text: str) -> Dict[str, List[Any]]:
+    """
+    Récupère les éléments complets d'une réponse JSON éventuellement tronquée
+    
+    Args:
+        text: Réponse brute de l'IA (blocs markdown tolérés)
+    
+    Returns:
+        Dictionnaire {clé de tableau: éléments valides}
+    """
+    data: Dict[str, List[Any]] = {}
+    if not isinstance(text, str):
+        return data
+    
+    for key, element in PartialJSONScanner().feed(text):
+        data.setdefault(key, []).append(element)
+    
+    return data
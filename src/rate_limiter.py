@@ -0,0 +1,179 @@
+"""
+Limiteur de débit pour les appels API OpenAI
+Token bucket double : requêtes par minute (RPM) et tokens par minute (TPM)
+"""
+
+import asyncio
+import time
+import threading
+from typing import Callable, Dict, Any, Optional
+
+
+class TokenBucket:
+    """Seau à jetons rechargé en continu (capacité exprimée par minute)"""
+    
+    def __init__(self, capacity_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialise le seau
+        
+        Args:
+            capacity_per_minute: Capacité maximale (et recharge) par minute
+            clock: Horloge monotone (injectable pour les tests)
+        """
+        self.capacity = float(capacity_per_minute)
+        self.refill_rate = self.capacity / 60.0  # Jetons par seconde
+        self.level = self.capacity
+        self.clock = clock
+        self.updated_at = clock()
+    
+    def refill(self):
+        """Recharge le seau selon le temps écoulé"""
+        now = self.clock()
+        elapsed = max(0.0, now - self.updated_at)
+        self.level = min(self.capacity, self.level + elapsed * self.refill_rate)
+        self.updated_at = now
+    
+    def wait_time(self, amount: float) -> float:
+        """Délai (secondes) avant de disposer de `amount` jetons"""
+        # Une demande plus grosse que le seau n'attend que sa capacité pleine
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_rate
+
+
+class RateLimiter:
+    """
+    Limiteur RPM/TPM partagé entre threads
+    
+    Chaque appel réserve une requête et une estimation de tokens. La
+    consommation réelle (response.usage) corrige ensuite la réservation.
+    """
+    
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 200000,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialise le limiteur
+        
+        Args:
+            requests_per_minute: Limite de requêtes par minute
+            tokens_per_minute: Limite de tokens par minute
+            clock: Horloge monotone (injectable pour les tests)
+            sleep: Fonction d'attente (injectable pour les tests)
+        """
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        
+        self.statistics = {
+            'acquired_requests': 0,
+            'reserved_tokens': 0,
+            'usage_corrections': 0,
+            'total_wait_seconds': 0.0
+        }
+    
+    def try_acquire(self, tokens: int) -> float:
+        """
+        Tente de réserver une requête et `tokens` tokens sans bloquer
+        
+        Args:
+            tokens: Estimation des tokens consommés par l'appel
+        
+        Returns:
+            0.0 si la réservation est faite, sinon le délai à attendre
+        """
+        with self._lock:
+            self.requests.refill()
+            self.tokens.refill()
+            
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            
+            self.requests.level -= 1
+            self.tokens.level -= tokens
+            self.statistics['acquired_requests'] += 1
+            self.statistics['reserved_tokens'] += tokens
+            return 0.0
+    
+    def acquire(self, tokens: int) -> float:
+        """
+        Réserve une requête et `tokens` tokens, en attendant si nécessaire
+        
+        Args:
+            tokens: Estimation des tokens consommés par l'appel
+        
+        Returns:
+            Temps total attendu en secondes
+        """
+        waited = 0.0
+        
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                break
+            self.sleep(wait)
+            waited += wait
+        
+        if waited:
+            with self._lock:
+                self.statistics['total_wait_seconds'] += waited
+        
+        return waited
+    
+    async def acquire_async(self, tokens: int) -> float:
+        """
+        Variante asynchrone de acquire() : l'attente ne bloque pas la boucle d'événements
+        
+        Le même limiteur peut servir simultanément aux threads et aux coroutines.
+        
+        Args:
+            tokens: Estimation des tokens consommés par l'appel
+        
+        Returns:
+            Temps total attendu en secondes
+        """
+        waited = 0.0
+        
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+        
+        if waited:
+            with self._lock:
+                self.statistics['total_wait_seconds'] += waited
+        
+        return waited
+    
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """
+        Corrige la réservation avec la consommation réelle
+        
+        Args:
+            estimated_tokens: Tokens réservés lors de acquire()
+            actual_tokens: Tokens réellement consommés (response.usage.total_tokens)
+        """
+        if actual_tokens is None:
+            return
+        
+        with self._lock:
+            # Le seau peut devenir négatif : la dette ralentit les appels suivants
+            self.tokens.level = min(self.tokens.capacity,
+                                    self.tokens.level + estimated_tokens - actual_tokens)
+            self.statistics['reserved_tokens'] += actual_tokens - estimated_tokens
+            self.statistics['usage_corrections'] += 1
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques du limiteur
+        
+        Returns:
+            Dictionnaire avec les statistiques
+        """
+        with self._lock:
+            return dict(self.statistics)
@@ -7,11 +7,14 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse, urlunparse
 from collections import deque
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Tuple, Dict, Iterable, Iterator, NamedTuple
+from datetime import datetime
 import tldextract
 import time
+import zlib
 import logging
 import xml.etree.ElementTree as ET
+from lxml import etree
 
 # Import des nouveaux composants intelligents
 from smart_headers import SmartHeaders
@@ -21,6 +24,10 @@ from smart_retry import SmartRetry
 logging.getLogger("requests").setLevel(logging.WARNING)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 
+# Paramètres du parsing de sitemaps en streaming
+SITEMAP_CHUNK_SIZE = 64 * 1024  # Octets lus par itération sur le flux HTTP
+GZIP_MAGIC = b'\x1f\x8b'       # Signature des fichiers .xml.gz
+
 
 class WebScraper:
     """Scraper intelligent pour extraire les URLs internes d'un site"""
@@ -229,6 +236,337 @@ def crawl_site_with_fallback(url_root: str, max_pages: int = 1000) -> Tuple[List
         return [], False
 
 
+def _local_name(tag) -> str:
+    """Retourne le nom local d'une balise XML (sans namespace)"""
+    if not isinstance(tag, str):
+        return ''  # Commentaires et instructions de traitement
+    return tag.rpartition('}')[2]
+
+
+class SitemapRecord(NamedTuple):
+    """
+    Entrée d'un sitemap (<url> ou <sitemap>)
+    
+    Tuple nommé compact : des dizaines de milliers d'entrées restent légères
+    en mémoire. Les alternates sont les liens xhtml:link hreflang.
+    """
+    loc: str
+    lastmod: Optional[datetime] = None
+    changefreq: Optional[str] = None
+    priority: Optional[float] = None
+    alternates: Tuple[Tuple[str, str], ...] = ()
+    
+    def get_alternates(self) -> Dict[str, str]:
+        """Retourne les traductions sous forme {hreflang: url}"""
+        return dict(self.alternates)
+
+
+def _parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Parse une date W3C (<lastmod>), None si absente ou invalide"""
+    if not value or not value.strip():
+        return None
+    try:
+        return datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+
+
+def _parse_priority(value: Optional[str]) -> Optional[float]:
+    """Parse une priorité (<priority>), None si absente ou invalide"""
+    try:
+        return float(value.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def _build_record(elem) -> Optional[SitemapRecord]:
+    """Construit un SitemapRecord à partir d'un élément <url>/<sitemap> fermé"""
+    loc = None
+    lastmod = None
+    changefreq = None
+    priority = None
+    alternates = []
+    
+    # Seuls les enfants directs comptent (ignore <image:loc>, <video:loc>...)
+    for child in elem:
+        name = _local_name(child.tag)
+        
+        if name == 'loc':
+            loc = (child.text or '').strip()
+        elif name == 'lastmod':
+            lastmod = _parse_lastmod(child.text)
+        elif name == 'changefreq':
+            changefreq = (child.text or '').strip().lower() or None
+        elif name == 'priority':
+            priority = _parse_priority(child.text)
+        elif name == 'link' and child.get('rel') == 'alternate':
+            hreflang = (child.get('hreflang') or '').strip().lower()
+            href = (child.get('href') or '').strip()
+            if hreflang and href:
+                alternates.append((hreflang, href))
+    
+    if not loc:
+        return None
+    
+    return SitemapRecord(loc, lastmod, changefreq, priority, tuple(alternates))
+
+
+class SitemapParser:
+    """
+    Parser de sitemaps XML en streaming
+    
+    Le document est lu par blocs depuis le flux HTTP, décompressé à la volée
+    s'il est gzippé, et analysé avec lxml (iterparse en mode pull). Chaque
+    élément <url>/<sitemap> est libéré dès sa fermeture : la mémoire reste
+    constante quelle que soit la taille du sitemap (50k URLs / 50 MB).
+    
+    Le type de document est déterminé par l'élément racine : seuls les
+    <sitemap><loc> d'un <sitemapindex> sont suivis récursivement, les
+    <url><loc> d'un <urlset> sont toujours des URLs de contenu.
+    """
+    
+    def __init__(self, timeout: int = 30, chunk_size: int = SITEMAP_CHUNK_SIZE):
+        """
+        Initialise le parser
+        
+        Args:
+            timeout: Timeout en secondes pour chaque requête
+            chunk_size: Taille des blocs lus sur le flux HTTP
+        """
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.smart_headers = SmartHeaders()
+        self.smart_retry = SmartRetry()
+        
+        self.statistics = {
+            'documents_fetched': 0,
+            'sitemap_indexes': 0,
+            'urlsets': 0,
+            'child_sitemaps_followed': 0,
+            'duplicate_sitemaps_skipped': 0,
+            'fetches_avoided': 0,
+            'failed_documents': 0
+        }
+    
+    def fetch(self, sitemap_url: str):
+        """Ouvre le flux HTTP du sitemap avec headers XML et retry automatique"""
+        
+        def fetch_sitemap():
+            headers = self.smart_headers.get_headers_for_content_type('xml')
+            headers.update(self.smart_headers.get_headers_for_url(sitemap_url))
+            
+            response = requests.get(sitemap_url, headers=headers,
+                                    timeout=self.timeout, stream=True)
+            response.raise_for_status()
+            return response
+        
+        return self.smart_retry.execute_http_with_retry(fetch_sitemap)
+    
+    def iter_bytes(self, response) -> Iterator[bytes]:
+        """
+        Itère sur le corps de la réponse en décompressant le gzip à la volée
+        
+        Le Content-Encoding HTTP est déjà géré par requests ; on détecte ici
+        les fichiers .xml.gz servis tels quels via leur signature.
+        """
+        decompressor = None
+        first_chunk = True
+        
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            if not chunk:
+                continue
+            
+            if first_chunk:
+                first_chunk = False
+                if chunk[:2] == GZIP_MAGIC:
+                    # 16 + MAX_WBITS : attend un en-tête gzip
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            
+            if decompressor is None:
+                yield chunk
+            else:
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+        
+        if decompressor is not None:
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+    
+    def iter_entries(self, chunks: Iterable[bytes]) -> Iterator[Tuple[str, SitemapRecord]]:
+        """
+        Analyse un flux XML et produit les entrées au fil de l'eau
+        
+        Args:
+            chunks: Blocs d'octets XML (déjà décompressés)
+            
+        Yields:
+            Tuples (type, record) : type vaut 'sitemap' pour un sous-sitemap
+            d'un <sitemapindex>, 'url' pour une URL de contenu
+        """
+        parser = etree.XMLPullParser(events=('start', 'end'), recover=True,
+                                     resolve_entities=False, huge_tree=True)
+        state = {'root': None}
+        
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from self._drain_entries(parser, state)
+        
+        parser.close()
+        yield from self._drain_entries(parser, state)
+    
+    def _drain_entries(self, parser, state: Dict) -> Iterator[Tuple[str, SitemapRecord]]:
+        """Consomme les événements disponibles et libère les noeuds traités"""
+        for event, elem in parser.read_events():
+            name = _local_name(elem.tag)
+            
+            if event == 'start':
+                # Le premier élément ouvert est la racine du document
+                if state['root'] is None:
+                    state['root'] = name
+                    if name == 'sitemapindex':
+                        self.statistics['sitemap_indexes'] += 1
+                    elif name == 'urlset':
+                        self.statistics['urlsets'] += 1
+                continue
+            
+            root = state['root']
+            
+            if root not in ('sitemapindex', 'urlset'):
+                # Racine inconnue : on reste tolérant et on prend tous les <loc>
+                if name == 'loc':
+                    url = (elem.text or '').strip()
+                    if url:
+                        yield 'url', SitemapRecord(loc=url)
+                continue
+            
+            if name not in ('url', 'sitemap'):
+                continue
+            
+            parent = elem.getparent()
+            if parent is not None and parent.getparent() is None:
+                # Entrée de premier niveau : <sitemapindex><sitemap> ou <urlset><url>
+                if (root, name) in (('sitemapindex', 'sitemap'), ('urlset', 'url')):
+                    record = _build_record(elem)
+                    if record is not None:
+                        yield name, record
+            
+            # Libère l'élément et ses frères précédents déjà traités
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    
+    def iter_document(self, sitemap_url: str) -> Iterator[Tuple[str, SitemapRecord]]:
+        """
+        Télécharge et parse un seul document sitemap en streaming
+        
+        Yields:
+            Tuples (type, record) du document (voir iter_entries)
+        """
+        response = self.fetch(sitemap_url)
+        self.statistics['documents_fetched'] += 1
+        try:
+            yield from self.iter_entries(self.iter_bytes(response))
+        finally:
+            response.close()
+    
+    def iter_records(self, sitemap_url: str, recursive: bool = True,
+                     visited: Optional[set] = None) -> Iterator[SitemapRecord]:
+        """
+        Parcourt un sitemap (et ses sous-sitemaps) et produit les entrées de contenu
+        
+        Les sous-sitemaps sont téléchargés après la fermeture du document
+        parent, dans l'ordre du document (parcours en profondeur).
+        
+        Args:
+            sitemap_url: URL du sitemap racine
+            recursive: Si True, suit les <sitemap><loc> des sitemaps index
+            visited: Set des sitemaps déjà visités (évite les boucles infinies)
+            
+        Yields:
+            SitemapRecord des URLs de contenu (ou des sous-sitemaps si recursive=False)
+        """
+        if visited is None:
+            visited = set()
+        
+        stack = [sitemap_url]
+        
+        while stack:
+            current_url = stack.pop()
+            
+            if current_url in visited:
+                self.statistics['duplicate_sitemaps_skipped'] += 1
+                continue
+            
+            visited.add(current_url)
+            children = []
+            
+            try:
+                for entry_type, record in self.iter_document(current_url):
+                    if entry_type == 'sitemap' and recursive:
+                        children.append(record.loc)
+                        continue
+                    
+                    # L'ancienne heuristique aurait téléchargé cette URL
+                    if entry_type == 'url' and _looks_like_sitemap(record.loc):
+                        self.statistics['fetches_avoided'] += 1
+                    
+                    yield record
+                    
+            except requests.RequestException as e:
+                self.statistics['failed_documents'] += 1
+                print(f"Erreur lors de la récupération du sitemap {current_url}: {e}")
+            except Exception as e:
+                self.statistics['failed_documents'] += 1
+                print(f"Erreur lors du parsing du sitemap {current_url}: {e}")
+            
+            for child_url in reversed(children):
+                print(f"  → Parsing sub-sitemap: {child_url}")
+                self.statistics['child_sitemaps_followed'] += 1
+                stack.append(child_url)
+    
+    def iter_urls(self, sitemap_url: str, recursive: bool = True,
+                  visited: Optional[set] = None) -> Iterator[str]:
+        """Comme iter_records, mais ne produit que les URLs (<loc>)"""
+        for record in self.iter_records(sitemap_url, recursive=recursive, visited=visited):
+            yield record.loc
+    
+    def get_statistics(self) -> Dict[str, int]:
+        """
+        Retourne les statistiques de parsing
+        
+        Returns:
+            Dictionnaire avec les compteurs (documents, index, fetches évités...)
+        """
+        return self.statistics.copy()
+
+
+def _looks_like_sitemap(url: str) -> bool:
+    """
+    Heuristique historique de détection des sous-sitemaps par l'URL
+    
+    N'est plus utilisée pour décider d'un téléchargement : elle sert à
+    mesurer les requêtes évitées grâce à la détection par élément racine.
+    """
+    url_lower = url.lower()
+    return 'sitemap' in url_lower or url_lower.endswith('.xml')
+
+
+def iter_sitemap_records(sitemap_url: str, recursive: bool = True) -> Iterator[SitemapRecord]:
+    """
+    Parse un sitemap XML en streaming et produit des entrées structurées
+    
+    Args:
+        sitemap_url: URL du sitemap à parser
+        recursive: Si True, parse récursivement les sitemaps index
+    
+    Yields:
+        SitemapRecord (loc, lastmod, changefreq, priority, alternates hreflang)
+    """
+    yield from SitemapParser().iter_records(sitemap_url, recursive=recursive)
+
+
 def parse_sitemap(sitemap_url: str, recursive: bool = True, _visited: set = None) -> List[str]:
     """
     Parse un sitemap XML (incluant les sitemaps Yoast) et extrait toutes les URLs.
@@ -241,68 +579,17 @@ def parse_sitemap(sitemap_url: str, recursive: bool = True, _visited: set = None
     Returns:
         Liste des URLs trouvées dans le sitemap
     """
-    if _visited is None:
-        _visited = set()
+    sitemap_parser = SitemapParser()
     
-    if sitemap_url in _visited:
-        return []
+    # Parse le flux XML au fil de l'eau et dédoublonne les URLs
+    urls = list(dict.fromkeys(
+        record.loc for record in
+        sitemap_parser.iter_records(sitemap_url, recursive=recursive, visited=_visited)
+    ))
     
-    _visited.add(sitemap_url)
-    urls = []
+    stats = sitemap_parser.get_statistics()
+    print(f"Parsed {len(urls)} URLs from sitemap: {sitemap_url}")
+    if stats['fetches_avoided']:
+        print(f"  → {stats['fetches_avoided']} requêtes évitées (URLs de contenu ressemblant à des sitemaps)")
     
-    try:
-        # Utiliser SmartHeaders et SmartRetry pour une récupération intelligente
-        smart_headers = SmartHeaders()
-        smart_retry = SmartRetry()
-        
-        def fetch_sitemap():
-            headers = smart_headers.get_headers_for_content_type('xml')
-            headers.update(smart_headers.get_headers_for_url(sitemap_url))
-            
-            response = requests.get(sitemap_url, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response
-        
-        # Exécuter avec retry automatique
-        response = smart_retry.execute_http_with_retry(fetch_sitemap)
-        
-        # Parse le XML avec BeautifulSoup (plus robuste)
-        soup = BeautifulSoup(response.content, 'xml')
-        
-        # Extraire toutes les balises <loc>
-        loc_tags = soup.find_all('loc')
-        for loc in loc_tags:
-            url = loc.text.strip()
-            if url:
-                # Vérifier si c'est un sitemap ou une URL normale
-                # Détecte les patterns courants de sitemaps: sitemap*.xml, *-sitemap.xml, etc.
-                is_sitemap = any([
-                    'sitemap' in url.lower(),
-                    url.endswith('.xml'),
-                    'page-sitemap' in url.lower(),
-                    'post-sitemap' in url.lower(),
-                    'category-sitemap' in url.lower(),
-                    'product-sitemap' in url.lower()
-                ])
-                
-                if recursive and is_sitemap:
-                    # C'est un sous-sitemap (pages, articles, etc.), le parser récursivement
-                    print(f"  → Parsing sub-sitemap: {url}")
-                    sub_urls = parse_sitemap(url, recursive=True, _visited=_visited)
-                    urls.extend(sub_urls)
-                else:
-                    # C'est une URL de contenu normale
-                    urls.append(url)
-        
-        # Dédoublonner les URLs
-        urls = list(dict.fromkeys(urls))
-        
-        print(f"Parsed {len(urls)} URLs from sitemap: {sitemap_url}")
-        return urls
-        
-    except requests.RequestException as e:
-        print(f"Erreur lors de la récupération du sitemap {sitemap_url}: {e}")
-        return []
-    except Exception as e:
-        print(f"Erreur lors du parsing du sitemap {sitemap_url}: {e}")
-        return []
\ No newline at end of file
+    return urls
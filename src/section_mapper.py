@@ -0,0 +1,162 @@
+"""
+Matching hiérarchique par sections de chemin
+Les sections de l'ancien site sont d'abord associées à celles du nouveau
+site ; chaque page n'est ensuite comparée qu'aux pages des sections associées
+"""
+
+import re
+from collections import Counter
+from typing import List, Dict, Tuple, Optional
+from urllib.parse import urlparse
+
+try:
+    from candidate_index import CandidateIndex
+except ImportError:
+    from src.candidate_index import CandidateIndex
+
+
+# Premier segment de langue (fr, en, pt-br, en_US...)
+LANGUAGE_SEGMENT = re.compile(r'^[a-z]{2}([-_][a-z]{2})?$', re.IGNORECASE)
+
+
+def url_section(url: str, depth: int = 1) -> str:
+    """
+    Section d'une URL : préfixe de langue puis premiers segments du chemin
+    
+    Le dernier segment (la page) n'entre jamais dans la section : une page
+    à la racine d'une langue appartient à la section de la langue.
+    
+    Args:
+        url: URL absolue ou chemin relatif
+        depth: Nombre de segments de section retenus après la langue
+    
+    Returns:
+        Préfixe de chemin (ex: '/fr/hebergements/' pour '/fr/hebergements/chalet-1/')
+    """
+    path = urlparse(url).path if '://' in url else url.split('?')[0].split('#')[0]
+    segments = [segment for segment in path.split('/') if segment]
+    
+    prefix = []
+    if segments and LANGUAGE_SEGMENT.match(segments[0]):
+        prefix.append(segments.pop(0).lower())
+    
+    # Le dernier segment est la page
+    prefix.extend(segment.lower() for segment in segments[:-1][:depth])
+    return '/' + ''.join(segment + '/' for segment in prefix)
+
+
+class SectionMapper:
+    """
+    Association des sections anciennes aux sections nouvelles
+    
+    Chaque ancienne page vote pour la section de sa meilleure candidate
+    lexicale (index TF-IDF) : une section renommée (/logements/ →
+    /hebergements/) est reconnue par les slugs de ses pages. Une section
+    ancienne peut être répartie sur plusieurs sections nouvelles ; si les
+    votes sont trop dispersés, ses pages gardent toutes les candidates.
+    """
+    
+    def __init__(self, depth: int = 1, min_share: float = 0.2,
+                 min_coverage: float = 0.6, max_sections: int = 3):
+        """
+        Initialise le mapper de sections
+        
+        Args:
+            depth: Segments de section retenus après la langue
+            min_share: Part minimum des votes pour retenir une section nouvelle
+            min_coverage: Part minimum des votes couverte par les sections retenues
+            max_sections: Sections nouvelles retenues au plus par section ancienne
+        """
+        self.depth = depth
+        self.min_share = min_share
+        self.min_coverage = min_coverage
+        self.max_sections = max_sections
+    
+    def group(self, urls: List[str]) -> Dict[str, List[str]]:
+        """
+        Regroupe des URLs par section (ordre de première apparition)
+        
+        Args:
+            urls: URLs à regrouper
+        
+        Returns:
+            {section: URLs de la section}
+        """
+        sections: Dict[str, List[str]] = {}
+        for url in urls:
+            sections.setdefault(url_section(url, self.depth), []).append(url)
+        return sections
+    
+    def map_sections(self, old_urls: List[str], new_urls: List[str],
+                     candidate_index: Optional[CandidateIndex] = None) -> Dict[str, List[str]]:
+        """
+        Associe localement les sections anciennes aux sections nouvelles
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            candidate_index: Index lexical des nouvelles URLs (construit si absent)
+        
+        Returns:
+            {section ancienne: sections nouvelles} ; les sections sans
+            association fiable sont absentes
+        """
+        if not old_urls or not new_urls:
+            return {}
+        if candidate_index is None:
+            candidate_index = CandidateIndex(new_urls)
+        new_sections = [url_section(url, self.depth) for url in new_urls]
+        
+        section_map = {}
+        for section, urls in self.group(old_urls).items():
+            votes = Counter()
+            for url in urls:
+                hits = candidate_index.search(url, 1)
+                if hits:
+                    votes[new_sections[hits[0][0]]] += 1
+            
+            total = sum(votes.values())
+            if not total:
+                continue
+            
+            kept = [
+                new_section for new_section, count in votes.most_common(self.max_sections)
+                if count / total >= self.min_share
+            ]
+            if sum(votes[new_section] for new_section in kept) / total >= self.min_coverage:
+                section_map[section] = sorted(kept)
+        
+        return section_map
+    
+    def plan(self, old_urls: List[str], new_urls: List[str],
+             section_map: Dict[str, List[str]]) -> Tuple[List[Tuple[List[str], List[str]]], List[str]]:
+        """
+        Découpe le matching en paires de sections indépendantes
+        
+        Les sections anciennes associées aux mêmes sections nouvelles
+        forment une seule paire (un seul bloc de candidates).
+        
+        Args:
+            old_urls: URLs de l'ancien site
+            new_urls: URLs du nouveau site
+            section_map: {section ancienne: sections nouvelles}
+        
+        Returns:
+            Tuple (paires [(anciennes URLs, nouvelles URLs candidates)],
+            anciennes URLs sans section associée, à comparer à toutes les candidates)
+        """
+        new_by_section = self.group(new_urls)
+        pairs: Dict[Tuple[str, ...], Tuple[List[str], List[str]]] = {}
+        unmapped = []
+        
+        for section, urls in self.group(old_urls).items():
+            targets = tuple(target for target in section_map.get(section, []) if target in new_by_section)
+            if not targets:
+                unmapped.extend(urls)
+                continue
+            
+            if targets not in pairs:
+                pairs[targets] = ([], [url for target in targets for url in new_by_section[target]])
+            pairs[targets][0].extend(urls)
+        
+        return list(pairs.values()), unmapped
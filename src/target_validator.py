@@ -0,0 +1,116 @@
+"""
+Validation locale des URLs cibles renvoyées par le modèle
+Une cible hors candidates est corrigée vers la candidate la plus proche si
+l'écart est minime (faute de frappe, domaine, slash final), sinon rejetée
+"""
+
+import re
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+try:
+    from candidate_index import CandidateIndex
+    from local_matcher import batch_edit_similarity
+except ImportError:
+    from src.candidate_index import CandidateIndex
+    from src.local_matcher import batch_edit_similarity
+
+
+_NUMBER = re.compile(r'\d+')
+
+
+def target_key(url: str) -> str:
+    """
+    Forme normalisée d'une URL cible : chemin sans domaine, casse ni slash final
+    
+    Args:
+        url: URL absolue ou chemin relatif
+    
+    Returns:
+        Chemin normalisé (ex: '/fr/contact' pour 'https://site.com/FR/Contact/')
+    """
+    path = url.strip()
+    path = urlparse(path).path if '://' in path else path.split('?')[0].split('#')[0]
+    return path.lower().rstrip('/') or '/'
+
+
+class TargetValidator:
+    """
+    Validation des cibles d'un lot contre l'ensemble haché de ses candidates
+    
+    1. cible présente parmi les candidates : acceptée telle quelle
+    2. même chemin normalisé qu'une seule candidate : corrigée sans pénalité
+    3. candidate la plus proche (index lexical puis distance d'édition) au-dessus
+       de `snap_threshold`, nettement devant la deuxième et avec les mêmes
+       nombres : corrigée, la similarité réduit la confidence
+    4. sinon : cible inventée, l'URL est renvoyée au modèle
+    """
+    
+    def __init__(self, candidates: List[str], snap_threshold: float = 0.9,
+                 min_margin: float = 0.05, shortlist: int = 5):
+        """
+        Initialise le validateur
+        
+        Args:
+            candidates: URLs candidates envoyées au modèle
+            snap_threshold: Similarité d'édition minimum pour corriger une cible
+            min_margin: Écart minimum entre la meilleure et la deuxième candidate
+            shortlist: Candidates lexicales comparées par distance d'édition
+        """
+        self.candidates = list(candidates)
+        self.candidate_set = set(self.candidates)
+        self.snap_threshold = snap_threshold
+        self.min_margin = min_margin
+        self.shortlist = shortlist
+        
+        self._by_key: Dict[str, List[str]] = {}
+        for url in self.candidates:
+            self._by_key.setdefault(target_key(url), []).append(url)
+        
+        # Index lexical construit à la première cible inconnue
+        self._index: Optional[CandidateIndex] = None
+    
+    def __contains__(self, url: str) -> bool:
+        return url in self.candidate_set
+    
+    def resolve(self, target: str) -> Tuple[Optional[str], float]:
+        """
+        Associe une cible renvoyée par le modèle à une candidate réelle
+        
+        Args:
+            target: URL cible renvoyée par le modèle
+        
+        Returns:
+            Tuple (candidate retenue ou None si la cible est inventée,
+            similarité : 1.0 pour une cible exacte ou de forme équivalente)
+        """
+        if target in self.candidate_set:
+            return target, 1.0
+        
+        key = target_key(target)
+        same = self._by_key.get(key, [])
+        if len(same) == 1:
+            return same[0], 1.0
+        if not self.candidates:
+            return None, 0.0
+        
+        if self._index is None:
+            self._index = CandidateIndex(self.candidates)
+        hits = self._index.search(target, self.shortlist)
+        if not hits:
+            return None, 0.0
+        
+        shortlist = [self.candidates[idx] for idx, _ in hits]
+        similarities = batch_edit_similarity(key, [target_key(url) for url in shortlist])
+        order = np.argsort(-similarities, kind='stable')
+        best = float(similarities[order[0]])
+        second = float(similarities[order[1]]) if len(order) > 1 else 0.0
+        candidate = shortlist[order[0]]
+        
+        # Un numéro différent (chalet-12 / chalet-13) désigne une autre page
+        if best >= self.snap_threshold and best - second >= self.min_margin \
+                and _NUMBER.findall(key) == _NUMBER.findall(target_key(candidate)):
+            return candidate, best
+        return None, best
@@ -0,0 +1,207 @@
+"""
+Estimation du nombre de tokens des prompts de matching
+Tokenizer local (tiktoken si disponible, sinon heuristique) auto-calibré par response.usage
+"""
+
+import math
+import re
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+# Limites par modèle : (fenêtre de contexte, tokens de sortie maximum)
+MODEL_TOKEN_LIMITS = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-4": (8192, 4096),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4o-mini": (128000, 16384),
+}
+DEFAULT_TOKEN_LIMITS = (8192, 4096)
+
+# Tarifs par modèle : (USD pour 1K tokens d'entrée, USD pour 1K tokens de sortie)
+MODEL_PRICING = {
+    "gpt-3.5-turbo": (0.0015, 0.002),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+DEFAULT_PRICING = MODEL_PRICING["gpt-3.5-turbo"]
+
+# Découpage proche des tokenizers BPE : mots, nombres, ponctuation
+_PIECE_PATTERN = re.compile(r"[^\W\d_]+|\d+|\n|[^\w\s]|_")
+
+
+def get_model_limits(model: str) -> Tuple[int, int]:
+    """
+    Retourne les limites de tokens d'un modèle (préfixe le plus long)
+    
+    Args:
+        model: Nom du modèle (ex: 'gpt-4o-mini-2024-07-18')
+    
+    Returns:
+        Tuple (fenêtre de contexte, tokens de sortie maximum)
+    """
+    best_prefix = ""
+    for prefix in MODEL_TOKEN_LIMITS:
+        if model.startswith(prefix) and len(prefix) > len(best_prefix):
+            best_prefix = prefix
+    
+    return MODEL_TOKEN_LIMITS.get(best_prefix, DEFAULT_TOKEN_LIMITS)
+
+
+def get_model_pricing(model: str) -> Tuple[float, float]:
+    """
+    Retourne le tarif d'un modèle (préfixe le plus long)
+    
+    Args:
+        model: Nom du modèle (ex: 'gpt-4o-mini-2024-07-18')
+    
+    Returns:
+        Tuple (USD pour 1K tokens d'entrée, USD pour 1K tokens de sortie)
+    """
+    best_prefix = ""
+    for prefix in MODEL_PRICING:
+        if model.startswith(prefix) and len(prefix) > len(best_prefix):
+            best_prefix = prefix
+    
+    return MODEL_PRICING.get(best_prefix, DEFAULT_PRICING)
+
+
+class TokenEstimator:
+    """
+    Estimateur de tokens calibré sur la consommation réelle
+    
+    Le comptage brut vient de tiktoken quand il est installé, sinon d'une
+    heuristique par morceaux (mots, nombres, ponctuation). Un facteur
+    d'entrée et un coût de sortie par URL sont corrigés après chaque appel
+    (moyenne mobile exponentielle sur response.usage).
+    """
+    
+    def __init__(self, model: str = "gpt-3.5-turbo", output_tokens_per_url: float = 50.0,
+                 smoothing: float = 0.3, use_tiktoken: bool = True):
+        """
+        Initialise l'estimateur
+        
+        Args:
+            model: Modèle cible (choix de l'encodage tiktoken)
+            output_tokens_per_url: Estimation initiale des tokens de sortie par ancienne URL
+            smoothing: Poids d'une nouvelle observation dans la moyenne mobile
+            use_tiktoken: Si False, force l'heuristique locale
+        """
+        self.model = model
+        self.smoothing = smoothing
+        self.input_ratio = 1.0
+        self.output_tokens_per_url = float(output_tokens_per_url)
+        self._lock = threading.Lock()
+        
+        self.encoding = None
+        if use_tiktoken and TIKTOKEN_AVAILABLE:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                # Encodage non téléchargeable (hors ligne) : heuristique locale
+                self.encoding = None
+        
+        self.statistics = {
+            'calibrations': 0,
+            'last_input_error': 0.0
+        }
+    
+    def count_raw(self, text: str) -> int:
+        """
+        Compte les tokens d'un texte sans facteur de calibration
+        
+        Args:
+            text: Texte à mesurer
+        
+        Returns:
+            Nombre de tokens estimé
+        """
+        if not text:
+            return 0
+        
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        
+        tokens = 0
+        for piece in _PIECE_PATTERN.findall(text):
+            if piece[0].isdigit():
+                tokens += math.ceil(len(piece) / 3)
+            elif piece[0].isalpha():
+                # Les mots courants font un token, les slugs rares se fragmentent
+                tokens += 1 if len(piece) <= 4 else math.ceil(len(piece) / 3.5)
+            else:
+                tokens += 1
+        return tokens
+    
+    def count(self, text: str) -> int:
+        """Compte les tokens d'un texte, facteur de calibration appliqué"""
+        return int(math.ceil(self.count_raw(text) * self.input_ratio))
+    
+    def estimate_output(self, nb_old_urls: int) -> int:
+        """Estime les tokens de réponse pour un lot d'anciennes URLs"""
+        return int(math.ceil(nb_old_urls * self.output_tokens_per_url))
+    
+    def record_usage(self, raw_prompt_tokens: int, nb_old_urls: int, usage: Any):
+        """
+        Corrige l'estimateur avec la consommation réelle d'un appel
+        
+        Args:
+            raw_prompt_tokens: Comptage brut (count_raw) du prompt envoyé
+            nb_old_urls: Nombre d'anciennes URLs du lot
+            usage: response.usage (prompt_tokens / completion_tokens)
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        
+        with self._lock:
+            if isinstance(prompt_tokens, int) and prompt_tokens > 0 and raw_prompt_tokens > 0:
+                observed_ratio = prompt_tokens / raw_prompt_tokens
+                self.statistics['last_input_error'] = round(
+                    (raw_prompt_tokens * self.input_ratio - prompt_tokens) / prompt_tokens, 4
+                )
+                self.input_ratio += self.smoothing * (observed_ratio - self.input_ratio)
+                self.statistics['calibrations'] += 1
+            
+            if isinstance(completion_tokens, int) and completion_tokens > 0 and nb_old_urls > 0:
+                observed_per_url = completion_tokens / nb_old_urls
+                self.output_tokens_per_url += self.smoothing * (observed_per_url - self.output_tokens_per_url)
+    
+    def calibrate(self, input_ratio: float, output_tokens_per_url: float):
+        """
+        Repart de facteurs mesurés (ex: journal des sessions précédentes)
+        
+        Args:
+            input_ratio: Tokens facturés par token compté (count_raw)
+            output_tokens_per_url: Tokens de sortie par ancienne URL
+        """
+        with self._lock:
+            if input_ratio > 0:
+                self.input_ratio = float(input_ratio)
+            if output_tokens_per_url > 0:
+                self.output_tokens_per_url = float(output_tokens_per_url)
+            self.statistics['seeded'] = True
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retourne l'état de la calibration
+        
+        Returns:
+            Dictionnaire avec les statistiques
+        """
+        with self._lock:
+            stats = dict(self.statistics)
+            stats['input_ratio'] = round(self.input_ratio, 4)
+            stats['output_tokens_per_url'] = round(self.output_tokens_per_url, 2)
+            stats['tokenizer'] = "tiktoken" if self.encoding is not None else "heuristique"
+            return stats
@@ -0,0 +1,273 @@
+"""
+Journal de consommation des appels IA (tokens, latence, coût)
+Une ligne JSON par appel, totaux et percentiles par projet
+"""
+
+import json
+import math
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+
+# Issues de décodage possibles d'une réponse
+PARSE_OUTCOMES = ("ok", "salvaged", "empty", "api_error")
+
+# Appels récents conservés par modèle et protocole pour la calibration
+CALIBRATION_WINDOW = 200
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Percentile par rang le plus proche
+    
+    Args:
+        values: Valeurs observées
+        fraction: Percentile entre 0 et 1 (0.5 = médiane)
+    
+    Returns:
+        Valeur du percentile (0.0 si aucune valeur)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class UsageLedger:
+    """
+    Journal append-only des appels au modèle, un fichier JSONL par projet
+    
+    Chaque appel de lot enregistre la consommation réelle (response.usage),
+    la latence, les tentatives, le modèle, la taille du lot et l'issue du
+    décodage. Les totaux mesurés remplacent l'estimation de coût au
+    caractère et recalibrent TokenEstimator d'une session à l'autre ; la
+    part de tokens servis par le cache de préfixe (cached_ratio) mesure
+    l'effet de la disposition des prompts.
+    
+    La calibration lit un petit résumé (calibration.json : derniers appels
+    par modèle et protocole) tenu à jour à chaque enregistrement, et non
+    les journaux complets qui ne font que grandir.
+    """
+    
+    def __init__(self, ledger_dir: Path):
+        """
+        Initialise le journal
+        
+        Args:
+            ledger_dir: Répertoire des fichiers JSONL
+        """
+        self.ledger_dir = Path(ledger_dir)
+        self.ledger_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+    
+    def _project_path(self, project: str) -> Path:
+        """Fichier d'un projet (nom assaini, ex: domaine cible)"""
+        name = re.sub(r'[^A-Za-z0-9._-]+', '_', project).strip('._') or "default"
+        return self.ledger_dir / f"{name}.jsonl"
+    
+    def record(self, project: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ajoute un appel au journal
+        
+        Args:
+            project: Projet (ex: domaine cible de la migration)
+            entry: Mesures de l'appel (model, chunk_size, prompt_tokens,
+                completion_tokens, latency_s, retries, parse_outcome, ...)
+        
+        Returns:
+            Entrée enregistrée (horodatée)
+        """
+        entry = {"timestamp": datetime.now().isoformat(), "project": project, **entry}
+        line = json.dumps(entry, ensure_ascii=False)
+        
+        with self._lock:
+            # Résumé chargé avant l'ajout : une reconstruction ne compte pas l'appel deux fois
+            windows = self._load_calibration()
+            with open(self._project_path(project), 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+            if self._add_sample(windows, entry):
+                self._save_calibration(windows)
+        return entry
+    
+    def projects(self) -> List[str]:
+        """Projets présents dans le journal"""
+        return sorted(path.stem for path in self.ledger_dir.glob("*.jsonl"))
+    
+    def entries(self, project: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lit les appels enregistrés
+        
+        Args:
+            project: Projet à lire (None = tous les projets)
+        
+        Returns:
+            Entrées dans l'ordre d'enregistrement (lignes corrompues ignorées)
+        """
+        paths = [self._project_path(project)] if project else sorted(self.ledger_dir.glob("*.jsonl"))
+        entries = []
+        
+        for path in paths:
+            if not path.exists():
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Ligne tronquée (arrêt pendant l'écriture)
+                        continue
+        return entries
+    
+    def summary(self, project: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Totaux et percentiles d'un projet
+        
+        Args:
+            project: Projet à résumer (None = tous les projets)
+        
+        Returns:
+            Dictionnaire avec les totaux, les percentiles de latence et
+            de tokens, les issues de décodage, le détail par modèle et
+            par taille de lot, et le détail par palier de cascade
+        """
+        entries = self.entries(project)
+        summary = self._aggregate(entries)
+        
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            groups.setdefault((entry.get("model"), entry.get("chunk_size")), []).append(entry)
+        summary["by_setting"] = [
+            {"model": model, "chunk_size": chunk_size, **self._aggregate(groups[(model, chunk_size)])}
+            for model, chunk_size in sorted(groups, key=lambda setting: (str(setting[0]), setting[1] or 0))
+        ]
+        
+        # Dépense et temps par palier (appels journalisés par une ModelCascade)
+        tiers: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            if entry.get("tier"):
+                tiers.setdefault(entry["tier"], []).append(entry)
+        summary["by_tier"] = [{"tier": tier, **self._aggregate(tier_entries)} for tier, tier_entries in tiers.items()]
+        return summary
+    
+    def calibration(self, model: str, protocol: Optional[str] = None,
+                    last: int = CALIBRATION_WINDOW) -> Optional[Dict[str, float]]:
+        """
+        Facteurs de calibration mesurés sur les derniers appels d'un modèle
+        
+        Args:
+            model: Modèle concerné
+            protocol: Protocole de réponse ('json' ou 'compact'), None = tous
+            last: Nombre d'appels récents pris en compte (au plus CALIBRATION_WINDOW)
+        
+        Returns:
+            {"input_ratio", "output_tokens_per_url"} ou None sans mesure exploitable
+        """
+        with self._lock:
+            windows = self._load_calibration().get(model, {})
+        
+        if protocol is None:
+            samples = sorted((sample for window in windows.values() for sample in window),
+                             key=lambda sample: sample[0])
+        else:
+            samples = windows.get(protocol, [])
+        samples = samples[-min(last, CALIBRATION_WINDOW):]
+        
+        # Échantillon : [horodatage, prompt_tokens, raw_prompt_tokens, chunk_size, completion_tokens]
+        raw_prompt = sum(sample[2] for sample in samples)
+        urls = sum(sample[3] for sample in samples if sample[4])
+        if not raw_prompt or not urls:
+            return None
+        
+        return {
+            "input_ratio": sum(sample[1] for sample in samples) / raw_prompt,
+            "output_tokens_per_url": sum(sample[4] for sample in samples) / urls
+        }
+    
+    def _calibration_path(self) -> Path:
+        """Résumé de calibration (extension distincte des journaux de projet)"""
+        return self.ledger_dir / "calibration.json"
+    
+    def _load_calibration(self) -> Dict[str, Dict[str, List[list]]]:
+        """
+        Derniers appels par modèle et protocole (appelé sous verrou)
+        
+        Returns:
+            {modèle: {protocole: [échantillon, ...]}} ; reconstruit une seule
+            fois depuis les journaux si le résumé est absent ou illisible
+        """
+        path = self._calibration_path()
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                pass
+        
+        windows: Dict[str, Dict[str, List[list]]] = {}
+        for entry in sorted(self.entries(), key=lambda entry: entry.get("timestamp", "")):
+            self._add_sample(windows, entry)
+        self._save_calibration(windows)
+        return windows
+    
+    def _save_calibration(self, windows: Dict[str, Dict[str, List[list]]]):
+        """Écrit le résumé de calibration (remplacement atomique)"""
+        path = self._calibration_path()
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(windows, f)
+        temp_path.replace(path)
+    
+    @staticmethod
+    def _add_sample(windows: Dict[str, Dict[str, List[list]]], entry: Dict[str, Any]) -> bool:
+        """Ajoute un appel mesuré à la fenêtre de son modèle et de son protocole"""
+        if not entry.get("model") or not entry.get("prompt_tokens"):
+            return False
+        
+        window = windows.setdefault(entry["model"], {}).setdefault(str(entry.get("protocol")), [])
+        window.append([
+            entry.get("timestamp", ""), entry["prompt_tokens"], entry.get("raw_prompt_tokens") or 0,
+            entry.get("chunk_size") or 0, entry.get("completion_tokens") or 0
+        ])
+        del window[:-CALIBRATION_WINDOW]
+        return True
+    
+    def _aggregate(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Totaux et percentiles d'un ensemble d'appels"""
+        latencies = [entry.get("latency_s") or 0.0 for entry in entries]
+        totals = [entry.get("total_tokens") or 0 for entry in entries]
+        outcomes = {outcome: 0 for outcome in PARSE_OUTCOMES}
+        for entry in entries:
+            outcome = entry.get("parse_outcome", "ok")
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        
+        urls = sum(entry.get("chunk_size") or 0 for entry in entries)
+        omitted = sum(entry.get("omitted_urls") or 0 for entry in entries)
+        cost = sum(entry.get("cost_usd") or 0.0 for entry in entries)
+        prompt_tokens = sum(entry.get("prompt_tokens") or 0 for entry in entries)
+        cached_tokens = sum(entry.get("cached_tokens") or 0 for entry in entries)
+        
+        return {
+            "calls": len(entries),
+            "urls": urls,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+            "completion_tokens": sum(entry.get("completion_tokens") or 0 for entry in entries),
+            "total_tokens": sum(totals),
+            "cost_usd": round(cost, 6),
+            "cost_per_url_usd": round(cost / urls, 8) if urls else 0.0,
+            "retries": sum(entry.get("retries") or 0 for entry in entries),
+            "latency_s": round(sum(latencies), 3),
+            "latency_p50_s": round(percentile(latencies, 0.5), 3),
+            "latency_p90_s": round(percentile(latencies, 0.9), 3),
+            "latency_p99_s": round(percentile(latencies, 0.99), 3),
+            "tokens_p50": percentile(totals, 0.5),
+            "tokens_p90": percentile(totals, 0.9),
+            "parse_outcomes": outcomes,
+            "omitted_urls": omitted,
+            "omission_rate": round(omitted / urls, 4) if urls else 0.0
+        }
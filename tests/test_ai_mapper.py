@@ -135,6 +135,95 @@ class TestAIMapper:
         assert len(chunks[1]["old_urls"]) == 50  
         assert len(chunks[2]["old_urls"]) == 50
     
+    def test_chunking_packs_to_token_budgets(self):
+        """Test lots adaptatifs : URLs courtes regroupées, URLs longues sous le budget"""
+        from src.ai_mapper import AIMapper
+        
+        mapper = AIMapper("test-key", compact_protocol=True, max_input_tokens=3000)
+        new_urls = [f"/new-page-{i}" for i in range(20)]
+        
+        short_chunks = mapper._create_chunks([f"/p{i}" for i in range(200)], new_urls)
+        long_old = [f"/fr/hebergements/categorie-{i}/mobil-home-trois-chambres-terrasse-couverte-vue-lac-{i}"
+                    for i in range(200)]
+        long_chunks = mapper._create_chunks(long_old, new_urls)
+        
+        assert len(short_chunks) == 1
+        assert len(long_chunks) > 1
+        assert sum(len(c["old_urls"]) for c in long_chunks) == 200
+        
+        for chunk in long_chunks:
+            prompt = mapper._get_system_prompt("") + mapper._render_prompt(chunk["old_urls"], chunk["new_urls"])
+            assert mapper.token_estimator.count(prompt) <= mapper.input_token_budget
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_token_estimator_learns_from_usage(self, mock_openai):
+        """Test calibration de l'estimateur par response.usage"""
+        from src.ai_mapper import AIMapper
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = Mock(
+            choices=[Mock(message=Mock(content='{"correspondances": [], "non_matchees": ["/camping-gard"]}'))],
+            usage=Mock(prompt_tokens=5000, completion_tokens=20, total_tokens=5020)
+        )
+        
+        mapper = AIMapper("test-key", local_prematch=False)
+        mapper.match_urls(["/camping-gard"], ["/presentation"])
+        
+        stats = mapper.token_estimator.get_statistics()
+        assert stats["calibrations"] == 1
+        assert stats["input_ratio"] > 1.0
+        assert stats["output_tokens_per_url"] < 50
+    
+    def test_chunking_selects_candidates_beyond_limit(self):
+        """Test présélection lexicale au lieu de la troncature new_urls[:200]"""
+        from src.ai_mapper import AIMapper
+        
+        mapper = AIMapper("test-key", max_candidates=50, candidates_per_url=5)
+        
+        new_urls = [f"/new-page-{i}" for i in range(300)]
+        new_urls.append("/nos-hebergements/chalet-bois")
+        old_urls = ["/chalet-en-bois", "/old-page-12"]
+        
+        chunks = mapper._create_chunks(old_urls, new_urls, chunk_size=50)
+        
+        assert len(chunks) == 1
+        # La cible située au-delà des 200 premières URLs est présente
+        assert "/nos-hebergements/chalet-bois" in chunks[0]["new_urls"]
+        assert len(chunks[0]["new_urls"]) <= 50
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_urls_without_lexical_hit_never_get_an_empty_candidate_block(self, mock_openai):
+        """Test repli : un lot sans résultat lexical reçoit des candidates, jamais un bloc vide"""
+        import json
+        from src.ai_mapper import AIMapper
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = Mock(
+            choices=[Mock(message=Mock(content=json.dumps({"correspondances": [], "non_matchees": ["/qui-sommes-nous"]})))]
+        )
+        
+        mapper = AIMapper("test-key", local_prematch=False, max_candidates=20, candidates_per_url=5)
+        new_urls = [f"/new-page-{i}" for i in range(100)] + ["/a-propos"]
+        built = []
+        build_request = mapper._build_request
+        
+        def spy(old_urls, chunk_new_urls, *args):
+            built.append(chunk_new_urls)
+            return build_request(old_urls, chunk_new_urls, *args)
+        
+        with patch.object(mapper, "_build_request", side_effect=spy):
+            mapper.match_urls(["/qui-sommes-nous"], new_urls)
+        
+        assert built and all(built)
+        assert all(len(chunk_new_urls) <= 20 for chunk_new_urls in built)
+        
+        # Avec d'autres URLs du découpage, repli sur leurs meilleures candidates
+        chunks = mapper._create_chunks(["/qui-sommes-nous", "/new-page-7"], new_urls, chunk_size=1)
+        assert all(chunk["new_urls"] for chunk in chunks)
+        assert "/new-page-7" in chunks[1]["new_urls"]
+
     def test_contextual_prompt_injection(self):
         """Test injection du contexte métier (US014)"""
         from src.ai_mapper import AIMapper
@@ -144,7 +233,8 @@ class TestAIMapper:
         # Contexte métier de test
         test_context = "mobil-home devient nos locatifs, restaurant devient restauration"
         
-        # Test construction du prompt avec contexte
+        # Test construction des prompts avec contexte
+        system_prompt = mapper._get_system_prompt(test_context)
         prompt = mapper._build_prompt(
             old_urls=["/mobil-home-luxe"],
             new_urls=["/nos-locatifs"],
@@ -152,10 +242,47 @@ class TestAIMapper:
             langue="fr"
         )
         
-        # Vérifier injection du contexte
-        assert "mobil-home devient nos locatifs" in prompt
-        assert "restaurant devient restauration" in prompt
-        assert "CONTEXTE MÉTIER" in prompt
+        # Vérifier injection du contexte, une seule fois (prompt système)
+        assert "mobil-home devient nos locatifs" in system_prompt
+        assert "restaurant devient restauration" in system_prompt
+        assert "CONTEXTE MÉTIER" in system_prompt
+        assert test_context not in prompt
+    
+    def test_prompt_prefix_is_shared_across_chunks(self):
+        """Test disposition pour le cache de préfixe : seules les anciennes URLs varient en fin de prompt"""
+        from src.ai_mapper import AIMapper
+        
+        for compact_protocol in (False, True):
+            mapper = AIMapper("test-key", compact_protocol=compact_protocol)
+            new_urls = [f"/new-page-{i}" for i in range(30)]
+            chunks = mapper._create_chunks([f"/old-page-{i}" for i in range(20)], new_urls, chunk_size=5)
+            
+            prompts = [
+                mapper._get_system_prompt("Blog devient Actualités") +
+                mapper._render_prompt(chunk["old_urls"], chunk["new_urls"], "Blog devient Actualités")
+                for chunk in chunks
+            ]
+            prefixes = {prompt.split("ANCIENNES URLS")[0] for prompt in prompts}
+            
+            assert len(chunks) == 4
+            assert len(prefixes) == 1
+            assert prompts[0].count("Blog devient Actualités") == 1
+    
+    def test_chunks_with_same_candidates_are_grouped(self):
+        """Test présélection : URLs voisines regroupées, lots de même bloc de candidates consécutifs"""
+        from src.ai_mapper import AIMapper
+        
+        mapper = AIMapper("test-key", max_candidates=20, candidates_per_url=3)
+        new_urls = [f"/produits/categorie-{c}/article-{i}" for c in ("a", "b") for i in range(20)]
+        old_urls = [f"/old/categorie-{c}/article-{i}" for i in range(4) for c in ("a", "b")]
+        
+        chunks = mapper._create_chunks(old_urls, new_urls, chunk_size=2)
+        
+        for chunk in chunks:
+            assert len({url.split("/")[2] for url in chunk["old_urls"]}) == 1
+        candidate_sets = [tuple(chunk["new_urls"]) for chunk in chunks]
+        first_seen = list(dict.fromkeys(candidate_sets))
+        assert candidate_sets == sorted(candidate_sets, key=first_seen.index)
     
     def test_language_specific_matching(self):
         """Test matching spécifique par langue"""
@@ -212,6 +339,442 @@ class TestAIMapper:
         result = mapper.match_urls(["/test"], ["/test-new"])
         assert result is not None
     
+    @patch('src.ai_mapper.OpenAI')
+    def test_parallel_chunks_keep_deterministic_order(self, mock_openai):
+        """Test envoi concurrent des chunks avec ordre des résultats conservé"""
+        import json
+        import re
+        import threading
+        import time as time_module
+        from src.ai_mapper import AIMapper
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        
+        active = {"current": 0, "max": 0}
+        lock = threading.Lock()
+        
+        def fake_create(**kwargs):
+            # Répond avec les URLs anciennes du prompt, en ralentissant le 1er chunk
+            prompt = kwargs["messages"][1]["content"]
+            old_block = prompt.split("ANCIENNES URLS")[1].split("NOUVELLES URLS")[0]
+            old_urls = re.findall(r"/old-page-\d+", old_block)
+            
+            with lock:
+                active["current"] += 1
+                active["max"] = max(active["max"], active["current"])
+            time_module.sleep(0.05 if "/old-page-0" in old_urls else 0.01)
+            with lock:
+                active["current"] -= 1
+            
+            content = json.dumps({
+                "correspondances": [
+                    {"ancienne": url, "nouvelle": url.replace("old", "new"), "confidence": 0.9, "raison": "Test"}
+                    for url in old_urls
+                ],
+                "non_matchees": []
+            })
+            return Mock(choices=[Mock(message=Mock(content=content))])
+        
+        mock_client.chat.completions.create.side_effect = fake_create
+        
+        mapper = AIMapper("test-key", chunk_size=5, max_concurrency=4)
+        old_urls = [f"/old-page-{i}" for i in range(20)]
+        new_urls = [f"/new-page-{i}" for i in range(20)]
+        
+        result = mapper.match_urls(old_urls, new_urls)
+        
+        assert [m["ancienne"] for m in result.correspondances] == old_urls
+        assert active["max"] > 1
+        assert mapper.rate_limiter.get_statistics()["acquired_requests"] == 4
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_local_prematch_skips_api_for_obvious_pairs(self, mock_openai):
+        """Test que les paires évidentes ne sont pas envoyées à l'IA"""
+        from src.ai_mapper import AIMapper
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value.choices = [
+            Mock(message=Mock(content='{"correspondances": [], "non_matchees": ["/camping-gard"]}'))
+        ]
+        
+        mapper = AIMapper("test-key")
+        result = mapper.match_urls(["/contact", "/camping-gard"], ["/contact", "/presentation"])
+        
+        assert result.correspondances[0]["ancienne"] == "/contact"
+        assert result.correspondances[0]["methode"] == "local"
+        
+        # Seule l'URL non évidente est dans le prompt
+        prompt = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "ANCIENNES URLS (1)" in prompt
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_truncated_response_requeries_only_missing_urls(self, mock_openai):
+        """Test réponse tronquée : correspondances gardées, seules les URLs manquantes relancées"""
+        from src.ai_mapper import AIMapper
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        truncated = ('{"correspondances": ['
+                     '{"ancienne": "/ancien-a", "nouvelle": "/accueil", "confidence": 0.9, "raison": "A"}, '
+                     '{"ancienne": "/ancien-b", "nouvelle": "/serv')
+        complete = ('{"correspondances": [{"ancienne": "/ancien-b", "nouvelle": "/services", '
+                    '"confidence": 0.8, "raison": "B"}], "non_matchees": ["/ancien-c"]}')
+        mock_client.chat.completions.create.side_effect = [
+            Mock(choices=[Mock(message=Mock(content=truncated))]),
+            Mock(choices=[Mock(message=Mock(content=complete))])
+        ]
+        
+        mapper = AIMapper("test-key", local_prematch=False)
+        result = mapper.match_urls(["/ancien-a", "/ancien-b", "/ancien-c"], ["/accueil", "/services"])
+        
+        assert [m["ancienne"] for m in result.correspondances] == ["/ancien-a", "/ancien-b"]
+        assert result.non_matchees == ["/ancien-c"]
+        
+        retry_prompt = mock_client.chat.completions.create.call_args_list[1].kwargs["messages"][1]["content"]
+        assert "ANCIENNES URLS (2)" in retry_prompt
+        assert "/ancien-a" not in retry_prompt.split("ANCIENNES URLS")[1]
+        
+        stats = mapper.get_statistics()
+        assert stats["salvaged_responses"] == 1
+        assert stats["requeried_urls"] == 2
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_omitted_urls_are_requeried_in_small_batches(self, mock_openai, tmp_path):
+        """Test omissions : réponse complète réconciliée, URLs omises relancées en petits lots"""
+        import json
+        import re
+        from src.ai_mapper import AIMapper
+        from src.usage_ledger import UsageLedger
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        prompts = []
+        
+        def fake_create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            prompts.append(prompt)
+            old_block = prompt.split("ANCIENNES URLS")[1].split("NOUVELLES URLS")[0]
+            old_urls = re.findall(r"/ancien-\d+", old_block)
+            if len(prompts) == 1:
+                # Premier lot : 3 URLs sur 10, une réponse hors lot et un doublon
+                content = json.dumps({
+                    "correspondances": [
+                        {"ancienne": url, "nouvelle": "/accueil", "confidence": 0.9, "raison": "Test"}
+                        for url in old_urls[:3] + ["/inconnue"]
+                    ],
+                    "non_matchees": [old_urls[0]]
+                })
+            else:
+                content = json.dumps({"correspondances": [], "non_matchees": old_urls})
+            return Mock(choices=[Mock(message=Mock(content=content))])
+        
+        mock_client.chat.completions.create.side_effect = fake_create
+        
+        ledger = UsageLedger(tmp_path)
+        mapper = AIMapper("test-key", local_prematch=False, omission_batch_size=3, usage_ledger=ledger)
+        old_urls = [f"/ancien-{i}" for i in range(10)]
+        result = mapper.match_urls(old_urls, ["/accueil"])
+        
+        assert [m["ancienne"] for m in result.correspondances] == old_urls[:3]
+        assert sorted(result.non_matchees) == sorted(old_urls[3:])
+        
+        # 7 URLs omises : 3 lots de relance (3, 3, 1), sans les URLs déjà traitées
+        assert [prompt.split("ANCIENNES URLS (")[1].split(")")[0] for prompt in prompts[1:]] == ["3", "3", "1"]
+        
+        stats = mapper.get_statistics()
+        assert stats["omitted_urls"] == 7
+        assert stats["stray_answers"] == 2
+        assert stats["omission_rate"] == 7 / 17
+        assert ledger.summary()["omitted_urls"] == 7
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_pathological_url_is_isolated_by_bisection(self, mock_openai):
+        """Test bisection : une URL qui casse la réponse n'empêche pas les autres"""
+        import json
+        import re
+        from src.ai_mapper import AIMapper
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        
+        def fake_create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            old_block = prompt.split("ANCIENNES URLS")[1].split("NOUVELLES URLS")[0]
+            old_urls = re.findall(r"/ancien-\d+", old_block)
+            if "/ancien-5" in old_urls:
+                return Mock(choices=[Mock(message=Mock(content="Réponse invalide"))])
+            content = json.dumps({
+                "correspondances": [
+                    {"ancienne": url, "nouvelle": "/accueil", "confidence": 0.9, "raison": "Test"}
+                    for url in old_urls
+                ],
+                "non_matchees": []
+            })
+            return Mock(choices=[Mock(message=Mock(content=content))])
+        
+        mock_client.chat.completions.create.side_effect = fake_create
+        
+        mapper = AIMapper("test-key", local_prematch=False)
+        old_urls = [f"/ancien-{i}" for i in range(8)]
+        result = mapper.match_urls(old_urls, ["/accueil"])
+        
+        assert sorted(m["ancienne"] for m in result.correspondances) == sorted(u for u in old_urls if u != "/ancien-5")
+        # URL sans réponse exploitable : abandonnée, pas « non matchée » par le modèle
+        assert result.non_matchees == []
+        assert result.abandonnees == ["/ancien-5"]
+        
+        stats = mapper.get_statistics()
+        assert stats["bisections"] == 3
+        assert stats["abandoned_urls"] == 1
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_streaming_emits_matches_before_completion_ends(self, mock_openai):
+        """Test streaming : chaque correspondance est émise dès la fermeture de son objet"""
+        from src.ai_mapper import AIMapper
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        
+        content = ('{"correspondances": ['
+                   '{"ancienne": "/ancien-a", "nouvelle": "/accueil", "confidence": 0.9, "raison": "A"}, '
+                   '{"ancienne": "/ancien-b", "nouvelle": "/services", "confidence": 0.8, "raison": "B"}'
+                   '], "non_matchees": ["/ancien-c"]}')
+        progress = {"sent": 0}
+        
+        def fake_stream():
+            for start in range(0, len(content), 10):
+                progress["sent"] = start + 10
+                yield Mock(choices=[Mock(delta=Mock(content=content[start:start + 10]))], usage=None)
+            yield Mock(choices=[], usage=Mock(prompt_tokens=300, completion_tokens=60, total_tokens=360))
+        
+        mock_client.chat.completions.create.side_effect = lambda **kwargs: fake_stream()
+        
+        received = []
+        mapper = AIMapper("test-key", local_prematch=False, stream=True)
+        result = mapper.match_urls(
+            ["/ancien-a", "/ancien-b", "/ancien-c"], ["/accueil", "/services"],
+            on_match=lambda match: received.append((match["ancienne"], progress["sent"]))
+        )
+        
+        assert [url for url, _ in received] == ["/ancien-a", "/ancien-b"]
+        # La première correspondance arrive bien avant la fin du flux
+        assert received[0][1] < len(content) / 2
+        assert result.non_matchees == ["/ancien-c"]
+        assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+        assert mapper.token_estimator.get_statistics()["calibrations"] == 1
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_iter_matches_yields_then_returns_result(self, mock_openai):
+        """Test itérateur : correspondances au fil de l'eau puis MatchResult final"""
+        from src.ai_mapper import AIMapper, MatchResult
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value.choices = [
+            Mock(message=Mock(content='{"correspondances": [{"ancienne": "/camping-gard", "nouvelle": "/presentation", '
+                                      '"confidence": 0.9, "raison": "Test"}], "non_matchees": []}'))
+        ]
+        
+        mapper = AIMapper("test-key")
+        matches = mapper.iter_matches(["/contact", "/camping-gard"], ["/contact", "/presentation"])
+        
+        received = []
+        while True:
+            try:
+                received.append(next(matches)["ancienne"])
+            except StopIteration as done:
+                result = done.value
+                break
+        
+        # Le pré-matching local est émis avant la réponse IA
+        assert received == ["/contact", "/camping-gard"]
+        assert isinstance(result, MatchResult)
+        assert len(result.correspondances) == 2
+    
+    def test_compact_protocol_prompt_numbers_urls(self):
+        """Test prompt compact : URLs numérotées et réponse par indices"""
+        from src.ai_mapper import AIMapper
+        
+        mapper = AIMapper("test-key", compact_protocol=True)
+        
+        prompt = mapper._build_compact_prompt(["/ancien-a", "/ancien-b"], ["/nouveau-a"], langue="fr")
+        
+        assert "0: /ancien-a" in prompt
+        assert "1: /ancien-b" in prompt
+        assert "0: /nouveau-a" in prompt
+        assert '"m"' in mapper._get_system_prompt("")
+    
+    def test_compact_protocol_response_decoding(self):
+        """Test décodage local des triplets d'indices"""
+        from src.ai_mapper import AIMapper
+        
+        mapper = AIMapper("test-key", compact_protocol=True)
+        old_urls = ["/a", "/b", "/c", "/d"]
+        new_urls = ["/x", "/y"]
+        
+        # Indice de nouvelle URL invalide pour /c, raison optionnelle pour /b
+        response = '{"m": [[0, 1, 92], [1, 0, 80, "Même thème"], [2, 7, 90]], "u": [3]}'
+        data = mapper._parse_compact_response(response, old_urls, new_urls)
+        
+        assert data["correspondances"] == [
+            {"ancienne": "/a", "nouvelle": "/y", "confidence": 0.92, "raison": ""},
+            {"ancienne": "/b", "nouvelle": "/x", "confidence": 0.8, "raison": "Même thème"}
+        ]
+        assert data["non_matchees"] == ["/c", "/d"]
+    
+    def test_compact_confidence_scale(self):
+        """Test échelle compacte : toujours 0-100, bornée, booléens rejetés"""
+        from src.ai_mapper import _compact_confidence
+        
+        assert _compact_confidence(1) == 0.01
+        assert _compact_confidence(100) == 1.0
+        assert _compact_confidence(150) == 1.0
+        assert _compact_confidence(-5) == 0.0
+        assert _compact_confidence(True) == 0.0
+        assert _compact_confidence("85") == 0.0
+    
+    def test_compact_protocol_alternatives_decoding(self):
+        """Test alternatives compactes : rattachées à la correspondance de leur ancienne URL"""
+        from src.ai_mapper import AIMapper
+        
+        mapper = AIMapper("test-key", compact_protocol=True)
+        
+        # Alternative d'une URL non matchée et indice hors liste ignorés
+        response = '{"m": [[0, 1, 92]], "a": [[0, 2, 70], [0, 9, 60], [1, 0, 50]], "u": [1]}'
+        data = mapper._parse_compact_response(response, ["/a", "/b"], ["/x", "/y", "/z"])
+        
+        assert data["correspondances"][0]["alternatives"] == [{"nouvelle": "/z", "confidence": 0.7}]
+        assert data["non_matchees"] == ["/b"]
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_compact_protocol_end_to_end(self, mock_openai):
+        """Test matching complet en protocole compact"""
+        from src.ai_mapper import AIMapper, AIMatchingError
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value.choices = [
+            Mock(message=Mock(content='{"m": [[0, 1, 88]], "u": []}'))
+        ]
+        
+        mapper = AIMapper("test-key", compact_protocol=True, local_prematch=False)
+        result = mapper.match_urls(["/camping-presentation-gard"], ["/services", "/presentation"])
+        
+        assert result.correspondances[0]["nouvelle"] == "/presentation"
+        assert result.correspondances[0]["confidence"] == 0.88
+        
+        with pytest.raises(AIMatchingError):
+            mapper._parse_compact_response('{"correspondances": []}', ["/a"], ["/b"])
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_match_cache_only_requeries_changed_urls(self, mock_openai, tmp_path):
+        """Test cache par URL : une relance n'envoie que les URLs nouvelles"""
+        import json
+        import re
+        from src.ai_mapper import AIMapper
+        from src.cache_manager import MatchCache
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        prompts = []
+        
+        def fake_create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            prompts.append(prompt)
+            old_block = prompt.split("ANCIENNES URLS")[1].split("NOUVELLES URLS")[0]
+            old_urls = re.findall(r"/ancien-\w+", old_block)
+            content = json.dumps({
+                "correspondances": [
+                    {"ancienne": url, "nouvelle": "/accueil", "confidence": 0.9, "raison": "Test"}
+                    for url in old_urls if url != "/ancien-perdu"
+                ],
+                "non_matchees": [url for url in old_urls if url == "/ancien-perdu"]
+            })
+            return Mock(choices=[Mock(message=Mock(content=content))])
+        
+        mock_client.chat.completions.create.side_effect = fake_create
+        
+        cache = MatchCache(tmp_path)
+        new_urls = ["/accueil", "/services"]
+        
+        first = AIMapper("test-key", local_prematch=False, match_cache=cache)
+        first.match_urls(["/ancien-a", "/ancien-perdu"], new_urls)
+        
+        second = AIMapper("test-key", local_prematch=False, match_cache=cache)
+        result = second.match_urls(["/ancien-a", "/ancien-perdu", "/ancien-b"], new_urls)
+        
+        # Seule /ancien-b part à l'IA lors de la relance
+        assert len(prompts) == 2
+        assert "ANCIENNES URLS (1)" in prompts[1]
+        assert [m["ancienne"] for m in result.correspondances] == ["/ancien-a", "/ancien-b"]
+        assert result.non_matchees == ["/ancien-perdu"]
+        
+        stats = second.get_statistics()
+        assert stats["match_cache_hits"] == 2
+        assert stats["match_cache_misses"] == 1
+        
+        # Un autre contexte métier invalide les entrées
+        third = AIMapper("test-key", local_prematch=False, match_cache=cache)
+        third.match_urls(["/ancien-a"], new_urls, contexte_metier="Camping")
+        assert third.get_statistics()["match_cache_misses"] == 1
+    
+    def test_match_cache_keys_depend_on_protocol(self):
+        """Test cache par URL : entrées JSON et compactes jamais confondues"""
+        from src.ai_mapper import AIMapper
+        
+        args = (["/ancien-a"], ["/accueil"], None, "", "fr")
+        json_keys = AIMapper("test-key")._get_cache_keys(*args)
+        compact_keys = AIMapper("test-key", compact_protocol=True)._get_cache_keys(*args)
+        
+        assert json_keys["/ancien-a"] != compact_keys["/ancien-a"]
+    
+    @patch('src.ai_mapper.OpenAI')
+    def test_abandoned_urls_are_not_cached(self, mock_openai, tmp_path):
+        """Test cache par URL : une URL abandonnée est redemandée au modèle au passage suivant"""
+        import json
+        import re
+        from src.ai_mapper import AIMapper
+        from src.cache_manager import MatchCache
+        
+        mock_client = Mock()
+        mock_openai.return_value = mock_client
+        prompts = []
+        outage = {"active": True}
+        
+        def fake_create(**kwargs):
+            prompt = kwargs["messages"][1]["content"]
+            prompts.append(prompt)
+            old_urls = re.findall(r"/ancien-\w+", prompt.split("ANCIENNES URLS")[1])
+            if outage["active"] and "/ancien-b" in old_urls:
+                return Mock(choices=[Mock(message=Mock(content="Réponse invalide"))])
+            content = json.dumps({
+                "correspondances": [
+                    {"ancienne": url, "nouvelle": "/accueil", "confidence": 0.9, "raison": "Test"}
+                    for url in old_urls
+                ],
+                "non_matchees": []
+            })
+            return Mock(choices=[Mock(message=Mock(content=content))])
+        
+        mock_client.chat.completions.create.side_effect = fake_create
+        cache = MatchCache(tmp_path)
+        
+        first = AIMapper("test-key", local_prematch=False, match_cache=cache, max_retries=1)
+        first.match_urls(["/ancien-a", "/ancien-b"], ["/accueil"])
+        assert first.get_statistics()["abandoned_urls"] == 1
+        
+        outage["active"] = False
+        prompts.clear()
+        second = AIMapper("test-key", local_prematch=False, match_cache=cache)
+        result = second.match_urls(["/ancien-a", "/ancien-b"], ["/accueil"])
+        
+        # /ancien-a vient du cache, /ancien-b repart vers le modèle
+        assert len(prompts) == 1
+        assert "ANCIENNES URLS (1):\n/ancien-b" in prompts[0]
+        assert [m["ancienne"] for m in result.correspondances] == ["/ancien-a", "/ancien-b"]
+    
     def test_cost_estimation(self):
         """Test estimation du coût API"""
         from src.ai_mapper import AIMapper
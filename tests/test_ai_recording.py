@@ -0,0 +1,61 @@
+"""
+Tests pour l'enregistrement et le rejeu des échanges OpenAI
+"""
+
+import pytest
+from openai import OpenAI
+
+from src.ai_mapper import AIMapper
+from src.ai_recording import RecordingClient, ReplayClient, ReplayStore, request_key
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig
+
+
+OLD_URLS = ["/fr/chalet-bois.html", "/fr/contact-nous"]
+NEW_URLS = ["/fr/hebergements/chalet-bois/", "/fr/contact/"]
+
+
+class TestAIRecording:
+    
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_replay_reproduces_recorded_session(self, tmp_path, stream):
+        """Test session enregistrée puis rejouée hors ligne à l'identique"""
+        path = tmp_path / "session.jsonl"
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            recorder = RecordingClient(OpenAI(api_key="mock", base_url=server.base_url),
+                                       ReplayStore(str(path)))
+            recorded = AIMapper("mock", client=recorder, local_prematch=False, stream=stream).match_urls(
+                OLD_URLS, NEW_URLS
+            )
+        
+        assert len(recorder.latencies) == 1
+        
+        # Rejeu depuis le fichier, sans serveur
+        replayer = ReplayClient(ReplayStore(str(path)))
+        replayed = AIMapper("mock", client=replayer, local_prematch=False, stream=stream).match_urls(
+            OLD_URLS, NEW_URLS
+        )
+        
+        assert replayed == recorded
+    
+    def test_replay_detects_divergent_session(self, tmp_path):
+        """Test requête absente des enregistrements : erreur explicite"""
+        replayer = ReplayClient(ReplayStore(str(tmp_path / "vide.jsonl")))
+        
+        with pytest.raises(LookupError):
+            replayer.chat.completions.create(model="gpt-3.5-turbo", messages=[], temperature=0.1)
+    
+    def test_server_replays_recordings_before_responder(self):
+        """Test serveur simulé : enregistrement rejoué en priorité sur le répondeur"""
+        store = ReplayStore()
+        request = {"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": "x"}], "temperature": 0.1}
+        store.add({"key": request_key(request),
+                   "content": '{"correspondances": [], "non_matchees": []}', "usage": None})
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), replay_store=store) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url)
+            response = client.chat.completions.create(**request)
+            stats = server.get_statistics()
+        
+        assert response.choices[0].message.content == '{"correspondances": [], "non_matchees": []}'
+        assert stats["replayed"] == 1
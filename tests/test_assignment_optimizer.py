@@ -0,0 +1,97 @@
+"""
+Tests pour l'affectation globale sous contrainte de fan-in
+"""
+
+import itertools
+
+import numpy as np
+
+from src.assignment_optimizer import AssignmentOptimizer
+from src.embedding_matcher import EmbeddingMatcher
+
+
+def brute_force(scores, capacities):
+    """Meilleure somme de scores par énumération (petites instances)"""
+    n_old, n_new = scores.shape
+    best = 0.0
+    for choice in itertools.product(range(-1, n_new), repeat=n_old):
+        counts = np.zeros(n_new, dtype=int)
+        total = 0.0
+        for row, col in enumerate(choice):
+            if col < 0:
+                continue
+            if scores[row, col] <= 0:
+                break
+            counts[col] += 1
+            total += scores[row, col]
+        else:
+            if (counts <= capacities).all():
+                best = max(best, total)
+    return best
+
+
+class TestAssignmentOptimizer:
+    
+    def test_assign_is_optimal_on_small_instances(self):
+        """Test optimum exact (égalités comprises) face à l'énumération"""
+        rng = np.random.default_rng(0)
+        for trial in range(150):
+            n_old, n_new = rng.integers(1, 6), rng.integers(1, 5)
+            scores = np.round(rng.random((n_old, n_new)), 2) * (rng.random((n_old, n_new)) < 0.7)
+            if trial % 2:
+                scores = np.round(scores * 2) / 2
+            capacities = rng.integers(0, 3, size=n_new)
+            rows, cols = np.nonzero(scores)
+            
+            assignment = AssignmentOptimizer().assign(rows, cols, scores[rows, cols], n_old, capacities)
+            
+            matched = assignment >= 0
+            assert (np.bincount(assignment[matched], minlength=n_new) <= capacities).all()
+            total = scores[np.flatnonzero(matched), assignment[matched]].sum()
+            assert abs(total - brute_force(scores, capacities)) < 1e-9
+    
+    def test_generic_target_is_not_piled_up(self):
+        """Test cible générique : chaque URL garde sa page dédiée, l'excédent passe en non matchées"""
+        candidates = [
+            {"ancienne": "/old/a", "nouvelle": "/blog/", "confidence": 0.9},
+            {"ancienne": "/old/a", "nouvelle": "/a/", "confidence": 0.85},
+            {"ancienne": "/old/b", "nouvelle": "/blog/", "confidence": 0.9},
+            {"ancienne": "/old/b", "nouvelle": "/b/", "confidence": 0.8},
+            {"ancienne": "/old/c", "nouvelle": "/blog/", "confidence": 0.75},
+        ]
+        optimizer = AssignmentOptimizer(max_fan_in=1)
+        
+        result = optimizer.optimize_matches(candidates)
+        
+        pairs = {match["ancienne"]: match["nouvelle"] for match in result.correspondances}
+        assert pairs == {"/old/a": "/a/", "/old/b": "/b/", "/old/c": "/blog/"}
+        assert result.non_matchees == []
+        assert optimizer.get_statistics()["reassigned_urls"] == 2
+    
+    def test_fan_in_overrides(self):
+        """Test fan-in par cible : page d'accueil illimitée, cible fermée"""
+        candidates = [
+            {"ancienne": f"/old/{i}", "nouvelle": "/", "confidence": 0.8} for i in range(4)
+        ] + [{"ancienne": "/old/x", "nouvelle": "/closed/", "confidence": 0.9}]
+        optimizer = AssignmentOptimizer(max_fan_in=1, fan_in_overrides={"/": None, "/closed/": 0})
+        
+        result = optimizer.optimize_matches(candidates)
+        
+        assert len(result.correspondances) == 4
+        assert result.non_matchees == ["/old/x"]
+        assert optimizer.get_statistics()["dropped_urls"] == 1
+    
+    def test_embedding_matcher_respects_fan_in(self):
+        """Test moteur local : fan-in respecté, correspondances émises après affectation"""
+        old_urls = ["/fr/chalet-bois.html", "/fr/chalet-bois-luxe.html", "/fr/chalet-pierre.html"]
+        new_urls = ["/fr/chalet-bois/", "/fr/chalet-bois-luxe/", "/fr/chalet-pierre/"]
+        streamed = []
+        
+        result = EmbeddingMatcher(max_fan_in=1).match_urls(
+            old_urls, new_urls, min_confidence=0.0, on_match=streamed.append
+        )
+        
+        targets = [match["nouvelle"] for match in result.correspondances]
+        assert len(targets) == len(set(targets))
+        assert streamed == result.correspondances
+        assert {match["ancienne"]: match["nouvelle"] for match in result.correspondances} == dict(zip(old_urls, new_urls))
@@ -0,0 +1,118 @@
+"""
+Tests pour le mode batch d'AIMapper (file de travaux persistante)
+"""
+
+import pytest
+from dataclasses import asdict
+from openai import OpenAI
+
+from src.ai_mapper import AIMapper
+from src.batch_jobs import BatchJobManager, LocalBatchBackend, AIMatchingError
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig, deterministic_responder
+from src.usage_ledger import UsageLedger
+
+
+JOBS = {
+    lang: ([f"/{lang}/chalet-{i}.html" for i in range(5)] + ["/zzz"],
+           [f"/{lang}/hebergements/chalet-{i}/" for i in range(5)] + ["/blog/"])
+    for lang in ("fr", "en")
+}
+
+
+def make_mapper(server, **kwargs):
+    """Mapper branché sur le serveur simulé (relances interactives)"""
+    client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+    return AIMapper("mock", client=client, local_prematch=False, chunk_size=2, **kwargs)
+
+
+class TestBatchJobs:
+    
+    def test_batch_results_match_interactive_run(self, tmp_path):
+        """Test batch local : mêmes résultats que le mode interactif, aucun appel direct"""
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            mapper = make_mapper(server)
+            backend = LocalBatchBackend(tmp_path / "backend", responder=deterministic_responder)
+            manager = BatchJobManager(mapper, backend=backend, jobs_dir=str(tmp_path / "jobs"))
+            
+            job_id = manager.enqueue(JOBS, metadata={"project": "www.example.com"})
+            assert server.get_statistics()["requests"] == 0
+            
+            results = manager.collect(job_id)
+            assert server.get_statistics()["requests"] == 0
+            interactive = {lang: mapper.match_urls(old, new, langue=lang) for lang, (old, new) in JOBS.items()}
+        
+        assert results == interactive
+        assert len(results["fr"].correspondances) == 5
+        jobs = manager.list_jobs()
+        assert jobs[0]["job_id"] == job_id
+        assert jobs[0]["status"] == "ingested"
+        assert jobs[0]["requests"] == 6
+        assert jobs[0]["metadata"] == {"project": "www.example.com"}
+    
+    def test_job_survives_restart(self, tmp_path):
+        """Test reprise : travail soumis, application relancée, résultats récupérés plus tard"""
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            slow = LocalBatchBackend(tmp_path / "backend", responder=deterministic_responder,
+                                     completion_delay=3600)
+            manager = BatchJobManager(make_mapper(server), backend=slow, jobs_dir=str(tmp_path / "jobs"))
+            job_id = manager.enqueue(JOBS)
+            
+            assert manager.poll(job_id) == "in_progress"
+            with pytest.raises(AIMatchingError):
+                manager.collect(job_id)
+            
+            # Nouveau processus : mêmes répertoires, service terminé entre-temps
+            backend = LocalBatchBackend(tmp_path / "backend", responder=deterministic_responder)
+            restarted = BatchJobManager(make_mapper(server), backend=backend, jobs_dir=str(tmp_path / "jobs"))
+            first = restarted.collect(job_id)
+            second = restarted.collect(job_id)
+        
+        assert {lang: asdict(result) for lang, result in first.items()} == \
+               {lang: asdict(result) for lang, result in second.items()}
+        assert restarted.poll(job_id) == "ingested"
+    
+    def test_failed_lines_are_requeried_interactively(self, tmp_path):
+        """Test ligne en erreur : lot relancé en interactif ; consommation journalisée au tarif batch"""
+        def flaky_responder(request):
+            if "/fr/chalet-0.html" in request["messages"][-1]["content"]:
+                raise RuntimeError("quota dépassé")
+            return deterministic_responder(request)
+        
+        ledger = UsageLedger(tmp_path / "ledger")
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            mapper = make_mapper(server, usage_ledger=ledger, project="p")
+            backend = LocalBatchBackend(tmp_path / "backend", responder=flaky_responder)
+            manager = BatchJobManager(mapper, backend=backend, jobs_dir=str(tmp_path / "jobs"))
+            
+            results = manager.collect(manager.enqueue({"fr": JOBS["fr"]}))
+            requests = server.get_statistics()["requests"]
+        
+        assert requests == 1
+        assert {m["ancienne"] for m in results["fr"].correspondances} == set(JOBS["fr"][0][:5])
+        modes = [entry["mode"] for entry in ledger.entries("p")]
+        assert modes.count("batch") == 2
+        assert modes.count("interactif") == 1
+    
+    def test_manager_uses_public_mapper_api(self, tmp_path):
+        """Test contrat : le gestionnaire batch n'accède à aucun attribut privé du mapper"""
+        class PublicOnly:
+            def __init__(self, mapper):
+                self._mapper = mapper
+            
+            def __getattr__(self, name):
+                assert not name.startswith("_"), f"attribut privé utilisé : {name}"
+                return getattr(self._mapper, name)
+        
+        def flaky_responder(request):
+            if "/fr/chalet-0.html" in request["messages"][-1]["content"]:
+                raise RuntimeError("quota dépassé")
+            return deterministic_responder(request)
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            mapper = make_mapper(server)
+            backend = LocalBatchBackend(tmp_path / "backend", responder=flaky_responder)
+            manager = BatchJobManager(PublicOnly(mapper), backend=backend, jobs_dir=str(tmp_path / "jobs"))
+            
+            results = manager.collect(manager.enqueue({"fr": JOBS["fr"]}))
+        
+        assert {m["ancienne"] for m in results["fr"].correspondances} == set(JOBS["fr"][0][:5])
@@ -0,0 +1,53 @@
+"""
+Tests pour le cache par URL (MatchCache)
+"""
+
+import pytest
+
+from src.cache_manager import CacheManager, MatchCache, fingerprint_candidates
+
+
+class TestMatchCache:
+    
+    def test_fingerprint_ignores_order_and_duplicates(self):
+        """Test empreinte identique quel que soit l'ordre des candidates"""
+        assert fingerprint_candidates(["/a", "/b"]) == fingerprint_candidates(["/b", "/a", "/a"])
+        assert fingerprint_candidates(["/a", "/b"]) != fingerprint_candidates(["/a", "/c"])
+    
+    def test_key_depends_on_all_inputs(self):
+        """Test clé sensible à l'URL, aux candidates, au contexte, au modèle, aux sections et au prompt"""
+        fingerprint = fingerprint_candidates(["/a"])
+        base = MatchCache.make_key("/old", fingerprint, "", "fr", "gpt-3.5-turbo", 0.1)
+        
+        assert base == MatchCache.make_key("/old", fingerprint, "", "fr", "gpt-3.5-turbo", 0.1)
+        assert base != MatchCache.make_key("/old2", fingerprint, "", "fr", "gpt-3.5-turbo", 0.1)
+        assert base != MatchCache.make_key("/old", fingerprint_candidates(["/b"]), "", "fr", "gpt-3.5-turbo", 0.1)
+        assert base != MatchCache.make_key("/old", fingerprint, "Camping", "fr", "gpt-3.5-turbo", 0.1)
+        assert base != MatchCache.make_key("/old", fingerprint, "", "fr", "gpt-4", 0.1)
+        assert base != MatchCache.make_key("/old", fingerprint, "", "fr", "gpt-3.5-turbo", 0.3)
+        assert base != MatchCache.make_key("/old", fingerprint, "", "fr", "gpt-3.5-turbo", 0.1,
+                                           section_mode="local")
+        assert base != MatchCache.make_key("/old", fingerprint, "", "fr", "gpt-3.5-turbo", 0.1,
+                                           prompt_version=2)
+        assert base != MatchCache.make_key("/old", fingerprint, "", "fr", "gpt-3.5-turbo", 0.1,
+                                           compact_protocol=True)
+    
+    def test_put_and_get_roundtrip(self, tmp_path):
+        """Test écriture puis relecture d'une correspondance et d'un non-match"""
+        cache = MatchCache(tmp_path)
+        match = {"ancienne": "/old", "nouvelle": "/new", "confidence": 0.9, "raison": "Test"}
+        
+        cache.put("k1", "/old", match)
+        cache.put("k2", "/perdu", None)
+        
+        assert cache.get("k1")["correspondance"] == match
+        assert cache.get("k2")["correspondance"] is None
+        assert cache.get("absent") is None
+        assert cache.count_entries() == 2
+    
+    def test_cache_manager_exposes_match_cache(self, tmp_path):
+        """Test statistiques du cache par URL dans CacheManager"""
+        manager = CacheManager(str(tmp_path))
+        manager.match_cache.put("k1", "/old", None)
+        
+        assert manager.get_cache_stats()["match_cache_entries"] == 1
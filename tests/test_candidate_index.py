@@ -0,0 +1,71 @@
+"""
+Tests pour l'index lexical de candidates (remplace la troncature new_urls[:200])
+"""
+
+import pytest
+from src.candidate_index import CandidateIndex, tokenize_url, extract_features
+
+
+class TestCandidateIndex:
+    """Tests pour la recherche TF-IDF des nouvelles URLs candidates"""
+    
+    def setup_method(self):
+        """Setup : nouvelles URLs d'un site de camping"""
+        self.new_urls = [
+            "https://new.com/fr/hebergements/mobil-home-confort",
+            "https://new.com/fr/hebergements/chalet-famille",
+            "https://new.com/fr/activites/piscine-chauffee",
+            "https://new.com/fr/activites/club-enfants",
+            "https://new.com/fr/contact",
+            "https://new.com/fr/tarifs-reservation"
+        ]
+        self.index = CandidateIndex(self.new_urls)
+    
+    def test_tokenize_url_strips_accents_and_domain(self):
+        """Test découpage du chemin en tokens normalisés"""
+        tokens = tokenize_url("https://old.com/fr/Activités/Piscine_Chauffée.html")
+        assert tokens == ["fr", "activites", "piscine", "chauffee", "html"]
+        
+        assert tokenize_url("/fr/contact") == ["fr", "contact"]
+    
+    def test_extract_features_contains_words_and_ngrams(self):
+        """Test features tokens + n-grammes de caractères"""
+        features = extract_features("/chalet")
+        assert features["w:chalet"] == 1
+        assert features["c:^ch"] == 1
+        assert features["c:et$"] == 1
+    
+    def test_search_ranks_closest_candidate_first(self):
+        """Test que la candidate la plus proche est en tête"""
+        results = self.index.search("https://old.com/fr/piscine-chauffee-couverte", k=3)
+        
+        assert self.new_urls[results[0][0]] == "https://new.com/fr/activites/piscine-chauffee"
+        assert all(results[i][1] >= results[i + 1][1] for i in range(len(results) - 1))
+    
+    def test_search_unknown_vocabulary_returns_nothing(self):
+        """Test requête sans aucune feature commune"""
+        assert self.index.search("zzzzqqqq", k=5) == []
+    
+    def test_candidates_for_batch_respects_limits(self):
+        """Test union des top-k d'un lot, plafonnée et dans l'ordre d'origine"""
+        candidates = self.index.candidates_for(
+            ["https://old.com/mobil-home", "https://old.com/nous-contacter"],
+            k_per_url=1,
+            max_candidates=5
+        )
+        
+        assert candidates == [
+            "https://new.com/fr/hebergements/mobil-home-confort",
+            "https://new.com/fr/contact"
+        ]
+    
+    def test_scales_to_large_candidate_sets(self):
+        """Test sur un gros volume : la cible est retrouvée parmi 20k URLs"""
+        sections = ["hebergements", "activites", "services", "blog", "infos"]
+        urls = [f"/fr/{sections[i % 5]}/page-{i}-{sections[(i * 7) % 5]}" for i in range(20000)]
+        urls.append("/fr/activites/toboggan-aquatique-geant")
+        
+        index = CandidateIndex(urls)
+        results = index.search("/fr/loisirs/toboggan-aquatique", k=10)
+        
+        assert urls[results[0][0]] == "/fr/activites/toboggan-aquatique-geant"
@@ -0,0 +1,75 @@
+"""
+Tests pour le moteur de matching local par embeddings hachés
+"""
+
+import numpy as np
+
+from src.embedding_matcher import HashedNgramEncoder, EmbeddingIndex, EmbeddingMatcher
+
+
+OLD_URLS = [
+    "/fr/hebergements/chalet-bois.html",
+    "/fr/activites/piscine-chauffee.html",
+    "/fr/contact-nous.html",
+    "/fr/ancienne-promo-ete-2019.html",
+]
+NEW_URLS = [
+    "/fr/nos-hebergements/chalet-bois/",
+    "/fr/espace-aquatique/piscine-chauffee/",
+    "/fr/contact/",
+    "/fr/blog/",
+    "/fr/restaurant/",
+]
+
+
+class TestEmbeddingMatcher:
+    
+    def test_encoder_is_normalized_and_stable(self):
+        """Test vecteurs L2 normalisés et hachage stable entre instances"""
+        first = HashedNgramEncoder(n_features=64).fit(NEW_URLS).transform(OLD_URLS)
+        second = HashedNgramEncoder(n_features=64).fit(NEW_URLS).transform(OLD_URLS)
+        
+        assert first.shape == (4, 64)
+        assert np.allclose(np.linalg.norm(first, axis=1), 1.0, atol=1e-5)
+        assert np.array_equal(first, second)
+    
+    def test_block_size_does_not_change_results(self):
+        """Test recherche par blocs : résultats identiques quelle que soit la taille de bloc"""
+        whole = EmbeddingIndex(NEW_URLS, block_size=100).search(OLD_URLS, k=3)
+        blocked = EmbeddingIndex(NEW_URLS, block_size=1).search(OLD_URLS, k=3)
+        
+        assert np.array_equal(whole[0], blocked[0])
+        assert np.allclose(whole[1], blocked[1])
+        # Scores décroissants par ligne
+        assert np.all(np.diff(whole[1], axis=1) <= 0)
+    
+    def test_match_urls_returns_match_result(self):
+        """Test matching hors ligne : pages déplacées retrouvées, page supprimée non matchée"""
+        streamed = []
+        result = EmbeddingMatcher().match_urls(OLD_URLS, NEW_URLS, min_confidence=0.7,
+                                               on_match=streamed.append)
+        
+        pairs = {match["ancienne"]: match["nouvelle"] for match in result.correspondances}
+        assert pairs[OLD_URLS[0]] == NEW_URLS[0]
+        assert pairs[OLD_URLS[1]] == NEW_URLS[1]
+        assert pairs[OLD_URLS[2]] == NEW_URLS[2]
+        assert OLD_URLS[3] in result.non_matchees
+        assert streamed == result.correspondances
+        assert all(match["methode"] == "embedding" for match in result.correspondances)
+    
+    def test_titles_break_ties(self):
+        """Test titres capturés : départagent des chemins sans indice lexical"""
+        old_urls = ["/fr/page-12"]
+        new_urls = ["/fr/p/a1", "/fr/p/b2"]
+        titles = {"/fr/page-12": "Location de kayak", "/fr/p/b2": "Kayak en location"}
+        
+        result = EmbeddingMatcher(titles=titles).match_urls(old_urls, new_urls, min_confidence=0.0)
+        
+        assert result.correspondances[0]["nouvelle"] == "/fr/p/b2"
+    
+    def test_empty_inputs(self):
+        """Test listes vides"""
+        result = EmbeddingMatcher().match_urls(OLD_URLS, [])
+        
+        assert result.correspondances == []
+        assert result.non_matchees == OLD_URLS
@@ -0,0 +1,102 @@
+"""
+Tests pour les clusters de traductions hreflang
+Propagation des correspondances de la langue pivot vers les autres langues
+"""
+
+import pytest
+from src.hreflang_clusters import (
+    TranslationClusters, normalize_hreflang, choose_pivot_language, propagate_matches
+)
+
+
+class TestTranslationClusters:
+    """Tests pour la construction des clusters"""
+    
+    def test_normalize_hreflang(self):
+        """Test normalisation des codes hreflang"""
+        assert normalize_hreflang("fr-FR") == "fr"
+        assert normalize_hreflang("en_GB") == "en"
+        assert normalize_hreflang("DE") == "de"
+        assert normalize_hreflang("x-default") is None
+        assert normalize_hreflang("") is None
+    
+    def test_clusters_from_sitemap_alternates(self):
+        """Test regroupement des traductions (liens dans les deux sens)"""
+        clusters = TranslationClusters.from_alternates({
+            "https://old.com/fr/contact": {
+                "fr": "https://old.com/fr/contact",
+                "en": "https://old.com/en/contact-us/"
+            },
+            # Le lien DE n'est déclaré que depuis la page EN
+            "https://old.com/en/contact-us": {
+                "de-DE": "https://old.com/de/kontakt"
+            }
+        })
+        
+        assert clusters.cluster_count() == 1
+        assert clusters.get_translation("https://old.com/fr/contact", "de") == "https://old.com/de/kontakt"
+        assert clusters.get_translation("https://old.com/de/kontakt", "fr") == "https://old.com/fr/contact"
+        assert clusters.get_translation("https://old.com/fr/contact", "nl") is None
+        assert clusters.get_translation("https://old.com/fr/inconnue", "en") is None
+
+
+class TestPropagation:
+    """Tests pour la dérivation des correspondances par langue"""
+    
+    def setup_method(self):
+        """Setup : deux sites FR/EN avec traductions déclarées"""
+        self.old_clusters = TranslationClusters.from_alternates({
+            "https://old.com/fr/tarifs": {"fr": "https://old.com/fr/tarifs", "en": "https://old.com/en/prices"},
+            "https://old.com/fr/acces": {"fr": "https://old.com/fr/acces", "en": "https://old.com/en/access"}
+        })
+        self.new_clusters = TranslationClusters.from_alternates({
+            "https://new.com/fr/nos-tarifs": {"fr": "https://new.com/fr/nos-tarifs", "en": "https://new.com/en/our-prices"}
+        })
+        self.old_grouped = {
+            "fr": ["https://old.com/fr/tarifs", "https://old.com/fr/acces"],
+            "en": ["https://old.com/en/prices", "https://old.com/en/access", "https://old.com/en/blog"]
+        }
+    
+    def test_choose_pivot_language(self):
+        """Test choix de la langue pivot (plus d'URLs en cluster)"""
+        pivot = choose_pivot_language({"fr", "en"}, self.old_grouped, self.old_clusters)
+        assert pivot in ("fr", "en")
+        
+        empty = TranslationClusters()
+        assert choose_pivot_language({"fr", "en"}, self.old_grouped, empty) is None
+    
+    def test_propagate_matches_follows_both_clusters(self):
+        """Test dérivation EN depuis les correspondances FR"""
+        pivot_matches = [
+            {"ancienne": "https://old.com/fr/tarifs", "nouvelle": "https://new.com/fr/nos-tarifs",
+             "confidence": 0.92, "raison": "Tarifs"},
+            # Pas de traduction côté nouveau site : reste pour l'IA
+            {"ancienne": "https://old.com/fr/acces", "nouvelle": "https://new.com/fr/venir",
+             "confidence": 0.85, "raison": "Accès"}
+        ]
+        new_en = ["https://new.com/en/our-prices", "https://new.com/en/getting-here"]
+        
+        derived, remaining = propagate_matches(
+            pivot_matches, self.old_clusters, self.new_clusters,
+            "en", self.old_grouped["en"], new_en
+        )
+        
+        assert len(derived) == 1
+        assert derived[0]["ancienne"] == "https://old.com/en/prices"
+        assert derived[0]["nouvelle"] == "https://new.com/en/our-prices"
+        assert derived[0]["confidence"] == 0.92
+        assert remaining == ["https://old.com/en/access", "https://old.com/en/blog"]
+    
+    def test_propagate_ignores_targets_outside_new_urls(self):
+        """Test qu'une traduction absente des URLs du nouveau site n'est pas utilisée"""
+        pivot_matches = [
+            {"ancienne": "https://old.com/fr/tarifs", "nouvelle": "https://new.com/fr/nos-tarifs", "confidence": 0.9}
+        ]
+        
+        derived, remaining = propagate_matches(
+            pivot_matches, self.old_clusters, self.new_clusters,
+            "en", self.old_grouped["en"], ["https://new.com/en/other"]
+        )
+        
+        assert derived == []
+        assert remaining == self.old_grouped["en"]
@@ -0,0 +1,94 @@
+"""
+Tests pour l'orchestration concurrente du matching multilangue
+"""
+
+import asyncio
+import time
+
+from openai import OpenAI, AsyncOpenAI
+
+from src.ai_mapper import AIMapper
+from src.language_pipeline import MultiLanguagePipeline, AIMatchingError, MatchResult
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig
+
+
+class FakeMapper:
+    """Mapper simulé : chaque langue dure `delay` secondes, 'de' échoue"""
+    
+    max_concurrency = 4
+    
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.limiters = set()
+    
+    async def match_urls_async(self, old_urls, new_urls, contexte_metier="", langue="fr",
+                               min_confidence=0.7, on_match=None, concurrency_limiter=None):
+        self.limiters.add(id(concurrency_limiter))
+        async with concurrency_limiter:
+            await asyncio.sleep(self.delay)
+        
+        if langue == "de":
+            raise AIMatchingError("API indisponible")
+        
+        matches = [{"ancienne": old, "nouvelle": new, "confidence": 0.9}
+                   for old, new in zip(old_urls, new_urls)]
+        for match in matches:
+            on_match(match)
+        return MatchResult(correspondances=matches, non_matchees=[])
+
+
+class TestMultiLanguagePipeline:
+    
+    def test_languages_run_concurrently_in_one_pool(self):
+        """Test langues en parallèle : durée de la plus longue, sémaphore unique"""
+        mapper = FakeMapper(delay=0.3)
+        jobs = {lang: ([f"/{lang}/a", f"/{lang}/b"], [f"/{lang}/x", f"/{lang}/y"]) for lang in ("fr", "en", "es")}
+        finished = []
+        
+        started = time.perf_counter()
+        results = MultiLanguagePipeline(mapper, on_language_done=lambda lang, result: finished.append(lang)).run(jobs)
+        elapsed = time.perf_counter() - started
+        
+        assert elapsed < 0.8
+        assert len(mapper.limiters) == 1
+        assert list(results) == ["fr", "en", "es"]
+        assert sorted(finished) == ["en", "es", "fr"]
+        assert all(len(result.correspondances) == 2 for result in results.values())
+    
+    def test_progress_and_failed_language(self):
+        """Test avancement par langue ; une langue en échec passe en abandonnées"""
+        updates = []
+        pipeline = MultiLanguagePipeline(
+            FakeMapper(delay=0.01),
+            on_progress=lambda progress: updates.append((progress.langue, progress.status, progress.received))
+        )
+        
+        results = pipeline.run({"fr": (["/fr/a"], ["/fr/x"]), "de": (["/de/a"], ["/de/x"])})
+        
+        assert results["de"].abandonnees == ["/de/a"]
+        assert results["de"].non_matchees == []
+        assert pipeline.progress["de"].status == "échec"
+        assert "API indisponible" in pipeline.progress["de"].error
+        assert pipeline.progress["fr"].status == "terminé"
+        assert pipeline.progress["fr"].fraction == 1.0
+        assert ("fr", "en cours", 1) in updates
+    
+    def test_pipeline_against_mock_server(self):
+        """Test bout en bout : deux langues, lots partagés, résultats identiques au mode séquentiel"""
+        jobs = {
+            lang: ([f"/{lang}/chalet-{i}.html" for i in range(6)],
+                   [f"/{lang}/hebergements/chalet-{i}/" for i in range(6)])
+            for lang in ("fr", "en")
+        }
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0.01)) as server:
+            mapper = AIMapper(
+                "mock", chunk_size=2, local_prematch=False,
+                client=OpenAI(api_key="mock", base_url=server.base_url, max_retries=0),
+                async_client=AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            )
+            results = MultiLanguagePipeline(mapper, max_concurrency=3).run(jobs)
+            sequential = {lang: mapper.match_urls(old, new, langue=lang) for lang, (old, new) in jobs.items()}
+        
+        assert results == sequential
+        assert all(len(result.correspondances) == 6 for result in results.values())
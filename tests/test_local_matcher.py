@@ -0,0 +1,97 @@
+"""
+Tests pour le pré-matching local déterministe
+Les paires évidentes ne doivent jamais partir vers l'IA
+"""
+
+import pytest
+from src.local_matcher import LocalPreMatcher, batch_edit_similarity
+
+
+class TestLocalPreMatcher:
+    """Tests pour la résolution locale des paires évidentes"""
+    
+    def setup_method(self):
+        """Setup pour chaque test"""
+        self.matcher = LocalPreMatcher()
+    
+    def test_batch_edit_similarity(self):
+        """Test distance d'édition vectorisée"""
+        scores = batch_edit_similarity("piscine", ["piscine", "piscines", "spa", ""])
+        
+        assert scores[0] == pytest.approx(1.0)
+        assert scores[1] == pytest.approx(1 - 1 / 8)
+        assert scores[2] < 0.3
+        assert scores[3] == pytest.approx(0.0)
+    
+    def test_normalize_removes_accents_stop_words_and_extensions(self):
+        """Test normalisation des chemins"""
+        full, last = self.matcher.normalize("https://old.com/fr/Les-Activités/la-piscine.html")
+        
+        assert full == ("fr", "activites", "piscine")
+        assert last == ("piscine",)
+    
+    def test_exact_and_renamed_section_matches(self):
+        """Test chemin identique et slug identique sous section renommée"""
+        old_urls = [
+            "https://old.com/fr/contact",
+            "https://old.com/fr/nos-prestations/location-velos",
+            "https://old.com/fr/blog/article-mystere"
+        ]
+        new_urls = [
+            "https://new.com/fr/contact/",
+            "https://new.com/fr/services/location-de-velos",
+            "https://new.com/fr/actualites"
+        ]
+        
+        matches, remaining = self.matcher.match(old_urls, new_urls)
+        by_old = {m["ancienne"]: m for m in matches}
+        
+        assert by_old["https://old.com/fr/contact"]["nouvelle"] == "https://new.com/fr/contact/"
+        assert by_old["https://old.com/fr/contact"]["confidence"] == 1.0
+        assert by_old["https://old.com/fr/nos-prestations/location-velos"]["nouvelle"] == \
+            "https://new.com/fr/services/location-de-velos"
+        assert all(m["methode"] == "local" and m["raison"] for m in matches)
+        assert remaining == ["https://old.com/fr/blog/article-mystere"]
+    
+    def test_generic_slug_needs_section_evidence(self):
+        """Test slug générique : accepté si les sections se recoupent, sinon laissé à l'IA"""
+        old_urls = ["/fr/produits/details", "/fr/blog/page-2", "/fr/boutique/velos/index"]
+        new_urls = ["/fr/equipe/details", "/fr/agenda/page-2", "/fr/magasin/velos/index"]
+        
+        matches, remaining = self.matcher.match(old_urls, new_urls)
+        
+        assert [(m["ancienne"], m["nouvelle"]) for m in matches] == [
+            ("/fr/boutique/velos/index", "/fr/magasin/velos/index")
+        ]
+        assert remaining == ["/fr/produits/details", "/fr/blog/page-2"]
+    
+    def test_typo_slug_matched_by_edit_distance(self):
+        """Test slug presque identique (faute de frappe)"""
+        matches, remaining = self.matcher.match(
+            ["/hebergement/mobilhome-prestige-grand-confort"],
+            ["/locations/mobilhome-prestige-grand-comfort", "/locations/chalet-bois"]
+        )
+        
+        assert len(matches) == 1
+        assert matches[0]["nouvelle"] == "/locations/mobilhome-prestige-grand-comfort"
+        assert remaining == []
+    
+    def test_different_numbers_are_left_to_ai(self):
+        """Test slugs proches mais numéros différents : jamais résolus localement"""
+        matches, remaining = self.matcher.match(
+            ["/fr/locations/mobil-home-4-places", "/fr/blog/page-12"],
+            ["/fr/hebergements/mobil-home-6-places", "/fr/blog/page-13"]
+        )
+        
+        assert matches == []
+        assert remaining == ["/fr/locations/mobil-home-4-places", "/fr/blog/page-12"]
+    
+    def test_ambiguous_candidates_are_left_to_ai(self):
+        """Test qu'un slug présent plusieurs fois n'est pas résolu localement"""
+        matches, remaining = self.matcher.match(
+            ["/old/tarifs"],
+            ["/camping/tarifs", "/gites/tarifs"]
+        )
+        
+        assert matches == []
+        assert remaining == ["/old/tarifs"]
@@ -0,0 +1,142 @@
+"""
+Tests pour le serveur OpenAI simulé (matching de bout en bout sans coût API)
+"""
+
+import asyncio
+import time
+
+import pytest
+from openai import OpenAI, AsyncOpenAI
+
+from src.ai_mapper import AIMapper
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig
+
+
+OLD_URLS = ["/fr/chalet-bois.html", "/fr/contact-nous", "/fr/piscine-chauffee"]
+NEW_URLS = ["/fr/hebergements/chalet-bois/", "/fr/contact/", "/fr/espace-aquatique/piscine-chauffee/"]
+
+
+def make_mapper(server, **kwargs):
+    """Mapper branché sur le serveur simulé (sans retry côté client OpenAI)"""
+    client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+    async_client = AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+    return AIMapper("mock", client=client, async_client=async_client, local_prematch=False, **kwargs)
+
+
+class TestMockOpenAIServer:
+    
+    @pytest.mark.parametrize("compact_protocol,stream", [(False, False), (True, False), (False, True)])
+    def test_end_to_end_matching(self, compact_protocol, stream):
+        """Test matching complet via HTTP (JSON, protocole compact, streaming)"""
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            mapper = make_mapper(server, compact_protocol=compact_protocol, stream=stream)
+            result = mapper.match_urls(OLD_URLS, NEW_URLS)
+            stats = server.get_statistics()
+        
+        assert {m["ancienne"]: m["nouvelle"] for m in result.correspondances} == dict(zip(OLD_URLS, NEW_URLS))
+        assert stats["requests"] == 1
+        assert stats["streamed"] == (1 if stream else 0)
+        # Usage renvoyé par le serveur : l'estimateur est calibré
+        assert mapper.token_estimator.get_statistics()["calibrations"] == 1
+    
+    def test_truncated_responses_are_salvaged(self):
+        """Test troncature injectée : récupération partielle puis relance des URLs manquantes"""
+        old_urls = [f"/fr/page-{i}" for i in range(10)]
+        new_urls = [f"/fr/nouvelle-page-{i}/" for i in range(10)]
+        config = MockServerConfig(latency_seconds=0, truncate_rate=1.0)
+        
+        with MockOpenAIServer(config) as server:
+            mapper = make_mapper(server)
+            result = mapper.match_urls(old_urls, new_urls)
+            stats = server.get_statistics()
+        
+        assert stats["truncated"] == stats["requests"] > 1
+        assert len(result.correspondances) + len(result.non_matchees) + len(result.abandonnees) == len(old_urls)
+        assert len(result.correspondances) >= 5
+        assert mapper.get_statistics()["salvaged_responses"] >= 1
+        assert mapper.get_statistics()["requeried_urls"] >= 1
+    
+    def test_injected_errors_are_retried(self, monkeypatch):
+        """Test 429/5xx injectés : AIMapper relance et termine le matching"""
+        monkeypatch.setattr("src.ai_mapper.time.sleep", lambda seconds: None)
+        config = MockServerConfig(latency_seconds=0, rate_limit_rate=0.3, error_rate=0.3, seed=1)
+        
+        with MockOpenAIServer(config) as server:
+            mapper = make_mapper(server, max_retries=10)
+            result = mapper.match_urls(OLD_URLS, NEW_URLS)
+            stats = server.get_statistics()
+        
+        assert stats["rate_limited"] + stats["server_errors"] >= 1
+        assert len(result.correspondances) == 3
+    
+    @pytest.mark.parametrize("compact_protocol,stream", [(False, False), (True, False), (False, True)])
+    def test_async_matching_matches_sync_path(self, compact_protocol, stream):
+        """Test match_urls_async : même résultat que match_urls, lots concurrents"""
+        old_urls = [f"/fr/hebergements/chalet-{i}.html" for i in range(12)] + ["/zzz"]
+        new_urls = [f"/fr/nos-hebergements/chalet-{i}/" for i in range(12)] + ["/blog/"]
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0.01)) as server:
+            mapper = make_mapper(server, chunk_size=4, compact_protocol=compact_protocol, stream=stream)
+            sync_result = mapper.match_urls(old_urls, new_urls)
+            
+            streamed = []
+            async_result = asyncio.run(mapper.match_urls_async(old_urls, new_urls, on_match=streamed.append))
+            stats = server.get_statistics()
+        
+        assert async_result == sync_result
+        assert len(streamed) == len(async_result.correspondances) == 12
+        assert async_result.non_matchees == ["/zzz"]
+        assert stats["requests"] == 8
+    
+    def test_async_matching_is_cancellable(self):
+        """Test annulation : les lots en vol sont abandonnés sans attendre le serveur"""
+        old_urls = [f"/fr/page-{i}" for i in range(8)]
+        new_urls = [f"/fr/nouvelle-page-{i}/" for i in range(8)]
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=2.0)) as server:
+            mapper = make_mapper(server, chunk_size=2)
+            
+            async def cancelled_run():
+                task = asyncio.ensure_future(mapper.match_urls_async(old_urls, new_urls))
+                await asyncio.sleep(0.2)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+            
+            started = time.perf_counter()
+            asyncio.run(cancelled_run())
+            elapsed = time.perf_counter() - started
+        
+        assert elapsed < 1.5
+    
+    def test_async_shared_concurrency_limiter(self):
+        """Test sémaphore partagé : deux matchings concurrents limités à un lot en vol"""
+        old_urls = [f"/fr/chalet-{i}.html" for i in range(4)]
+        new_urls = [f"/fr/chalets/chalet-{i}/" for i in range(4)]
+        in_flight = {"current": 0, "max": 0}
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0.05)) as server:
+            mapper = make_mapper(server, chunk_size=1)
+            
+            async def run_both():
+                limiter = asyncio.Semaphore(1)
+                original = mapper._match_chunk_async
+                
+                async def counted(*args, **kwargs):
+                    in_flight["current"] += 1
+                    in_flight["max"] = max(in_flight["max"], in_flight["current"])
+                    try:
+                        return await original(*args, **kwargs)
+                    finally:
+                        in_flight["current"] -= 1
+                
+                mapper._match_chunk_async = counted
+                return await asyncio.gather(
+                    mapper.match_urls_async(old_urls, new_urls, concurrency_limiter=limiter),
+                    mapper.match_urls_async(old_urls, new_urls, langue="en", concurrency_limiter=limiter)
+                )
+            
+            results = asyncio.run(run_both())
+        
+        assert in_flight["max"] == 1
+        assert all(len(result.correspondances) == 4 for result in results)
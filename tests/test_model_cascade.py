@@ -0,0 +1,113 @@
+"""
+Tests pour la cascade de modèles par niveau de confidence
+"""
+
+import json
+
+from src.model_cascade import ModelCascade
+from src.language_pipeline import MultiLanguagePipeline
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig, deterministic_responder
+from src.usage_ledger import UsageLedger
+
+
+OBVIOUS = [f"/fr/contact-{name}/" for name in ("paris", "lyon", "nantes")]
+OLD_URLS = OBVIOUS + [f"/fr/chalet-{i}.html" for i in range(4)] + ["/fr/ambigu-chalet-9.html"]
+NEW_URLS = OBVIOUS + [f"/fr/hebergements/chalet-{i}/" for i in range(10)]
+
+
+def tiered_responder(request):
+    """Modèle rapide peu sûr de lui sur les URLs 'ambigu', modèle fort confiant"""
+    data = json.loads(deterministic_responder(request))
+    for match in data["correspondances"]:
+        if request["model"].startswith("gpt-4o-mini"):
+            match["confidence"] = 0.72 if "ambigu" in match["ancienne"] else 0.9
+        else:
+            match["confidence"] = 0.95
+    return json.dumps(data)
+
+
+def make_cascade(server, ledger, **kwargs):
+    """Cascade branchée sur le serveur simulé"""
+    return ModelCascade.from_models(
+        "mock", base_url=server.base_url, local_prematch=False,
+        usage_ledger=ledger, project="p", max_retries=1, **kwargs
+    )
+
+
+class TestModelCascade:
+    
+    def test_only_uncertain_pairs_reach_the_strong_model(self, tmp_path):
+        """Test cascade : local, puis modèle rapide, puis modèle fort pour la seule paire incertaine"""
+        ledger = UsageLedger(tmp_path)
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), responder=tiered_responder) as server:
+            cascade = make_cascade(server, ledger)
+            result = cascade.match_urls(OLD_URLS, NEW_URLS)
+        
+        assert [match["ancienne"] for match in result.correspondances] == OLD_URLS
+        by_url = {match["ancienne"]: match for match in result.correspondances}
+        assert by_url["/fr/ambigu-chalet-9.html"]["nouvelle"] == "/fr/hebergements/chalet-9/"
+        assert by_url["/fr/ambigu-chalet-9.html"]["confidence"] == 0.95
+        assert by_url["/fr/chalet-1.html"]["confidence"] == 0.9
+        
+        tiers = {tier["tier"]: tier for tier in cascade.get_statistics()["tiers"]}
+        assert tiers["local"]["accepted"] == len(OBVIOUS)
+        assert tiers["rapide"] == {**tiers["rapide"], "urls": 5, "accepted": 4, "escalated": 1}
+        assert tiers["renfort"] == {**tiers["renfort"], "urls": 1, "accepted": 1, "escalated": 0}
+        
+        # Dépense et temps par palier dans le journal ; le modèle fort n'a vu qu'une URL
+        usage = {tier["tier"]: tier for tier in ledger.summary("p")["by_tier"]}
+        assert usage["rapide"]["urls"] == 5
+        assert usage["renfort"]["urls"] == 1
+        assert usage["renfort"]["cost_usd"] > 0
+        assert all(entry["model"] == "gpt-4o" for entry in ledger.entries("p") if entry["tier"] == "renfort")
+    
+    def test_abandoned_urls_keep_their_own_status(self, tmp_path):
+        """Test abandons : escaladés, proposition conservée, sinon abandonnées et non « non matchées »"""
+        broken = "/fr/casse-chalet-8.html"
+        
+        def broken_responder(request):
+            old_block = request["messages"][-1]["content"].split("ANCIENNES URLS")[1]
+            strong = not request["model"].startswith("gpt-4o-mini")
+            if broken in old_block or (strong and "ambigu" in old_block):
+                return "Réponse invalide"
+            return tiered_responder(request)
+        
+        ledger = UsageLedger(tmp_path)
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), responder=broken_responder) as server:
+            cascade = make_cascade(server, ledger)
+            result = cascade.match_urls(OLD_URLS + [broken], NEW_URLS)
+        
+        # Le modèle fort abandonne l'URL ambiguë : la proposition du modèle rapide est gardée
+        by_url = {match["ancienne"]: match for match in result.correspondances}
+        assert by_url["/fr/ambigu-chalet-9.html"]["confidence"] == 0.72
+        assert result.abandonnees == [broken]
+        assert result.non_matchees == []
+    
+    def test_thresholds_are_configurable(self, tmp_path):
+        """Test seuils : sans scorer local et avec une bande basse, rien n'est escaladé"""
+        ledger = UsageLedger(tmp_path)
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), responder=tiered_responder) as server:
+            cascade = make_cascade(server, ledger, local_accept=None, escalate_below=0.7)
+            result = cascade.match_urls(OLD_URLS, NEW_URLS)
+        
+        assert len(result.correspondances) == len(OLD_URLS)
+        assert [tier["tier"] for tier in cascade.get_statistics()["tiers"]] == ["rapide", "renfort"]
+        assert {entry["tier"] for entry in ledger.entries("p")} == {"rapide"}
+    
+    def test_cascade_runs_in_language_pipeline(self, tmp_path):
+        """Test pipeline multilangue : la cascade remplace AIMapper (mode asynchrone)"""
+        ledger = UsageLedger(tmp_path)
+        jobs = {
+            lang: ([url.replace("/fr/", f"/{lang}/") for url in OLD_URLS],
+                   [url.replace("/fr/", f"/{lang}/") for url in NEW_URLS])
+            for lang in ("fr", "en")
+        }
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), responder=tiered_responder) as server:
+            cascade = make_cascade(server, ledger)
+            results = MultiLanguagePipeline(cascade).run(jobs)
+        
+        for lang, (old_urls, new_urls) in jobs.items():
+            assert len(results[lang].correspondances) == len(old_urls)
+        tiers = {tier["tier"]: tier for tier in cascade.get_statistics()["tiers"]}
+        assert tiers["renfort"]["urls"] == 2
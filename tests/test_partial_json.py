@@ -0,0 +1,48 @@
+"""
+Tests pour la lecture tolérante des réponses JSON
+"""
+
+import pytest
+
+from src.partial_json import PartialJSONScanner, salvage_json
+
+
+class TestPartialJSON:
+    
+    def test_truncated_response_keeps_complete_elements(self):
+        """Test réponse tronquée : les correspondances terminées sont conservées"""
+        text = ('```json\n{"correspondances": ['
+                '{"ancienne": "/a", "nouvelle": "/x", "confidence": 0.9, "raison": "Accolade } dans \\" texte"}, '
+                '{"ancienne": "/b", "nouv')
+        
+        data = salvage_json(text)
+        
+        assert data == {"correspondances": [
+            {"ancienne": "/a", "nouvelle": "/x", "confidence": 0.9, "raison": 'Accolade } dans " texte'}
+        ]}
+    
+    def test_malformed_element_is_skipped(self):
+        """Test élément invalide ignoré sans perdre les suivants"""
+        scanner = PartialJSONScanner()
+        elements = scanner.feed('{"m": [[0, 1, 85], [2, 0,], [3, 4, 90]], "u": [5, 6]}')
+        
+        assert elements == [("m", [0, 1, 85]), ("m", [3, 4, 90]), ("u", 5), ("u", 6)]
+        assert scanner.malformed_elements == 1
+        assert scanner.closed
+    
+    def test_incremental_feed_matches_full_parse(self):
+        """Test lecture caractère par caractère identique à la lecture d'un bloc"""
+        text = '{"correspondances": [{"ancienne": "/a", "nouvelle": "/x"}], "non_matchees": ["/b"]}'
+        scanner = PartialJSONScanner()
+        
+        elements = []
+        for char in text:
+            elements.extend(scanner.feed(char))
+        
+        assert elements == PartialJSONScanner().feed(text)
+        assert elements[-1] == ("non_matchees", "/b")
+    
+    def test_non_json_returns_empty(self):
+        """Test réponse sans JSON exploitable"""
+        assert salvage_json("Désolé, je ne peux pas répondre.") == {}
+        assert salvage_json(None) == {}
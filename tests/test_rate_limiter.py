@@ -0,0 +1,107 @@
+"""
+Tests pour le limiteur de débit RPM/TPM (token bucket)
+Horloge simulée : aucun sleep réel
+"""
+
+import asyncio
+
+import pytest
+from src.rate_limiter import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Horloge simulée avancée par les appels à sleep()"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimiter:
+    """Tests pour le token bucket double RPM/TPM"""
+    
+    def setup_method(self):
+        """Setup pour chaque test"""
+        self.clock = FakeClock()
+    
+    def test_token_bucket_refills_over_time(self):
+        """Test recharge continue du seau"""
+        bucket = TokenBucket(60, clock=self.clock)
+        bucket.level = 0
+        
+        self.clock.now = 10.0
+        bucket.refill()
+        
+        assert bucket.level == pytest.approx(10.0)
+        assert bucket.wait_time(15) == pytest.approx(5.0)
+    
+    def test_requests_per_minute_limit(self):
+        """Test attente quand la limite RPM est atteinte"""
+        limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=100000,
+                              clock=self.clock, sleep=self.clock.sleep)
+        
+        assert limiter.acquire(10) == 0.0
+        assert limiter.acquire(10) == 0.0
+        
+        # Troisième requête : attendre 30s (2 requêtes/minute)
+        waited = limiter.acquire(10)
+        assert waited == pytest.approx(30.0)
+        assert limiter.get_statistics()['acquired_requests'] == 3
+    
+    def test_acquire_async_waits_without_blocking(self, monkeypatch):
+        """Test attente asynchrone quand la limite RPM est atteinte"""
+        async def fake_sleep(seconds):
+            self.clock.sleep(seconds)
+        
+        monkeypatch.setattr("src.rate_limiter.asyncio.sleep", fake_sleep)
+        limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=100000,
+                              clock=self.clock, sleep=self.clock.sleep)
+        
+        async def acquire_three():
+            return [await limiter.acquire_async(10) for _ in range(3)]
+        
+        waits = asyncio.run(acquire_three())
+        
+        assert waits[:2] == [0.0, 0.0]
+        assert waits[2] == pytest.approx(30.0)
+        assert limiter.get_statistics()['total_wait_seconds'] == pytest.approx(30.0)
+    
+    def test_tokens_per_minute_limit(self):
+        """Test attente quand la limite TPM est atteinte"""
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=6000,
+                              clock=self.clock, sleep=self.clock.sleep)
+        
+        limiter.acquire(6000)
+        waited = limiter.acquire(1000)
+        
+        # 6000 tokens/minute = 100 tokens/seconde
+        assert waited == pytest.approx(10.0)
+    
+    def test_usage_feedback_corrects_reservation(self):
+        """Test correction de la réservation avec response.usage"""
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=6000,
+                              clock=self.clock, sleep=self.clock.sleep)
+        
+        limiter.acquire(6000)
+        # L'appel n'a consommé que 1000 tokens : 5000 sont rendus
+        limiter.record_usage(6000, 1000)
+        
+        assert limiter.acquire(5000) == 0.0
+        
+        # Une consommation sous-estimée crée une dette
+        limiter.record_usage(100, 1100)
+        assert limiter.try_acquire(100) > 0
+    
+    def test_record_usage_ignores_missing_usage(self):
+        """Test qu'une réponse sans usage ne modifie pas le seau"""
+        limiter = RateLimiter(clock=self.clock, sleep=self.clock.sleep)
+        level = limiter.tokens.level
+        
+        limiter.record_usage(500, None)
+        
+        assert limiter.tokens.level == level
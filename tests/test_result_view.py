@@ -0,0 +1,162 @@
+"""
+Tests pour le cache des résultats bruts et la vue au seuil de confiance
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from openai import OpenAI
+
+from advanced_interface import apply_result_view
+from ai_mapper import AIMapper, MatchResult
+from cache_manager import CacheManager
+from hreflang_clusters import TranslationClusters, propagate_matches
+from mock_openai_server import MockOpenAIServer, MockServerConfig, deterministic_responder
+
+
+RAW_MATCHES = [
+    {"ancienne": "/fr/a", "nouvelle": "/fr/cible", "confidence": 0.95, "raison": "Exact"},
+    {"ancienne": "/fr/b", "nouvelle": "/fr/cible", "confidence": 0.8, "raison": "Proche"},
+    {"ancienne": "/fr/c", "nouvelle": "/fr/autre", "confidence": 0.55, "raison": "Faible"}
+]
+RAW_UNMATCHED = ["/fr/d"]
+
+
+class TestResultView:
+    
+    def test_filter_confidence_keeps_raw_result(self):
+        """Test vue au seuil : les URLs écartées passent en non matchées, le brut est intact"""
+        raw = MatchResult(correspondances=list(RAW_MATCHES), non_matchees=list(RAW_UNMATCHED))
+        
+        view = raw.filter_confidence(0.7)
+        
+        assert [match["ancienne"] for match in view.correspondances] == ["/fr/a", "/fr/b"]
+        assert view.non_matchees == ["/fr/d", "/fr/c"]
+        assert len(raw.correspondances) == 3
+    
+    def test_threshold_change_reads_raw_cache_without_requery(self, tmp_path):
+        """Test cache brut : baisser le seuil retrouve les paires écartées, sans nouvel appel"""
+        cache_manager = CacheManager(str(tmp_path))
+        old_urls = ["/fr/a", "/fr/b", "/fr/c", "/fr/d"]
+        new_urls = ["/fr/cible", "/fr/autre"]
+        cache_manager.save_gpt_cache(old_urls, new_urls, "", 0.1, {
+            "all_matches": RAW_MATCHES, "all_unmatched": RAW_UNMATCHED,
+            "missing_langs": [], "old_grouped": {"fr": old_urls}, "raw": True
+        })
+        
+        cached = cache_manager.get_gpt_cache(old_urls, new_urls, "", 0.1)["results"]
+        strict, strict_unmatched = apply_result_view(cached["all_matches"], cached["all_unmatched"], 0.9)
+        lenient, lenient_unmatched = apply_result_view(cached["all_matches"], cached["all_unmatched"], 0.5)
+        
+        assert len(strict) == 1 and sorted(strict_unmatched) == ["/fr/b", "/fr/c", "/fr/d"]
+        assert len(lenient) == 3 and lenient_unmatched == ["/fr/d"]
+    
+    def test_low_confidence_model_match_survives_to_the_cache(self, tmp_path):
+        """Test de bout en bout : une paire à 0.62 du modèle est cachée puis visible sous 0.7"""
+        old_urls = ["/fr/contact", "/fr/vieux-plan-acces"]
+        new_urls = ["/fr/contact/", "/fr/nous-trouver/"]
+        
+        def responder(request):
+            data = json.loads(deterministic_responder(request))
+            data["correspondances"] = [
+                {"ancienne": "/fr/contact", "nouvelle": "/fr/contact/", "confidence": 0.95, "raison": "Exact"},
+                {"ancienne": "/fr/vieux-plan-acces", "nouvelle": "/fr/nous-trouver/", "confidence": 0.62,
+                 "raison": "Plan d'accès"}
+            ]
+            data["non_matchees"] = []
+            return json.dumps(data)
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), responder=responder) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            mapper = AIMapper("mock", client=client, local_prematch=False)
+            system_prompt = mapper._get_system_prompt("")
+            result = mapper.match_urls(old_urls, new_urls)
+        
+        # Le prompt ne demande plus au modèle d'écarter les paires sous 0.7
+        assert "< 0.7" not in system_prompt
+        assert "même faible" in system_prompt
+        
+        cache_manager = CacheManager(str(tmp_path))
+        cache_manager.save_gpt_cache(old_urls, new_urls, "", 0.1, {
+            "all_matches": result.correspondances, "all_unmatched": result.non_matchees,
+            "missing_langs": [], "old_grouped": {"fr": old_urls}, "raw": True
+        })
+        cached = cache_manager.get_gpt_cache(old_urls, new_urls, "", 0.1)["results"]
+        
+        strict, strict_unmatched = apply_result_view(cached["all_matches"], cached["all_unmatched"], 0.7)
+        lenient, _ = apply_result_view(cached["all_matches"], cached["all_unmatched"], 0.6)
+        
+        assert [match["ancienne"] for match in strict] == ["/fr/contact"]
+        assert strict_unmatched == ["/fr/vieux-plan-acces"]
+        assert {match["ancienne"] for match in lenient} == set(old_urls)
+    
+    def test_hreflang_translations_follow_their_pivot_at_any_threshold(self):
+        """Test propagation brute : la traduction est retenue ou écartée avec sa paire pivot"""
+        old_clusters = TranslationClusters.from_alternates({
+            "/fr/tarifs": {"fr": "/fr/tarifs", "en": "/en/prices"},
+            "/fr/acces": {"fr": "/fr/acces", "en": "/en/access"}
+        })
+        new_clusters = TranslationClusters.from_alternates({
+            "/fr/nos-tarifs": {"fr": "/fr/nos-tarifs", "en": "/en/our-prices"},
+            "/fr/venir": {"fr": "/fr/venir", "en": "/en/getting-here"}
+        })
+        raw_pivot = [
+            {"ancienne": "/fr/tarifs", "nouvelle": "/fr/nos-tarifs", "confidence": 0.95, "raison": "Tarifs"},
+            {"ancienne": "/fr/acces", "nouvelle": "/fr/venir", "confidence": 0.6, "raison": "Accès"}
+        ]
+        
+        derived, remaining = propagate_matches(raw_pivot, old_clusters, new_clusters, "en",
+                                               ["/en/prices", "/en/access"],
+                                               ["/en/our-prices", "/en/getting-here"])
+        assert remaining == []
+        
+        for threshold, expected in ((0.7, {"/fr/tarifs", "/en/prices"}),
+                                    (0.5, {"/fr/tarifs", "/en/prices", "/fr/acces", "/en/access"})):
+            matches, unmatched = apply_result_view(raw_pivot + derived, [], threshold)
+            assert {match["ancienne"] for match in matches} == expected
+            assert set(unmatched) == {"/fr/tarifs", "/en/prices", "/fr/acces", "/en/access"} - expected
+    
+    def test_fan_in_is_applied_after_threshold(self):
+        """Test fan-in : appliqué aux seules correspondances au seuil"""
+        matches, unmatched = apply_result_view(RAW_MATCHES, RAW_UNMATCHED, 0.5, max_fan_in=1)
+        
+        assert {match["ancienne"] for match in matches} == {"/fr/a", "/fr/c"}
+        assert sorted(unmatched) == ["/fr/b", "/fr/d"]
+    
+    def test_fan_in_moves_url_to_its_model_alternative(self):
+        """Test fan-in : une URL à la cible saturée passe sur l'alternative du modèle"""
+        old_urls = ["/fr/a", "/fr/b"]
+        new_urls = ["/fr/cible/", "/fr/autre/"]
+        
+        def responder(request):
+            data = json.loads(deterministic_responder(request))
+            data["correspondances"] = [
+                {"ancienne": "/fr/a", "nouvelle": "/fr/cible/", "confidence": 0.95, "raison": "Exact"},
+                {"ancienne": "/fr/b", "nouvelle": "/fr/cible/", "confidence": 0.9, "raison": "Proche",
+                 "alternatives": [{"nouvelle": "/fr/inventee/", "confidence": 0.85},
+                                  {"nouvelle": "/fr/autre/", "confidence": 0.8}]}
+            ]
+            data["non_matchees"] = []
+            return json.dumps(data)
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), responder=responder) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            mapper = AIMapper("mock", client=client, local_prematch=False)
+            result = mapper.match_urls(old_urls, new_urls)
+        
+        # Alternative inventée écartée sans relance
+        assert result.correspondances[1]["alternatives"] == [{"nouvelle": "/fr/autre/", "confidence": 0.8}]
+        
+        matches, unmatched = apply_result_view(result.correspondances, result.non_matchees, 0.7, max_fan_in=1)
+        assert {match["ancienne"]: match["nouvelle"] for match in matches} == {
+            "/fr/a": "/fr/cible/", "/fr/b": "/fr/autre/"
+        }
+        assert unmatched == []
+        assert all("alternatives" not in match for match in matches)
+        
+        # Alternative sous le seuil : l'URL reste écartée
+        matches, unmatched = apply_result_view(result.correspondances, result.non_matchees, 0.85, max_fan_in=1)
+        assert unmatched == ["/fr/b"]
@@ -217,8 +217,8 @@ class TestParseSitemap:
 </urlset>'''
         mock_response = Mock()
         mock_response.status_code = 200
-        # parse_sitemap utilise response.content, pas response.text
-        mock_response.content = xml_content.encode('utf-8')
+        # parse_sitemap lit le flux via response.iter_content (streaming)
+        mock_response.iter_content.return_value = [xml_content.encode('utf-8')]
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
         
@@ -250,7 +250,7 @@ class TestParseSitemap:
 </urlset>'''
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.content = xml_content.encode('utf-8')
+        mock_response.iter_content.return_value = [xml_content.encode('utf-8')]
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
         
@@ -289,7 +289,7 @@ class TestParseSitemap:
 </urlset>'''
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.content = xml_content.encode('utf-8')
+        mock_response.iter_content.return_value = [xml_content.encode('utf-8')]
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
         
@@ -308,6 +308,212 @@ class TestParseSitemap:
         for url in urls:
             assert url.startswith("https://")
             assert "ancien-site.com" in url
+    
+    @patch('src.scraper.requests.get')
+    def test_parse_sitemap_gzip_compressed(self, mock_get):
+        """Test décompression transparente d'un sitemap .xml.gz"""
+        import gzip
+        
+        xml_content = '''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url><loc>https://ancien-site.com/page1</loc></url>
+    <url><loc>https://ancien-site.com/page2</loc></url>
+</urlset>'''
+        compressed = gzip.compress(xml_content.encode('utf-8'))
+        
+        mock_response = Mock()
+        mock_response.status_code = 200
+        # Flux découpé en petits blocs pour simuler le streaming
+        mock_response.iter_content.return_value = [
+            compressed[i:i + 16] for i in range(0, len(compressed), 16)
+        ]
+        mock_response.raise_for_status.return_value = None
+        mock_get.return_value = mock_response
+        
+        urls = parse_sitemap("https://ancien-site.com/sitemap.xml.gz")
+        
+        assert urls == ["https://ancien-site.com/page1", "https://ancien-site.com/page2"]
+        # Le téléchargement doit être fait en streaming
+        assert mock_get.call_args.kwargs.get('stream') is True
+        mock_response.close.assert_called()
+
+
+class TestSitemapParser:
+    """Tests pour le parser de sitemaps en streaming"""
+    
+    def test_iter_entries_clears_processed_elements(self):
+        """Test que les éléments traités sont libérés au fil du parsing"""
+        from lxml import etree
+        from src.scraper import SitemapParser
+        
+        # Parser qui garde une référence à la racine de l'arbre construit
+        roots = []
+        
+        class RecordingParser(etree.XMLPullParser):
+            def read_events(self):
+                for event, elem in super().read_events():
+                    if not roots:
+                        roots.append(elem)
+                    yield event, elem
+        
+        count = 5000
+        entries = ''.join(
+            f'<url><loc>https://site.com/page-{i}</loc></url>' for i in range(count)
+        )
+        xml_content = (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'{entries}</urlset>'
+        ).encode('utf-8')
+        chunks = [xml_content[i:i + 1024] for i in range(0, len(xml_content), 1024)]
+        
+        parser = SitemapParser()
+        locs = []
+        max_children = 0
+        with patch('src.scraper.etree.XMLPullParser', RecordingParser):
+            for _, record in parser.iter_entries(chunks):
+                locs.append(record.loc)
+                max_children = max(max_children, len(roots[0]))
+        
+        assert len(locs) == count
+        assert locs[0] == "https://site.com/page-0"
+        assert locs[-1] == f"https://site.com/page-{count - 1}"
+        
+        # Mémoire bornée : la racine ne garde au plus que les <url> d'un bloc
+        # (construits avant d'être consommés), jamais tout le document
+        entries_per_chunk = 1024 // len('<url><loc>https://site.com/page-0</loc></url>') + 2
+        assert max_children <= entries_per_chunk
+        remaining = list(roots[0])
+        assert len(remaining) <= 1
+        assert all(len(elem) == 0 and elem.text is None for elem in remaining)
+    
+    def test_iter_bytes_passthrough_plain_xml(self):
+        """Test qu'un XML non compressé est transmis tel quel"""
+        from src.scraper import SitemapParser
+        
+        mock_response = Mock()
+        mock_response.iter_content.return_value = [b'<urlset>', b'', b'</urlset>']
+        
+        parser = SitemapParser()
+        assert b''.join(parser.iter_bytes(mock_response)) == b'<urlset></urlset>'
+    
+    def test_iter_entries_classifies_by_root_element(self):
+        """Test que seuls les <sitemap><loc> d'un index sont des sous-sitemaps"""
+        from src.scraper import SitemapParser
+        
+        index_xml = b'''<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <sitemap><loc>https://site.com/page-sitemap.xml</loc></sitemap>
+    <sitemap><loc>https://site.com/post-sitemap.xml</loc></sitemap>
+</sitemapindex>'''
+        urlset_xml = b'''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+    <url>
+        <loc>https://site.com/plan-du-site-sitemap</loc>
+        <image:image><image:loc>https://site.com/photo.jpg</image:loc></image:image>
+    </url>
+</urlset>'''
+        
+        parser = SitemapParser()
+        
+        index_entries = [(kind, record.loc) for kind, record in parser.iter_entries([index_xml])]
+        urlset_entries = [(kind, record.loc) for kind, record in parser.iter_entries([urlset_xml])]
+        
+        assert index_entries == [
+            ('sitemap', 'https://site.com/page-sitemap.xml'),
+            ('sitemap', 'https://site.com/post-sitemap.xml')
+        ]
+        assert urlset_entries == [
+            ('url', 'https://site.com/plan-du-site-sitemap')
+        ]
+        
+        stats = parser.get_statistics()
+        assert stats['sitemap_indexes'] == 1
+        assert stats['urlsets'] == 1
+    
+    @patch('src.scraper.requests.get')
+    def test_iter_urls_follows_index_and_counts_avoided_fetches(self, mock_get):
+        """Test récursion sur index et compteur de requêtes évitées"""
+        from src.scraper import SitemapParser
+        
+        documents = {
+            "https://site.com/sitemap_index.xml": b'''<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <sitemap><loc>https://site.com/page-sitemap.xml</loc></sitemap>
+    <sitemap><loc>https://site.com/sitemap_index.xml</loc></sitemap>
+</sitemapindex>''',
+            "https://site.com/page-sitemap.xml": b'''<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url><loc>https://site.com/contact</loc></url>
+    <url><loc>https://site.com/sitemap-du-site</loc></url>
+    <url><loc>https://site.com/export.xml</loc></url>
+</urlset>'''
+        }
+        
+        def fake_get(url, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            response.raise_for_status.return_value = None
+            response.iter_content.return_value = [documents[url]]
+            return response
+        
+        mock_get.side_effect = fake_get
+        
+        parser = SitemapParser()
+        urls = list(parser.iter_urls("https://site.com/sitemap_index.xml"))
+        
+        assert urls == [
+            "https://site.com/contact",
+            "https://site.com/sitemap-du-site",
+            "https://site.com/export.xml"
+        ]
+        
+        # Seuls l'index et le sous-sitemap sont téléchargés
+        assert mock_get.call_count == 2
+        stats = parser.get_statistics()
+        assert stats['documents_fetched'] == 2
+        assert stats['fetches_avoided'] == 2
+        assert stats['duplicate_sitemaps_skipped'] == 1
+    
+    def test_iter_entries_builds_structured_records(self):
+        """Test extraction de lastmod, changefreq, priority et alternates hreflang"""
+        from datetime import datetime
+        from src.scraper import SitemapParser, SitemapRecord
+        
+        xml_content = b'''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:xhtml="http://www.w3.org/1999/xhtml">
+    <url>
+        <loc>https://site.com/fr/contact</loc>
+        <lastmod>2024-03-15T10:30:00+00:00</lastmod>
+        <changefreq>Monthly</changefreq>
+        <priority>0.8</priority>
+        <xhtml:link rel="alternate" hreflang="fr" href="https://site.com/fr/contact"/>
+        <xhtml:link rel="alternate" hreflang="EN" href="https://site.com/en/contact"/>
+    </url>
+    <url>
+        <loc>https://site.com/fr/mentions</loc>
+        <lastmod>date invalide</lastmod>
+    </url>
+</urlset>'''
+        
+        parser = SitemapParser()
+        records = [record for _, record in parser.iter_entries([xml_content])]
+        
+        assert len(records) == 2
+        first, second = records
+        
+        assert isinstance(first, SitemapRecord)
+        assert first.loc == "https://site.com/fr/contact"
+        assert first.lastmod == datetime.fromisoformat("2024-03-15T10:30:00+00:00")
+        assert first.changefreq == "monthly"
+        assert first.priority == 0.8
+        assert first.get_alternates() == {
+            "fr": "https://site.com/fr/contact",
+            "en": "https://site.com/en/contact"
+        }
+        
+        assert second.lastmod is None
+        assert second.priority is None
+        assert second.alternates == ()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""
+Tests pour le matching hiérarchique par sections
+"""
+
+from openai import OpenAI
+
+from src.ai_mapper import AIMapper
+from src.section_mapper import SectionMapper, url_section
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig
+
+
+def site(section, slugs, lang="fr"):
+    """URLs d'une section"""
+    return [f"/{lang}/{section}/{slug}/" for slug in slugs]
+
+
+CHALETS = [f"chalet-{name}" for name in ("bois", "pin", "lac", "sommet", "foret", "riviere")]
+ACTIVITES = [f"{name}-guide" for name in ("randonnee", "escalade", "canyoning", "parapente")]
+
+OLD_URLS = site("logements", CHALETS) + site("loisirs", ACTIVITES) + ["/fr/contact"]
+NEW_URLS = site("hebergements", CHALETS) + site("activites", ACTIVITES) + ["/fr/contact"] + \
+    site("blog", [f"article-{i}" for i in range(20)])
+
+
+class TestSectionMapper:
+    
+    def test_url_section(self):
+        """Test section : langue et premiers segments, jamais la page"""
+        assert url_section("/fr/hebergements/chalet-bois/") == "/fr/hebergements/"
+        assert url_section("https://www.site.com/fr/hebergements/alpes/chalet.html") == "/fr/hebergements/"
+        assert url_section("/fr/hebergements/alpes/chalet.html", depth=2) == "/fr/hebergements/alpes/"
+        assert url_section("/fr/contact") == "/fr/"
+        assert url_section("/blog/article?page=2") == "/blog/"
+        assert url_section("/") == "/"
+    
+    def test_renamed_sections_are_mapped_by_page_votes(self):
+        """Test votes : sections renommées reconnues par les slugs de leurs pages"""
+        mapper = SectionMapper()
+        
+        section_map = mapper.map_sections(OLD_URLS, NEW_URLS)
+        
+        assert section_map["/fr/logements/"] == ["/fr/hebergements/"]
+        assert section_map["/fr/loisirs/"] == ["/fr/activites/"]
+        assert section_map["/fr/"] == ["/fr/"]
+    
+    def test_plan_groups_pairs_and_keeps_unmapped_sections_flat(self):
+        """Test plan : une paire par bloc de sections, sections non associées à plat"""
+        mapper = SectionMapper()
+        
+        pairs, unmapped = mapper.plan(OLD_URLS, NEW_URLS, {
+            "/fr/logements/": ["/fr/hebergements/"],
+            "/fr/loisirs/": ["/fr/hebergements/"]
+        })
+        
+        assert len(pairs) == 1
+        pair_old, pair_new = pairs[0]
+        assert pair_old == site("logements", CHALETS) + site("loisirs", ACTIVITES)
+        assert pair_new == site("hebergements", CHALETS)
+        assert unmapped == ["/fr/contact"]
+    
+    def test_section_mode_shrinks_prompts(self):
+        """Test AIMapper : chaque lot ne voit que les candidates de sa paire de sections"""
+        flat = AIMapper("test-key", local_prematch=False)
+        hierarchical = AIMapper("test-key", local_prematch=False, section_mode="local")
+        
+        flat_chunks = flat._prepare_matching(OLD_URLS, NEW_URLS, "", "fr")["chunks"]
+        chunks = hierarchical._prepare_matching(OLD_URLS, NEW_URLS, "", "fr")["chunks"]
+        
+        assert len(flat_chunks) == 1
+        assert len(chunks) == 3
+        assert sorted(url for chunk in chunks for url in chunk["old_urls"]) == sorted(OLD_URLS)
+        for chunk in chunks:
+            assert {url_section(url) for url in chunk["new_urls"]} == {
+                {"/fr/logements/": "/fr/hebergements/", "/fr/loisirs/": "/fr/activites/",
+                 "/fr/": "/fr/"}[url_section(chunk["old_urls"][0])]
+            }
+        assert hierarchical.get_statistics()["section_pairs"] == 3
+        assert hierarchical.get_statistics()["section_fallback_urls"] == 0
+        
+        # Cache par URL : une entrée du mode à plat n'est pas réutilisée en mode sections
+        flat_keys = flat._get_cache_keys(OLD_URLS, NEW_URLS, None, "", "fr")
+        section_keys = hierarchical._get_cache_keys(OLD_URLS, NEW_URLS, None, "", "fr")
+        assert not set(flat_keys.values()) & set(section_keys.values())
+    
+    def test_model_section_mapping_end_to_end(self):
+        """Test mode 'ai' : un appel sur les noms de sections, puis les pages par paire"""
+        old_urls = site("nos-hebergements", CHALETS) + site("nos-activites", ACTIVITES)
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            mapper = AIMapper("mock", client=client, local_prematch=False, section_mode="ai")
+            
+            result = mapper.match_urls(old_urls, NEW_URLS)
+            requests = server.get_statistics()["requests"]
+        
+        # 1 appel de sections + 1 lot par paire
+        assert requests == 3
+        assert len(result.correspondances) == len(old_urls)
+        for match in result.correspondances:
+            assert match["ancienne"].split("/")[-2] == match["nouvelle"].split("/")[-2]
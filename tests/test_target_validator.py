@@ -0,0 +1,83 @@
+"""
+Tests pour la validation locale des URLs cibles renvoyées par le modèle
+"""
+
+import json
+
+from openai import OpenAI
+
+from src.ai_mapper import AIMapper
+from src.target_validator import TargetValidator, target_key
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig, deterministic_responder
+
+
+CANDIDATES = [
+    "https://www.site.com/fr/hebergements/chalet-du-bois/",
+    "https://www.site.com/fr/hebergements/chalet-12/",
+    "https://www.site.com/fr/hebergements/chalet-14/",
+    "https://www.site.com/fr/contact/"
+]
+
+
+class TestTargetValidator:
+    
+    def test_target_key(self):
+        """Test forme normalisée : sans domaine, casse ni slash final"""
+        assert target_key("https://www.site.com/FR/Contact/") == "/fr/contact"
+        assert target_key(" /fr/contact?ref=menu ") == "/fr/contact"
+        assert target_key("https://www.site.com/") == "/"
+    
+    def test_exact_and_equivalent_targets_are_kept(self):
+        """Test cibles valides : exacte, ou même chemin sous une autre forme"""
+        validator = TargetValidator(CANDIDATES)
+        
+        assert validator.resolve(CANDIDATES[3]) == (CANDIDATES[3], 1.0)
+        assert validator.resolve("/fr/contact") == (CANDIDATES[3], 1.0)
+        assert "/fr/contact" not in validator
+    
+    def test_near_miss_is_snapped_and_invention_rejected(self):
+        """Test correction : faute de frappe corrigée, slug ou numéro inventé rejeté"""
+        validator = TargetValidator(CANDIDATES)
+        
+        target, similarity = validator.resolve("https://www.site.com/fr/hebergement/chalet-du-bois/")
+        assert target == CANDIDATES[0]
+        assert 0.9 <= similarity < 1.0
+        
+        assert validator.resolve("https://www.site.com/fr/hebergements/chalet-13/")[0] is None
+        assert validator.resolve("https://www.site.com/fr/hebergements/yourte-panoramique/")[0] is None
+    
+    def test_mapper_snaps_locally_and_requeues_hallucinations(self):
+        """Test AIMapper : correction sans relance, cible inventée renvoyée au modèle"""
+        old_urls = ["/fr/chalet-du-bois.html", "/fr/yourte.html"]
+        calls = []
+        
+        def responder(request):
+            calls.append(request)
+            data = json.loads(deterministic_responder(request))
+            if len(calls) == 1:
+                data = {"correspondances": [
+                    {"ancienne": old_urls[0], "nouvelle": "https://www.site.com/fr/hebergement/chalet-du-bois/",
+                     "confidence": 0.9, "raison": "Slug"},
+                    {"ancienne": old_urls[1], "nouvelle": "https://www.site.com/fr/hebergements/yourte/",
+                     "confidence": 0.8, "raison": "Inventée"}
+                ], "non_matchees": []}
+            return json.dumps(data)
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0), responder=responder) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            mapper = AIMapper("mock", client=client, local_prematch=False)
+            result = mapper.match_urls(old_urls, CANDIDATES, min_confidence=0.0)
+        
+        snapped = result.correspondances[0]
+        assert snapped["nouvelle"] == CANDIDATES[0]
+        assert snapped["confidence"] < 0.9
+        assert "cible corrigée" in snapped["raison"]
+        assert all(match["nouvelle"] in CANDIDATES for match in result.correspondances)
+        
+        # Seule l'URL à la cible inventée est relancée
+        assert len(calls) == 2
+        assert old_urls[0] not in calls[1]["messages"][-1]["content"].split("NOUVELLES URLS")[0]
+        stats = mapper.get_statistics()
+        assert stats["snapped_targets"] == 1
+        assert stats["hallucinated_targets"] == 1
+        assert stats["omitted_urls"] == 0
@@ -0,0 +1,58 @@
+"""
+Tests pour l'estimateur de tokens auto-calibré
+"""
+
+import pytest
+from unittest.mock import Mock
+
+from src.token_estimator import TokenEstimator, get_model_limits, get_model_pricing
+
+
+class TestTokenEstimator:
+    
+    def test_heuristic_counts_grow_with_url_length(self):
+        """Test comptage heuristique : une URL longue coûte plus de tokens"""
+        estimator = TokenEstimator(use_tiktoken=False)
+        
+        short = estimator.count_raw("/fr/contact")
+        long = estimator.count_raw("/fr/hebergements/mobil-home-trois-chambres-avec-terrasse-couverte-2024")
+        
+        assert 0 < short < long
+        assert estimator.count_raw("") == 0
+    
+    def test_calibration_converges_to_observed_usage(self):
+        """Test auto-correction du facteur d'entrée par response.usage"""
+        estimator = TokenEstimator(use_tiktoken=False, smoothing=0.5)
+        raw = estimator.count_raw("/fr/hebergements/chalet-bois\n" * 20)
+        
+        for _ in range(10):
+            estimator.record_usage(raw, 20, Mock(prompt_tokens=raw * 2, completion_tokens=600))
+        
+        stats = estimator.get_statistics()
+        assert stats["input_ratio"] == pytest.approx(2.0, rel=0.01)
+        assert stats["output_tokens_per_url"] == pytest.approx(30.0, rel=0.05)
+        assert stats["calibrations"] == 10
+        assert estimator.estimate_output(10) == pytest.approx(300, rel=0.05)
+    
+    def test_usage_without_counts_is_ignored(self):
+        """Test usage absent (mock, API sans usage) : aucune correction"""
+        estimator = TokenEstimator(use_tiktoken=False)
+        
+        estimator.record_usage(100, 5, None)
+        estimator.record_usage(100, 5, Mock())
+        
+        assert estimator.get_statistics()["calibrations"] == 0
+        assert estimator.input_ratio == 1.0
+    
+    def test_model_limits_use_longest_prefix(self):
+        """Test limites par modèle (préfixe le plus long, défaut prudent)"""
+        assert get_model_limits("gpt-4o-mini-2024-07-18") == (128000, 16384)
+        assert get_model_limits("gpt-4-0613") == (8192, 4096)
+        assert get_model_limits("gpt-3.5-turbo-0125") == (16385, 4096)
+        assert get_model_limits("modele-inconnu") == (8192, 4096)
+    
+    def test_model_pricing_use_longest_prefix(self):
+        """Test tarifs par modèle (préfixe le plus long, défaut GPT-3.5)"""
+        assert get_model_pricing("gpt-4o-mini-2024-07-18") == (0.00015, 0.0006)
+        assert get_model_pricing("gpt-4o-2024-08-06") == (0.0025, 0.01)
+        assert get_model_pricing("modele-inconnu") == (0.0015, 0.002)
@@ -0,0 +1,129 @@
+"""
+Tests pour le journal de consommation des appels IA
+"""
+
+import json
+
+from openai import OpenAI
+
+from src.ai_mapper import AIMapper
+from src.usage_ledger import UsageLedger, percentile, CALIBRATION_WINDOW
+from src.mock_openai_server import MockOpenAIServer, MockServerConfig
+
+
+def make_entry(chunk_size, latency, prompt=1000, completion=200, outcome="ok", model="gpt-3.5-turbo"):
+    """Entrée de journal minimale"""
+    return {
+        "model": model, "chunk_size": chunk_size, "latency_s": latency,
+        "prompt_tokens": prompt, "completion_tokens": completion,
+        "total_tokens": prompt + completion, "raw_prompt_tokens": prompt // 2,
+        "retries": 0, "parse_outcome": outcome, "cost_usd": 0.002
+    }
+
+
+class TestUsageLedger:
+    
+    def test_percentile_nearest_rank(self):
+        """Test percentile par rang le plus proche"""
+        values = [float(v) for v in range(1, 11)]
+        
+        assert percentile(values, 0.5) == 5.0
+        assert percentile(values, 0.9) == 9.0
+        assert percentile(values, 0.99) == 10.0
+        assert percentile([], 0.5) == 0.0
+    
+    def test_summary_totals_and_settings(self, tmp_path):
+        """Test totaux par projet, issues de décodage et détail par taille de lot"""
+        ledger = UsageLedger(tmp_path)
+        for latency in (1.0, 2.0, 3.0):
+            ledger.record("www.example.com", make_entry(20, latency))
+        ledger.record("www.example.com", make_entry(40, 6.0, outcome="salvaged"))
+        ledger.record("autre-site.fr", make_entry(20, 9.0))
+        
+        summary = ledger.summary("www.example.com")
+        
+        assert ledger.projects() == ["autre-site.fr", "www.example.com"]
+        assert summary["calls"] == 4
+        assert summary["urls"] == 100
+        assert summary["total_tokens"] == 4800
+        assert summary["latency_p50_s"] == 2.0
+        assert summary["parse_outcomes"]["salvaged"] == 1
+        assert [s["chunk_size"] for s in summary["by_setting"]] == [20, 40]
+        assert ledger.summary()["calls"] == 5
+    
+    def test_calibration_from_history(self, tmp_path):
+        """Test calibration : tokens facturés / comptés et sortie par URL"""
+        ledger = UsageLedger(tmp_path)
+        ledger.record("p", make_entry(20, 1.0, prompt=1000, completion=400))
+        ledger.record("p", make_entry(20, 1.0, prompt=1000, completion=400, model="gpt-4o"))
+        
+        calibration = ledger.calibration("gpt-3.5-turbo")
+        
+        assert calibration == {"input_ratio": 2.0, "output_tokens_per_url": 20.0}
+        assert ledger.calibration("gpt-4-turbo") is None
+    
+    def test_calibration_reads_summary_not_full_ledger(self, tmp_path, monkeypatch):
+        """Test calibration : résumé borné tenu à jour, journaux complets lus une seule fois"""
+        ledger = UsageLedger(tmp_path)
+        ledger.record("p", make_entry(20, 1.0, prompt=1000, completion=400))
+        
+        # Journal d'avant le résumé : reconstruit une fois depuis les JSONL
+        (tmp_path / "calibration.json").unlink()
+        assert UsageLedger(tmp_path).calibration("gpt-3.5-turbo")["output_tokens_per_url"] == 20.0
+        
+        def full_read(project=None):
+            raise AssertionError("lecture complète du journal")
+        
+        monkeypatch.setattr(ledger, "entries", full_read)
+        for _ in range(CALIBRATION_WINDOW + 10):
+            ledger.record("p", make_entry(10, 1.0, prompt=1000, completion=100))
+        
+        # Seuls les derniers appels comptent : l'appel à 20 tokens par URL est sorti de la fenêtre
+        assert ledger.calibration("gpt-3.5-turbo") == {"input_ratio": 2.0, "output_tokens_per_url": 10.0}
+        assert ledger.calibration("gpt-3.5-turbo", last=5) == {"input_ratio": 2.0, "output_tokens_per_url": 10.0}
+        summary = json.loads((tmp_path / "calibration.json").read_text())
+        assert len(summary["gpt-3.5-turbo"]["None"]) == CALIBRATION_WINDOW
+    
+    def test_mapper_records_every_call(self, tmp_path):
+        """Test bout en bout : usage réel, latence et issue journalisés, estimateur recalibré"""
+        ledger = UsageLedger(tmp_path)
+        old_urls = [f"/fr/chalet-{i}.html" for i in range(6)]
+        new_urls = [f"/fr/hebergements/chalet-{i}/" for i in range(6)]
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0.01)) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            mapper = AIMapper("mock", model="gpt-3.5-turbo", client=client, local_prematch=False,
+                              chunk_size=3, usage_ledger=ledger, project="www.example.com")
+            mapper.match_urls(old_urls, new_urls)
+            requests = server.get_statistics()["requests"]
+        
+        entries = ledger.entries("www.example.com")
+        assert len(entries) == requests == 2
+        assert all(entry["prompt_tokens"] and entry["completion_tokens"] for entry in entries)
+        assert all(entry["latency_s"] > 0 and entry["parse_outcome"] == "ok" for entry in entries)
+        assert mapper.get_usage_summary()["urls"] == 6
+        
+        # Nouvelle session : l'estimateur repart des mesures du journal
+        seeded = AIMapper("mock", model="gpt-3.5-turbo", client=client, usage_ledger=ledger)
+        assert seeded.token_estimator.get_statistics()["seeded"] is True
+    
+    def test_prefix_cache_ratio_is_measured(self, tmp_path):
+        """Test cache de préfixe simulé : lots suivants servis en cache, ratio mesuré par le journal"""
+        ledger = UsageLedger(tmp_path)
+        old_urls = [f"/fr/chalet-{i}.html" for i in range(20)]
+        new_urls = [f"/fr/hebergements/chalets-en-bois/chalet-{i}-vue-lac/" for i in range(150)]
+        
+        with MockOpenAIServer(MockServerConfig(latency_seconds=0)) as server:
+            client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+            mapper = AIMapper("mock", client=client, local_prematch=False, chunk_size=5,
+                              max_concurrency=1, usage_ledger=ledger, project="p")
+            mapper.match_urls(old_urls, new_urls)
+        
+        entries = ledger.entries("p")
+        summary = ledger.summary("p")
+        
+        assert len(entries) == 4
+        assert entries[0]["cached_tokens"] == 0
+        assert all(entry["cached_tokens"] >= 1024 for entry in entries[1:])
+        assert summary["cached_ratio"] > 0.5
+        assert entries[1]["cost_usd"] < entries[0]["cost_usd"]